@@ -0,0 +1,345 @@
+"""Poll benchmark for the Irradiance Sensor coordinator.
+
+Starts simulated devices in a separate process (pymodbus TCP servers, or one
+RTU server behind a pty pair for RS485) loaded with the register maps from
+templates.json, then drives IrradianceDataCoordinator against them and prints
+machine-readable JSON:
+
+    python benchmarks/bench_poll.py --devices 1,10,100 --polls 20
+    python benchmarks/bench_poll.py --transport serial --devices 4 --polls 10
+    python benchmarks/bench_poll.py --devices 1 --max-block-size 1 --pipeline-depth 8
+    python benchmarks/bench_poll.py --transport serial --baudrate 115200 --rtu-throughput
+
+Requires homeassistant and pymodbus to be installed.
+
+The pymodbus server only answers the first of several requests that arrive
+in one TCP segment, so --pipeline-depth above 1 has to be measured against a
+real gateway.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import pathlib
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tty
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from pymodbus.datastore import (  # noqa: E402
+    ModbusServerContext,
+    ModbusSlaveContext,
+    ModbusSparseDataBlock,
+)
+from pymodbus.server import StartAsyncSerialServer, StartAsyncTcpServer  # noqa: E402
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from custom_components.irradiance_sensor.bus import (  # noqa: E402
+    async_acquire_bus,
+    async_release_bus,
+)
+from custom_components.irradiance_sensor.const import (  # noqa: E402
+    CONF_BAUDRATE,
+    CONF_CONNECTION_METHOD,
+    CONF_IP_ADDRESS,
+    CONF_MAX_BLOCK_SIZE,
+    CONF_MODBUS_ID,
+    CONF_PIPELINE_DEPTH,
+    CONF_PORT,
+    CONF_REGISTER_TYPE,
+    CONF_RTU_THROUGHPUT,
+    CONF_SERIAL_PORT,
+    DOMAIN,
+    METHOD_MODBUS_TCP,
+    METHOD_RS485,
+    REG_TYPE_INPUT,
+)
+from custom_components.irradiance_sensor.planner import compile_read_plan  # noqa: E402
+from custom_components.irradiance_sensor.sensor import (  # noqa: E402
+    IrradianceDataCoordinator,
+)
+
+TEMPLATES_PATH = ROOT / "custom_components" / "irradiance_sensor" / "templates.json"
+LAG_SAMPLE_INTERVAL = 0.005
+
+
+def load_template(name):
+    """Return the registers of a bundled template (the first one by default)."""
+    templates = json.loads(TEMPLATES_PATH.read_text())
+    for item in templates:
+        if name is None or item["name"] == name:
+            return item["name"], item["registers"]
+    raise SystemExit(f"Unknown template {name!r}")
+
+
+def slave_context(registers):
+    """Return a datastore answering every template register."""
+    values = {}
+    for idx, reg in enumerate(registers.values()):
+        values[reg["addr"]] = 100 + idx
+    # Fill the gaps so coalesced block reads are answered too
+    top = max(values) if values else 0
+    # The datastore reads protocol address N from slot N + 1
+    block = {addr + 1: values.get(addr, 0) for addr in range(top + 1)}
+    return ModbusSlaveContext(
+        ir=ModbusSparseDataBlock(block),
+        hr=ModbusSparseDataBlock(dict(block)),
+    )
+
+
+def entry_config(registers, **connection):
+    """Return config entry data enabling every template register."""
+    config = dict(connection)
+    for key, reg in registers.items():
+        config[f"{key}_enabled"] = True
+        config[f"{key}_addr"] = reg["addr"]
+        config[f"{key}_gain"] = reg.get("gain", 1.0)
+        config[f"{key}_offset"] = reg.get("offset", 0.0)
+        config[f"{key}_{CONF_REGISTER_TYPE}"] = reg.get("type") or REG_TYPE_INPUT
+    return config
+
+
+async def _relay(fd_a, fd_b):
+    """Copy bytes both ways between two pty masters."""
+    loop = asyncio.get_running_loop()
+
+    def pump(src, dst):
+        try:
+            os.write(dst, os.read(src, 4096))
+        except OSError:
+            pass
+
+    loop.add_reader(fd_a, pump, fd_a, fd_b)
+    loop.add_reader(fd_b, pump, fd_b, fd_a)
+    await asyncio.Event().wait()
+
+
+def _simulator(args, registers, ready, info):
+    """Run the simulated devices until terminated (child process)."""
+    async def run():
+        servers = []
+        if args.transport == "tcp":
+            for idx in range(args.max_devices):
+                context = ModbusServerContext(slaves=slave_context(registers), single=True)
+                servers.append(StartAsyncTcpServer(
+                    context=context, address=("127.0.0.1", args.base_port + idx)
+                ))
+        else:
+            # Two pty pairs bridged together act as a null-modem cable
+            server_master, server_slave = os.openpty()
+            client_master, client_slave = os.openpty()
+            for fd in (server_slave, client_slave):
+                tty.setraw(fd)
+            info["client_port"] = os.ttyname(client_slave)
+            context = ModbusServerContext(
+                slaves={unit: slave_context(registers) for unit in range(1, args.max_devices + 1)},
+                single=False,
+            )
+            servers.append(StartAsyncSerialServer(
+                context=context, port=os.ttyname(server_slave), baudrate=args.baudrate
+            ))
+            servers.append(_relay(server_master, client_master))
+
+        tasks = [asyncio.create_task(server) for server in servers]
+        await asyncio.sleep(0.5)
+        ready.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+
+class LoopLagSampler:
+    """Measure how late the event loop wakes up a periodic sleeper."""
+
+    def __init__(self):
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(LAG_SAMPLE_INTERVAL)
+            self.samples.append(max(0.0, time.perf_counter() - start - LAG_SAMPLE_INTERVAL))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        self._task.cancel()
+
+    def summary(self):
+        lags = self.samples or [0.0]
+        return {
+            "max_ms": max(lags) * 1000,
+            "total_blocked_ms": sum(lag for lag in lags if lag > LAG_SAMPLE_INTERVAL) * 1000,
+            "p99_ms": percentile(lags, 99) * 1000,
+        }
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile using nearest-rank."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+async def run_scenario(args, registers, devices, info):
+    """Poll `devices` coordinators `args.polls` times and return metrics."""
+    hass = HomeAssistant(tempfile.mkdtemp())
+    hass.data[DOMAIN] = {}
+
+    executor_jobs = 0
+    add_executor_job = hass.async_add_executor_job
+
+    def counting_executor_job(target, *args):
+        nonlocal executor_jobs
+        executor_jobs += 1
+        return add_executor_job(target, *args)
+
+    hass.async_add_executor_job = counting_executor_job
+
+    coordinators = []
+    buses = []
+    for idx in range(devices):
+        if args.transport == "tcp":
+            connection = {
+                CONF_CONNECTION_METHOD: METHOD_MODBUS_TCP,
+                CONF_IP_ADDRESS: "127.0.0.1",
+                CONF_PORT: args.base_port + idx,
+                CONF_MODBUS_ID: 1,
+                CONF_PIPELINE_DEPTH: args.pipeline_depth,
+            }
+        else:
+            connection = {
+                CONF_CONNECTION_METHOD: METHOD_RS485,
+                CONF_SERIAL_PORT: info["client_port"],
+                CONF_BAUDRATE: args.baudrate,
+                CONF_RTU_THROUGHPUT: args.rtu_throughput,
+                CONF_MODBUS_ID: idx + 1,
+            }
+        if args.max_block_size:
+            connection[CONF_MAX_BLOCK_SIZE] = args.max_block_size
+        config = entry_config(registers, **connection)
+        bus = await async_acquire_bus(hass, config)
+        buses.append(bus)
+        coordinators.append(IrradianceDataCoordinator(hass, config, bus, compile_read_plan(config)))
+
+    requests = 0
+    for bus in set(buses):
+        read = bus.async_read_timed
+
+        async def counting_read(*read_args, _read=read, **kwargs):
+            nonlocal requests
+            requests += 1
+            return await _read(*read_args, **kwargs)
+
+        bus.async_read_timed = counting_read
+
+    async def timed_refresh(coordinator):
+        # Force every group due so each poll reads the full map
+        coordinator._next_due = dict.fromkeys(coordinator._next_due, 0.0)
+        start = time.perf_counter()
+        await coordinator.async_refresh()
+        return time.perf_counter() - start, coordinator.last_update_success
+
+    # Warm-up poll opens the connections
+    await asyncio.gather(*(timed_refresh(c) for c in coordinators))
+    requests = 0
+    executor_jobs = 0
+    threads_before = threading.active_count()
+
+    sampler = LoopLagSampler()
+    sampler.start()
+    latencies = []
+    failures = 0
+    wall_start = time.perf_counter()
+    for _ in range(args.polls):
+        for latency, ok in await asyncio.gather(*(timed_refresh(c) for c in coordinators)):
+            latencies.append(latency)
+            failures += not ok
+    wall = time.perf_counter() - wall_start
+    sampler.stop()
+
+    result = {
+        "devices": devices,
+        "transport": args.transport,
+        "polls": args.polls,
+        "failed_polls": failures,
+        "wall_s": wall,
+        "poll_latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p90": percentile(latencies, 90) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": max(latencies) * 1000,
+            "mean": statistics.fmean(latencies) * 1000,
+        },
+        "requests_per_poll": requests / (args.polls * devices),
+        "frames_per_second": requests / wall,
+        "executor_jobs": executor_jobs,
+        "threads_added": threading.active_count() - threads_before,
+        "loop_lag": sampler.summary(),
+    }
+
+    for bus in set(buses):
+        for _ in range(bus.refcount):
+            await async_release_bus(hass, bus)
+    await hass.async_stop(force=True)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", default="1,10,100", help="Comma separated device counts")
+    parser.add_argument("--polls", type=int, default=20)
+    parser.add_argument("--transport", choices=("tcp", "serial"), default="tcp")
+    parser.add_argument("--template", default=None, help="Template name from templates.json")
+    parser.add_argument("--base-port", type=int, default=15020)
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--pipeline-depth", type=int, default=1, help="Modbus TCP requests in flight")
+    parser.add_argument("--max-block-size", type=int, default=None, help="Registers per read request")
+    parser.add_argument("--rtu-throughput", action="store_true", help="Frame timing from the actual character length")
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    counts = [int(n) for n in args.devices.split(",")]
+    args.max_devices = max(counts)
+    if args.transport == "serial" and args.max_devices > 247:
+        raise SystemExit("An RS485 line addresses at most 247 units")
+
+    template, registers = load_template(args.template)
+
+    manager = multiprocessing.Manager()
+    info = manager.dict()
+    ready = multiprocessing.Event()
+    simulator = multiprocessing.Process(
+        target=_simulator, args=(args, registers, ready, info), daemon=True
+    )
+    simulator.start()
+    if not ready.wait(30):
+        raise SystemExit("Simulator did not start")
+
+    try:
+        results = [asyncio.run(run_scenario(args, registers, n, info)) for n in counts]
+    finally:
+        simulator.terminate()
+
+    report = json.dumps({"template": template, "results": results}, indent=2)
+    if args.output:
+        pathlib.Path(args.output).write_text(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,112 @@
 """The Irradiance Sensor integration."""
 from __future__ import annotations
 
+import importlib
+import os
+
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN
+from .const import (
+    DOMAIN,
+    DATA_BUS,
+    DATA_CONFIG,
+    DATA_DEVICES,
+    DATA_PLANS,
+    DATA_SAMPLES,
+    CONF_SAMPLE_STORE,
+    CONF_SAMPLE_CAPACITY,
+    DEFAULT_SAMPLE_CAPACITY,
+    SAMPLE_STORE_DIR,
+)
+from .planner import compile_read_plan, device_configs
+from .samples import SampleStore
+from .services import async_setup_services
 
 # List the platforms that we want to support.
 PLATFORMS: list[Platform] = [Platform.SENSOR]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+async def _async_import_bus(hass: HomeAssistant):
+    """Import the bus module, and with it pymodbus, off the event loop."""
+    return await hass.async_add_executor_job(importlib.import_module, f"{__name__}.bus")
+
+def _sample_store_path(hass: HomeAssistant, entry: ConfigEntry) -> str:
+    """Return the ring file holding the raw samples of an entry."""
+    return hass.config.path(SAMPLE_STORE_DIR, f"{entry.entry_id}.samples")
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Register the integration services."""
+    async_setup_services(hass)
+    return True
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Irradiance Sensor from a config entry."""
 
     hass.data.setdefault(DOMAIN, {})
     
-    # Store the config entry data in hass.data for access by platforms
-    hass.data[DOMAIN][entry.entry_id] = entry.data
+    # Store the config entry data, one config and compiled read plan per
+    # slave, and the shared bus for access by platforms
+    devices = device_configs(entry.data)
+    bus_module = await _async_import_bus(hass)
+    hass.data[DOMAIN][entry.entry_id] = {
+        DATA_CONFIG: entry.data,
+        DATA_DEVICES: devices,
+        DATA_PLANS: [compile_read_plan(device) for device in devices],
+        DATA_BUS: await bus_module.async_acquire_bus(hass, entry.data),
+        DATA_SAMPLES: None,
+    }
+
+    try:
+        # Optional full-rate sample store, fed by the coordinators
+        if entry.options.get(CONF_SAMPLE_STORE):
+            store = SampleStore(
+                _sample_store_path(hass, entry),
+                entry.options.get(CONF_SAMPLE_CAPACITY, DEFAULT_SAMPLE_CAPACITY),
+            )
+            await hass.async_add_executor_job(store.open)
+            hass.data[DOMAIN][entry.entry_id][DATA_SAMPLES] = store
 
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    except Exception:
+        # Give the bus back, or the client stays open with a stale reference
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        await bus_module.async_release_bus(hass, entry_data[DATA_BUS])
+        if entry_data[DATA_SAMPLES] is not None:
+            await hass.async_add_executor_job(entry_data[DATA_SAMPLES].close)
+        raise
+
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
 
     return True
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload an entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        from .bus import async_release_bus
+
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        # The client is only closed once the last entry on the bus unloads
+        await async_release_bus(hass, entry_data[DATA_BUS])
+        if entry_data[DATA_SAMPLES] is not None:
+            await hass.async_add_executor_job(entry_data[DATA_SAMPLES].close)
+
+    return unload_ok
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the sample store of a removed entry."""
+    path = _sample_store_path(hass, entry)
+
+    def remove():
+        if os.path.exists(path):
+            os.remove(path)
 
-    return unload_ok
\ No newline at end of file
+    await hass.async_add_executor_job(remove)
@@ -0,0 +1,101 @@
+"""Sun-aware poll scheduling."""
+from __future__ import annotations
+
+import logging
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.sun import get_astral_location
+from homeassistant.util import dt as dt_util
+
+from .aggregation import WindowStats
+from .const import (
+    CONF_NIGHT_ELEVATION,
+    CONF_TWILIGHT_ELEVATION,
+    CONF_NIGHT_INTERVAL,
+    CONF_FAST_INTERVAL,
+    CONF_VARIABILITY,
+    DEFAULT_NIGHT_ELEVATION,
+    DEFAULT_TWILIGHT_ELEVATION,
+    DEFAULT_NIGHT_INTERVAL,
+    DEFAULT_FAST_INTERVAL,
+    DEFAULT_VARIABILITY,
+    VARIABILITY_SAMPLES,
+    VARIABILITY_MIN_IRRADIANCE,
+    POLL_MODE_NIGHT,
+    POLL_MODE_TWILIGHT,
+    POLL_MODE_DAY,
+    POLL_MODE_VARIABLE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+SUN_ENTITY = "sun.sun"
+
+
+class SunSchedule:
+    """Stretch or shorten poll intervals following the sun.
+
+    Below the night elevation every interval grows to the night interval.
+    Between the night and twilight elevations (sunrise and sunset) and on
+    days where irradiance varies a lot, intervals shrink to the fast
+    interval. Otherwise the configured intervals apply unchanged.
+    """
+
+    def __init__(self, hass: HomeAssistant, options) -> None:
+        """Initialize."""
+        self.hass = hass
+        self.night_elevation = float(options.get(CONF_NIGHT_ELEVATION, DEFAULT_NIGHT_ELEVATION))
+        self.twilight_elevation = float(options.get(CONF_TWILIGHT_ELEVATION, DEFAULT_TWILIGHT_ELEVATION))
+        self.night_interval = int(options.get(CONF_NIGHT_INTERVAL, DEFAULT_NIGHT_INTERVAL))
+        self.fast_interval = int(options.get(CONF_FAST_INTERVAL, DEFAULT_FAST_INTERVAL))
+        # Coefficient of variation in percent, 0 disables
+        self.variability = float(options.get(CONF_VARIABILITY, DEFAULT_VARIABILITY))
+        self._irradiance = WindowStats(VARIABILITY_SAMPLES)
+        self.elevation = None
+
+    def _sun_elevation(self) -> float | None:
+        """Return the sun elevation from sun.sun, or from the configured location."""
+        state = self.hass.states.get(SUN_ENTITY)
+        if state is not None and state.attributes.get("elevation") is not None:
+            return float(state.attributes["elevation"])
+        try:
+            location, elevation = get_astral_location(self.hass)
+            return location.solar_elevation(dt_util.utcnow(), elevation)
+        except Exception as e:
+            _LOGGER.debug(f"Could not compute the sun elevation: {e}")
+            return None
+
+    def add_irradiance(self, value) -> None:
+        """Feed an irradiance sample to the variability window."""
+        if value is not None:
+            self._irradiance.add(value)
+
+    def mode(self) -> str:
+        """Return the current poll mode."""
+        self.elevation = self._sun_elevation()
+        if self.elevation is None:
+            return POLL_MODE_DAY
+        if self.elevation < self.night_elevation:
+            # Tomorrow's weather has nothing to do with today's clouds
+            self._irradiance.reset()
+            return POLL_MODE_NIGHT
+        if self.elevation < self.twilight_elevation:
+            return POLL_MODE_TWILIGHT
+
+        mean = self._irradiance.mean
+        if (
+            self.variability
+            and len(self._irradiance) >= VARIABILITY_SAMPLES
+            and mean >= VARIABILITY_MIN_IRRADIANCE
+            and self._irradiance.stdev / mean * 100 >= self.variability
+        ):
+            return POLL_MODE_VARIABLE
+        return POLL_MODE_DAY
+
+    def interval(self, interval: int, mode: str) -> int:
+        """Return the interval to use for a configured interval in a mode."""
+        if mode == POLL_MODE_NIGHT:
+            return max(interval, self.night_interval)
+        if mode in (POLL_MODE_TWILIGHT, POLL_MODE_VARIABLE):
+            return min(interval, self.fast_interval)
+        return interval
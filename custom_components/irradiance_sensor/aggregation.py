@@ -0,0 +1,108 @@
+"""Windowed statistics over high-rate samples."""
+from __future__ import annotations
+
+from collections import deque
+
+
+class WindowStats:
+    """Mean, min and max over the recent samples of a channel.
+
+    The window holds at most `size` samples and, when `span` is set, only
+    those taken less than `span` seconds ago, so it keeps covering the same
+    stretch of time when the poll interval changes. The mean (and deviation)
+    are kept as running sums and min/max as monotonic deques of
+    (index, value), so adding a sample costs amortized O(1) whatever the
+    window length.
+    """
+
+    def __init__(self, size: int | None = None, span: float | None = None) -> None:
+        """Initialize."""
+        self.size = max(1, int(size)) if size is not None else None
+        self.span = span
+        self._samples = deque() # (monotonic time, value)
+        self._count = 0 # Index of the next sample
+        self._first = 0 # Index of the oldest sample still in the window
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._min = deque()
+        self._max = deque()
+
+    def __len__(self) -> int:
+        """Return the number of samples currently in the window."""
+        return len(self._samples)
+
+    def add(self, value: float, now: float | None = None) -> None:
+        """Add a sample taken at monotonic time now, evicting what falls out."""
+        idx = self._count
+        self._samples.append((now, value))
+        self._sum += value
+        self._sum_sq += value * value
+        self._count += 1
+
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((idx, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((idx, value))
+
+        if self.size is not None and len(self._samples) > self.size:
+            self._evict()
+        if now is not None:
+            self.expire(now)
+
+    def expire(self, now: float) -> None:
+        """Drop the samples older than the span of the window."""
+        if self.span is None:
+            return
+        cutoff = now - self.span
+        while self._samples and self._samples[0][0] is not None and self._samples[0][0] <= cutoff:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop the oldest sample."""
+        _, old = self._samples.popleft()
+        self._sum -= old
+        self._sum_sq -= old * old
+        self._first += 1
+        while self._min and self._min[0][0] < self._first:
+            self._min.popleft()
+        while self._max and self._max[0][0] < self._first:
+            self._max.popleft()
+
+    def reset(self) -> None:
+        """Drop every sample."""
+        self._samples.clear()
+        self._first = self._count
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._min.clear()
+        self._max.clear()
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean of the window, or None when empty."""
+        samples = len(self)
+        return self._sum / samples if samples else None
+
+    @property
+    def stdev(self) -> float | None:
+        """Return the population standard deviation, or None when empty."""
+        samples = len(self)
+        if not samples:
+            return None
+        mean = self._sum / samples
+        # Running sums can drift slightly below zero on a flat signal
+        return max(0.0, self._sum_sq / samples - mean * mean) ** 0.5
+
+    def snapshot(self) -> dict | None:
+        """Return mean, min, max and sample count, or None when empty."""
+        samples = len(self)
+        if not samples:
+            return None
+        return {
+            "mean": self._sum / samples,
+            "min": self._min[0][1],
+            "max": self._max[0][1],
+            "samples": samples,
+        }
@@ -0,0 +1,239 @@
+"""Backfill of long-term statistics from device history or exported files.
+
+Samples are streamed in time order through an hourly aggregator, and the
+finished hours are handed to the recorder in fixed-size chunks, so the
+memory used does not depend on how much history is imported.
+"""
+from __future__ import annotations
+
+import csv
+from datetime import datetime, timezone
+import logging
+import struct
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DATA_TYPE_UINT32,
+    BACKFILL_CHUNK_HOURS,
+    BACKFILL_READ_LINES,
+)
+from .planner import MODBUS_MAX_READ, ReadBlock, RegisterFormat
+
+_LOGGER = logging.getLogger(__name__)
+
+# Binary exports: little-endian (unix seconds, value) float64 pairs,
+# numpy dtype [("t", "<f8"), ("v", "<f8")]
+BINARY_RECORD = struct.Struct("<dd")
+# History records on the device start with a big-endian uint32 unix timestamp
+HISTORY_TIMESTAMP = RegisterFormat(DATA_TYPE_UINT32)
+
+
+class HourlyStatistics:
+    """Fold time-ordered samples into hourly mean/min/max rows."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self._hour = None
+        self._sum = 0.0
+        self._count = 0
+        self._min = None
+        self._max = None
+        self.samples = 0
+        self.skipped = 0
+
+    def add(self, when: datetime, value: float):
+        """Add a sample; return the row of the previous hour once it is complete."""
+        # Statistics rows start on whole UTC hours
+        hour = dt_util.as_utc(when).replace(minute=0, second=0, microsecond=0)
+        if self._hour is not None and hour < self._hour:
+            # Rows already handed out cannot be amended
+            self.skipped += 1
+            return None
+
+        finished = None
+        if hour != self._hour:
+            finished = self.flush()
+            self._hour = hour
+
+        self.samples += 1
+        self._sum += value
+        self._count += 1
+        self._min = value if self._min is None else min(self._min, value)
+        self._max = value if self._max is None else max(self._max, value)
+        return finished
+
+    def flush(self):
+        """Return the row of the current hour and start over, or None if empty."""
+        if not self._count:
+            return None
+        row = {
+            "start": self._hour,
+            "mean": self._sum / self._count,
+            "min": self._min,
+            "max": self._max,
+        }
+        self._sum = 0.0
+        self._count = 0
+        self._min = None
+        self._max = None
+        return row
+
+
+def _parse_time(text: str) -> datetime | None:
+    """Parse unix seconds or an ISO 8601 timestamp (local time if naive)."""
+    try:
+        return datetime.fromtimestamp(float(text), timezone.utc)
+    except ValueError:
+        pass
+    when = dt_util.parse_datetime(text)
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    return when
+
+
+def _open_text(path):
+    """Open a text file for the csv module (executor)."""
+    return open(path, newline="", encoding="utf-8")
+
+
+def _read_csv_lines(handle, count):
+    """Read up to count (timestamp, value) rows from a CSV file (executor)."""
+    rows = []
+    for row in csv.reader(handle):
+        if len(row) < 2:
+            continue
+        rows.append((row[0].strip(), row[-1].strip()))
+        if len(rows) >= count:
+            break
+    return rows
+
+
+async def async_iter_csv(hass: HomeAssistant, path: str):
+    """Yield (time, value) samples of a CSV file in chunks read off the loop.
+
+    The first column is the timestamp and the last one the value; header
+    and unparsable lines are ignored.
+    """
+    handle = await hass.async_add_executor_job(_open_text, path)
+    try:
+        while rows := await hass.async_add_executor_job(_read_csv_lines, handle, BACKFILL_READ_LINES):
+            for when_text, value_text in rows:
+                when = _parse_time(when_text)
+                try:
+                    value = float(value_text)
+                except ValueError:
+                    continue
+                if when is not None:
+                    yield when, value
+    finally:
+        await hass.async_add_executor_job(handle.close)
+
+
+async def async_iter_binary(hass: HomeAssistant, path: str):
+    """Yield (time, value) samples of a binary export in chunks read off the loop."""
+    handle = await hass.async_add_executor_job(open, path, "rb")
+    try:
+        while chunk := await hass.async_add_executor_job(
+            handle.read, BINARY_RECORD.size * BACKFILL_READ_LINES
+        ):
+            usable = len(chunk) - len(chunk) % BINARY_RECORD.size
+            for timestamp, value in BINARY_RECORD.iter_unpack(chunk[:usable]):
+                if value == value: # Skip NaN
+                    yield datetime.fromtimestamp(timestamp, timezone.utc), value
+    finally:
+        await hass.async_add_executor_job(handle.close)
+
+
+async def async_iter_device_history(bus, channel, slave_id, address, records):
+    """Yield (time, value) samples from a history buffer on the device.
+
+    Each record is a uint32 unix timestamp followed by a value in the
+    channel's format, stored back to back from address, oldest first.
+    As many whole records as fit are fetched with each block read.
+    """
+    record_size = HISTORY_TIMESTAMP.count + channel.fmt.count
+    per_read = max(1, MODBUS_MAX_READ // record_size)
+
+    for first in range(0, records, per_read):
+        batch = min(per_read, records - first)
+        start = address + first * record_size
+        fields = []
+        for idx in range(batch):
+            record = start + idx * record_size
+            fields.append((record, HISTORY_TIMESTAMP))
+            fields.append((record + HISTORY_TIMESTAMP.count, channel.fmt))
+        block = ReadBlock(channel.reg_type, start, batch * record_size, tuple(fields))
+
+        async def read(block=block):
+            if not await bus.async_connect():
+                raise ConnectionError(f"Could not connect to {bus.key}")
+            return await bus.async_read(block.reg_type, block.address, block.count, slave_id)
+
+        rr = await bus.async_execute(read)
+        if rr.isError():
+            raise ValueError(f"Device rejected history read at {block.address}: {rr}")
+
+        decoded = block.decoder.decode(rr.registers)
+        for idx in range(batch):
+            record = start + idx * record_size
+            timestamp = decoded[record]
+            raw = decoded[record + HISTORY_TIMESTAMP.count]
+            # Empty slots of the ring buffer hold a zero timestamp
+            if not timestamp or raw is None:
+                continue
+            yield (
+                datetime.fromtimestamp(timestamp, timezone.utc),
+                round(float(raw) * channel.gain + channel.offset, 2),
+            )
+
+
+async def async_backfill(hass: HomeAssistant, metadata: dict, samples, start=None, end=None) -> dict:
+    """Import time-ordered samples as hourly statistics of an entity.
+
+    Hours already in the database are replaced by the imported rows. The
+    hour in progress is left to the recorder, which compiles it once it is
+    over; a partial row imported now would take its place.
+    """
+    # The recorder is only needed when a backfill actually runs
+    from homeassistant.components.recorder import get_instance
+    from homeassistant.components.recorder.statistics import async_import_statistics
+
+    current_hour = dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
+    end = min(end, current_hour) if end else current_hour
+
+    hourly = HourlyStatistics()
+    chunk = []
+    imported = 0
+
+    async def async_flush_chunk():
+        nonlocal imported
+        async_import_statistics(hass, metadata, list(chunk))
+        imported += len(chunk)
+        chunk.clear()
+        # Let the recorder write the chunk before queueing the next one
+        await get_instance(hass).async_block_till_done()
+
+    async for when, value in samples:
+        if (start and when < start) or when >= end:
+            continue
+        row = hourly.add(when, value)
+        if row is not None:
+            chunk.append(row)
+            if len(chunk) >= BACKFILL_CHUNK_HOURS:
+                await async_flush_chunk()
+
+    row = hourly.flush()
+    if row is not None:
+        chunk.append(row)
+    if chunk:
+        await async_flush_chunk()
+
+    _LOGGER.info(
+        f"Backfilled {imported} hours of {metadata['statistic_id']} "
+        f"from {hourly.samples} samples ({hourly.skipped} out of order)"
+    )
+    return {"hours": imported, "samples": hourly.samples, "skipped": hourly.skipped}
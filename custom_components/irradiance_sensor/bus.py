@@ -0,0 +1,456 @@
+"""Shared Modbus bus registry.
+
+Several config entries can point at the same RS485 line or Modbus TCP
+gateway. Each physical bus gets a single client that is reference counted
+across entries, and every transaction on it is serialized. Every slave has
+its own coordinator; they queue on the bus lock in arrival order, so the
+units of a daisy chain are polled round-robin.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from datetime import timedelta
+import logging
+import random
+import time
+
+from pymodbus.client import AsyncModbusTcpClient, AsyncModbusSerialClient
+from pymodbus.exceptions import ConnectionException, ModbusException, ModbusIOException
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import (
+    DOMAIN,
+    DATA_BUSES,
+    CONF_CONNECTION_METHOD,
+    CONF_IP_ADDRESS,
+    CONF_PORT,
+    CONF_SERIAL_PORT,
+    CONF_BAUDRATE,
+    CONF_PIPELINE_DEPTH,
+    CONF_PARITY,
+    CONF_STOPBITS,
+    CONF_RTU_THROUGHPUT,
+    DEFAULT_TIMEOUT,
+    DEFAULT_PARITY,
+    DEFAULT_STOPBITS,
+    FRAME_HISTORY,
+    DEFAULT_PIPELINE_DEPTH,
+    KEEPALIVE_INTERVAL,
+    BACKOFF_INITIAL,
+    BACKOFF_MAX,
+    BACKOFF_JITTER,
+    MAX_TRANSIENT_ERRORS,
+    SLAVE_BACKOFF_INITIAL,
+    SLAVE_BACKOFF_MAX,
+    CONN_STATE_DISCONNECTED,
+    CONN_STATE_CONNECTING,
+    CONN_STATE_CONNECTED,
+    CONN_STATE_BACKOFF,
+    REG_TYPE_INPUT,
+    METHOD_MODBUS_TCP,
+    METHOD_RS485,
+)
+from .pipeline import FUNC_READ_HOLDING, FUNC_READ_INPUT, PipelinedModbusTcpClient
+from .planner import MODBUS_MAX_READ
+from .rtu import char_time, frame_gap, read_wire_time, turnaround_delay
+
+_LOGGER = logging.getLogger(__name__)
+
+# Number of reconnect timestamps kept for rate statistics
+RECONNECT_HISTORY = 100
+
+
+def line_settings(config) -> str:
+    """Return the serial framing of a config, e.g. 9600 8N1."""
+    return (
+        f"{config.get(CONF_BAUDRATE, 9600)} 8{config.get(CONF_PARITY, DEFAULT_PARITY)}"
+        f"{config.get(CONF_STOPBITS, DEFAULT_STOPBITS)}"
+    )
+
+
+def bus_key(config) -> str:
+    """Return the key identifying the physical bus used by a config."""
+    if config.get(CONF_CONNECTION_METHOD) == METHOD_RS485:
+        return f"serial:{config.get(CONF_SERIAL_PORT)}"
+    return f"tcp:{config.get(CONF_IP_ADDRESS)}:{config.get(CONF_PORT, 502)}"
+
+
+class ModbusBus:
+    """A physical Modbus bus shared by one or more config entries.
+
+    The connection is kept open across polls. Timeouts and garbled frames
+    are transient: they fail one request and the socket is reopened before
+    the next, except on the pipelined client, which matches answers by
+    transaction ID and only reconnects after several in a row. Transport
+    failures drop the connection, after which reconnects are spaced with
+    jittered exponential backoff.
+    """
+
+    def __init__(self, hass: HomeAssistant, key: str, config) -> None:
+        """Initialize."""
+        self.hass = hass
+        self.key = key
+        self.config = config
+        self.client = None
+        self.refcount = 0
+        self.timeout = DEFAULT_TIMEOUT
+        # Requests a poll may have in flight at once
+        self.pipeline_depth = 1
+        if config.get(CONF_CONNECTION_METHOD) == METHOD_MODBUS_TCP:
+            self.pipeline_depth = max(1, int(config.get(CONF_PIPELINE_DEPTH, DEFAULT_PIPELINE_DEPTH)))
+        # asyncio.Lock wakes waiters in FIFO order, so polls queue up in turn
+        self._lock = asyncio.Lock()
+
+        # Connection lifecycle
+        self.state = CONN_STATE_DISCONNECTED
+        self.connect_count = 0
+        self.transport_errors = 0
+        self.transient_errors = 0
+        self.last_error = None
+        self._consecutive_transient = 0
+        self._failed_attempts = 0
+        self._retry_at = 0.0
+        self._last_activity = 0.0
+        self._reconnect_times = deque(maxlen=RECONNECT_HISTORY)
+
+        # RTU line timing: character time, silence required between frames
+        # and before switching units, and when the last frame ended
+        self.char_time = 0.0
+        self.frame_gap = 0.0
+        self.turnaround = 0.0
+        if config.get(CONF_CONNECTION_METHOD) == METHOD_RS485:
+            line = (
+                int(config.get(CONF_BAUDRATE, 9600)),
+                config.get(CONF_PARITY, DEFAULT_PARITY),
+                int(config.get(CONF_STOPBITS, DEFAULT_STOPBITS)),
+            )
+            throughput = bool(config.get(CONF_RTU_THROUGHPUT, False))
+            self.char_time = char_time(*line)
+            self.frame_gap = frame_gap(*line, throughput=throughput)
+            if throughput:
+                self.turnaround = turnaround_delay(*line)
+        self._frame_end = 0.0
+        self._last_slave = None
+        # Frame throughput: end times of recent frames and time spent holding the bus
+        self.frames = 0
+        self._frame_times = deque(maxlen=FRAME_HISTORY)
+        self._busy_time = 0.0
+        # Key: slave ID, Value: [consecutive timeouts, monotonic time of next attempt]
+        self._silent = {}
+
+        # Register used for idle health checks, learnt from the first good read
+        self._health_check = None
+        self._unsub_keepalive = None
+
+        self._create_client()
+
+    def _create_client(self):
+        """Initialize Modbus client."""
+        method = self.config.get(CONF_CONNECTION_METHOD)
+
+        if method == METHOD_MODBUS_TCP:
+            host = self.config.get(CONF_IP_ADDRESS)
+            port = self.config.get(CONF_PORT, 502)
+            if self.pipeline_depth > 1:
+                _LOGGER.debug(f"Initializing pipelined Modbus TCP Client: {host}:{port}, depth {self.pipeline_depth}")
+                self.client = PipelinedModbusTcpClient(host, port, self.timeout, self.pipeline_depth)
+            else:
+                _LOGGER.debug(f"Initializing Modbus TCP Client: {host}:{port}")
+                # Retries are left to the coordinator's per-poll budget
+                self.client = AsyncModbusTcpClient(host=host, port=port, timeout=self.timeout, retries=0)
+
+        elif method == METHOD_RS485:
+            port = self.config.get(CONF_SERIAL_PORT)
+            baud = int(self.config.get(CONF_BAUDRATE, 9600))
+            _LOGGER.debug(f"Initializing Modbus Serial Client: {port} @ {baud}")
+            self.client = AsyncModbusSerialClient(
+                port=port,
+                baudrate=baud,
+                bytesize=8,
+                parity=self.config.get(CONF_PARITY, DEFAULT_PARITY),
+                stopbits=int(self.config.get(CONF_STOPBITS, DEFAULT_STOPBITS)),
+                # Never cut off the longest read while it is still on the wire
+                timeout=self.timeout + read_wire_time(self.char_time, MODBUS_MAX_READ),
+                retries=0,
+            )
+
+    @callback
+    def async_start_keepalive(self):
+        """Start the idle health check for socket based buses."""
+        if self._unsub_keepalive is None and self.config.get(CONF_CONNECTION_METHOD) == METHOD_MODBUS_TCP:
+            self._unsub_keepalive = async_track_time_interval(
+                self.hass, self._async_keepalive, timedelta(seconds=KEEPALIVE_INTERVAL)
+            )
+
+    async def _async_keepalive(self, now=None):
+        """Read a known register when the bus has been idle for a while."""
+        if (
+            self._health_check is None
+            or self.state != CONN_STATE_CONNECTED
+            or time.monotonic() - self._last_activity < KEEPALIVE_INTERVAL
+        ):
+            return
+
+        async def health_check():
+            await self.async_read(*self._health_check)
+
+        try:
+            await self.async_execute(health_check)
+        except Exception as e:
+            _LOGGER.debug(f"Health check on {self.key} failed: {e}")
+
+    async def async_execute(self, func, *args):
+        """Run a transaction coroutine on the bus, one caller at a time."""
+        async with self._lock:
+            started = time.monotonic()
+            try:
+                return await func(*args)
+            finally:
+                self._busy_time += time.monotonic() - started
+
+    async def async_connect(self) -> bool:
+        """Connect the client if needed without blocking the event loop.
+
+        While a backoff window is running no attempt is made and False is
+        returned straight away.
+        """
+        if self.state == CONN_STATE_CONNECTED and self.client.connected:
+            return True
+        if time.monotonic() < self._retry_at:
+            return False
+
+        self.state = CONN_STATE_CONNECTING
+        try:
+            async with asyncio.timeout(self.timeout):
+                connected = bool(await self.client.connect())
+        except (TimeoutError, OSError, ModbusException) as e:
+            self.last_error = repr(e)
+            connected = False
+
+        if not connected:
+            self._schedule_retry()
+            return False
+
+        self.state = CONN_STATE_CONNECTED
+        self.connect_count += 1
+        self._failed_attempts = 0
+        self._consecutive_transient = 0
+        self._last_activity = time.monotonic()
+        if self.connect_count > 1:
+            self._reconnect_times.append(time.time())
+            _LOGGER.info(f"Reconnected to {self.key} ({self.connect_count - 1} reconnects so far)")
+        return True
+
+    def _schedule_retry(self):
+        """Start a jittered exponential backoff window after a failed connect."""
+        delay = min(BACKOFF_MAX, BACKOFF_INITIAL * 2 ** self._failed_attempts)
+        delay *= random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+        self._failed_attempts += 1
+        self._retry_at = time.monotonic() + delay
+        self.state = CONN_STATE_BACKOFF
+        _LOGGER.debug(f"Connect to {self.key} failed, next attempt in {delay:.1f}s")
+
+    def _drop_connection(self):
+        """Close the transport so the next transaction reconnects."""
+        self.client.close()
+        self.state = CONN_STATE_DISCONNECTED
+
+    def slave_retry_in(self, slave) -> float:
+        """Return the seconds left before a silent slave is polled again."""
+        silent = self._silent.get(slave)
+        if silent is None:
+            return 0.0
+        return max(0.0, silent[1] - time.monotonic())
+
+    def mark_silent(self, slave):
+        """Back off from a slave that did not answer, or answered garbage."""
+        silent = self._silent.setdefault(slave, [0, 0.0])
+        delay = min(SLAVE_BACKOFF_MAX, SLAVE_BACKOFF_INITIAL * 2 ** silent[0])
+        silent[0] += 1
+        silent[1] = time.monotonic() + delay
+        _LOGGER.debug(f"Unit {slave} on {self.key} did not answer, skipping it for {delay}s")
+
+    @staticmethod
+    def is_transient(exc: Exception) -> bool:
+        """Return True for errors that leave the connection usable."""
+        return isinstance(exc, (TimeoutError, ModbusIOException))
+
+    async def async_read(self, reg_type, address, count, slave, timeout=None):
+        """Read a range of input or holding registers."""
+        rr, _ = await self.async_read_timed(reg_type, address, count, slave, timeout)
+        return rr
+
+    async def async_read_timed(self, reg_type, address, count, slave, timeout=None):
+        """Read a range of registers and return the answer with its round-trip time.
+
+        timeout overrides the bus default for this request. Errors are
+        classified before being re-raised: transport failures drop the
+        connection, transient ones keep it unless they pile up. The
+        pymodbus clients hand the next frame that arrives to whatever
+        request is waiting, so on those a transient error also reconnects:
+        a late answer must not be taken for the reply to the next request.
+        On RS485 the t3.5 silent interval is kept between frames, also when
+        consecutive frames address different slaves. Neither that wait nor
+        the wait for a pipeline slot counts towards the timeout or the
+        round-trip time.
+        """
+        if reg_type == REG_TYPE_INPUT:
+            method = self.client.read_input_registers
+            function = FUNC_READ_INPUT
+        else: # Default or Holding
+            method = self.client.read_holding_registers
+            function = FUNC_READ_HOLDING
+
+        if self.state != CONN_STATE_CONNECTED and not await self.async_connect():
+            raise ConnectionException(f"Not connected to {self.key}")
+
+        if self.frame_gap:
+            gap = self.frame_gap
+            if slave != self._last_slave:
+                gap += self.turnaround
+            wait = self._frame_end + gap - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+        try:
+            if self.pipeline_depth > 1:
+                rr, rtt = await self.client.read_timed(function, address, count, slave, timeout or self.timeout)
+            else:
+                started = time.perf_counter()
+                async with asyncio.timeout(timeout or self.timeout):
+                    rr = await method(address=address, count=count, slave=slave)
+                rtt = time.perf_counter() - started
+            self._check_response(rr, function, count, slave)
+        except (TimeoutError, ModbusIOException) as e:
+            self.transient_errors += 1
+            self.last_error = repr(e)
+            self._consecutive_transient += 1
+            if self.pipeline_depth == 1:
+                # Nothing is in flight on a fresh connection; the pipelined
+                # client drops late answers by transaction ID instead
+                self._drop_connection()
+            elif self._consecutive_transient >= MAX_TRANSIENT_ERRORS:
+                _LOGGER.debug(f"{self._consecutive_transient} transient errors in a row on {self.key}, reconnecting")
+                self.transport_errors += 1
+                self._drop_connection()
+            raise
+        # TimeoutError is an OSError, so this comes after the transient case
+        except (ConnectionException, OSError) as e:
+            self.transport_errors += 1
+            self.last_error = repr(e)
+            self._drop_connection()
+            raise
+        finally:
+            self._frame_end = time.monotonic()
+            self._last_slave = slave
+            self.frames += 1
+            self._frame_times.append(self._frame_end)
+
+        self._consecutive_transient = 0
+        self._silent.pop(slave, None)
+        self._last_activity = time.monotonic()
+        if self._health_check is None and not rr.isError():
+            self._health_check = (reg_type, address, 1, slave)
+        return rr, rtt
+
+    def _check_response(self, rr, function, count, slave):
+        """Raise ModbusIOException when rr does not answer the request just sent.
+
+        A reply to an earlier request would otherwise be decoded as this
+        one. Transaction IDs tell them apart on TCP; RTU frames only carry
+        the unit address.
+        """
+        if rr.function_code & 0x7F != function:
+            raise ModbusIOException(f"Function {rr.function_code} in answer to function {function}")
+        if not rr.isError() and len(rr.registers) != count:
+            raise ModbusIOException(f"{len(rr.registers)} registers in answer to a read of {count}")
+        if self.config.get(CONF_CONNECTION_METHOD) == METHOD_RS485:
+            if rr.dev_id != slave:
+                raise ModbusIOException(f"Unit {rr.dev_id} answered a request to unit {slave}")
+        elif self.pipeline_depth == 1:
+            # The pipelined client routes answers by transaction ID itself
+            expected = self.client.ctx.next_tid
+            if rr.transaction_id != expected:
+                raise ModbusIOException(f"Transaction {rr.transaction_id} in answer to {expected}")
+
+    @property
+    def connection_info(self) -> dict:
+        """Return the connection state and reconnect statistics."""
+        hour_ago = time.time() - 3600
+        return {
+            "state": self.state,
+            "connects": self.connect_count,
+            "reconnects": max(0, self.connect_count - 1),
+            "reconnects_last_hour": sum(1 for t in self._reconnect_times if t >= hour_ago),
+            "transport_errors": self.transport_errors,
+            "transient_errors": self.transient_errors,
+            "last_error": self.last_error,
+            "silent_slaves": sorted(
+                slave for slave in self._silent if self.slave_retry_in(slave) > 0
+            ),
+            "frames": self.frames,
+            "frames_per_second": self.frames_per_second,
+            # Rate while the bus is held, i.e. what a saturated line sustains
+            "busy_frames_per_second": (
+                round(self.frames / self._busy_time, 1) if self._busy_time else None
+            ),
+            "frame_gap_ms": round(self.frame_gap * 1000, 3),
+            "turnaround_ms": round(self.turnaround * 1000, 3),
+        }
+
+    @property
+    def frames_per_second(self) -> float:
+        """Return the frames exchanged per second over the last minute."""
+        now = time.monotonic()
+        times = self._frame_times
+        if len(times) == times.maxlen and times[0] >= now - 60:
+            # The history covers less than a minute
+            return round(len(times) / max(now - times[0], 1e-3), 1)
+        return round(sum(1 for t in times if t >= now - 60) / 60, 1)
+
+    async def async_close(self):
+        """Stop the keepalive and close the underlying client."""
+        if self._unsub_keepalive is not None:
+            self._unsub_keepalive()
+            self._unsub_keepalive = None
+        if self.client is not None:
+            async with self._lock:
+                self._drop_connection()
+
+
+async def async_acquire_bus(hass: HomeAssistant, config) -> ModbusBus:
+    """Return the shared bus for a config, creating it on first use."""
+    buses = hass.data[DOMAIN].setdefault(DATA_BUSES, {})
+    key = bus_key(config)
+
+    bus = buses.get(key)
+    if bus is None:
+        bus = ModbusBus(hass, key, config)
+        buses[key] = bus
+        bus.async_start_keepalive()
+    elif (
+        config.get(CONF_CONNECTION_METHOD) == METHOD_RS485
+        and line_settings(config) != line_settings(bus.config)
+    ):
+        _LOGGER.warning(
+            f"Serial port {config.get(CONF_SERIAL_PORT)} is already open at "
+            f"{line_settings(bus.config)}, ignoring {line_settings(config)}"
+        )
+
+    bus.refcount += 1
+    _LOGGER.debug(f"Bus {key} acquired ({bus.refcount} users)")
+    return bus
+
+
+async def async_release_bus(hass: HomeAssistant, bus: ModbusBus) -> None:
+    """Drop a reference to a bus and close it when no entry uses it."""
+    bus.refcount -= 1
+    _LOGGER.debug(f"Bus {bus.key} released ({bus.refcount} users)")
+    if bus.refcount > 0:
+        return
+
+    hass.data[DOMAIN].get(DATA_BUSES, {}).pop(bus.key, None)
+    await bus.async_close()
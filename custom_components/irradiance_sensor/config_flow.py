@@ -1,10 +1,7 @@
 """Config flow for Irradiance Sensor integration."""
 import logging
 import voluptuous as vol
-import json
-import os
 import ipaddress
-import serial.tools.list_ports
 
 from homeassistant import config_entries
 from homeassistant.core import callback
@@ -33,7 +30,92 @@ from .const import (
     CONF_ROW_UNIQUE_ID,
     REG_TYPE_HOLDING,
     REG_TYPE_INPUT,
+    CONF_DATA_TYPE,
+    CONF_WORD_ORDER,
+    CONF_BYTE_ORDER,
+    DATA_TYPES,
+    DATA_TYPE_UINT16,
+    ORDER_BIG,
+    ORDER_LITTLE,
+    CONF_SCAN_INTERVAL,
+    DEFAULT_SCAN_INTERVAL,
+    CONF_DEADBAND,
+    CONF_DEADBAND_PCT,
+    CONF_HEARTBEAT,
+    DEFAULT_DEADBAND,
+    DEFAULT_DEADBAND_PCT,
+    DEFAULT_HEARTBEAT,
+    CONF_AGGREGATE_WINDOW,
+    CONF_AGGREGATE_INTERVAL,
+    DEFAULT_AGGREGATE_WINDOW,
+    CONF_FILTER,
+    CONF_FILTER_WINDOW,
+    CONF_HAMPEL_SIGMA,
+    CONF_MIN_VALUE,
+    CONF_MAX_VALUE,
+    FILTER_NONE,
+    FILTER_METHODS,
+    DEFAULT_FILTER_WINDOW,
+    MAX_FILTER_WINDOW,
+    DEFAULT_HAMPEL_SIGMA,
+    CONF_MAX_REGISTER_GAP,
+    CONF_MAX_BLOCK_SIZE,
+    DEFAULT_MAX_REGISTER_GAP,
+    DEFAULT_MAX_BLOCK_SIZE,
+    CONF_DISCOVER,
+    CONF_NETWORK,
+    CONF_UNIT_IDS,
+    CONF_DISCOVERED,
+    DISCOVERY_TIMEOUT,
+    DISCOVERY_CONCURRENCY,
+    CONF_PROBE,
+    CONF_PROBE_START,
+    CONF_PROBE_END,
+    CONF_PROBE_TYPES,
+    DEFAULT_PROBE_END,
+    PROBE_MAX_LISTED,
+    MODEL_PROBED,
+    CONF_SLAVES,
+    CONF_ADD_SLAVE,
+    CONF_PIPELINE_DEPTH,
+    CONF_PARITY,
+    CONF_STOPBITS,
+    CONF_RTU_THROUGHPUT,
+    PARITY_NONE,
+    PARITY_EVEN,
+    PARITY_ODD,
+    DEFAULT_PARITY,
+    DEFAULT_STOPBITS,
+    DEFAULT_PIPELINE_DEPTH,
+    MAX_PIPELINE_DEPTH,
+    CONF_ADAPTIVE,
+    CONF_NIGHT_ELEVATION,
+    CONF_TWILIGHT_ELEVATION,
+    CONF_NIGHT_INTERVAL,
+    CONF_FAST_INTERVAL,
+    CONF_VARIABILITY,
+    DEFAULT_NIGHT_ELEVATION,
+    DEFAULT_TWILIGHT_ELEVATION,
+    DEFAULT_NIGHT_INTERVAL,
+    DEFAULT_FAST_INTERVAL,
+    DEFAULT_VARIABILITY,
+    CONF_DERIVED,
+    CONF_NOCT,
+    CONF_SANDIA_MOUNT,
+    CONF_FAST_START,
+    CONF_SAMPLE_STORE,
+    CONF_SAMPLE_CAPACITY,
+    DEFAULT_SAMPLE_CAPACITY,
+    MAX_SAMPLE_CAPACITY,
+    DEFAULT_FAST_START,
+    DEFAULT_DERIVED,
+    DEFAULT_NOCT,
+    DEFAULT_SANDIA_MOUNT,
+    SANDIA_MOUNTS,
 )
+from .discovery import async_scan_network, parse_network, parse_unit_ids
+from .probe import async_probe_registers, suggest_template
+from .template_registry import get_template_registry
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -42,6 +124,12 @@ class IrradianceSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow."""
+        return IrradianceSensorOptionsFlow(config_entry)
+
     def __init__(self):
         """Initialize."""
         self.data = {}
@@ -51,34 +139,22 @@ class IrradianceSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self._param_keys = []
         self._current_param_idx = 0
         self._collected_params = {}
+        self._responders = []
+        self._probe_results = {}
+        # Slaves already configured when more units share the RS485 line
+        self._devices = []
 
-    def _get_templates_path(self):
-        """Get path to templates.json."""
-        # For this environment, we use the relative path to where the file is.
-        return os.path.join(os.path.dirname(__file__), "templates.json")
-
-    def _load_templates(self):
-        """Load templates from JSON."""
-        path = self._get_templates_path()
-        try:
-            if os.path.exists(path):
-                with open(path, 'r') as f:
-                    data = json.load(f)
-                    self.templates = []
-                    self.loaded_templates = {}
-                    for item in data:
-                        name = item.get("name")
-                        if name:
-                            self.templates.append(name)
-                            self.loaded_templates[name] = item.get("registers", {})
-            else:
-                 self.templates = ["Generic Irradiance"]
-        except Exception as e:
-            _LOGGER.error(f"Error loading templates: {e}")
-            self.templates = ["Generic Irradiance"]
+    async def _async_load_templates(self):
+        """Load templates from the shared registry."""
+        templates = await get_template_registry(self.hass).async_get_templates()
+        self.templates = list(templates)
+        self.loaded_templates = templates
 
     def _get_serial_ports(self):
         """Get list of system serial ports."""
+        # pyserial is only needed once someone sets up an RS485 device
+        import serial.tools.list_ports
+
         try:
             return [p.device for p in serial.tools.list_ports.comports()]
         except Exception as e:
@@ -91,7 +167,10 @@ class IrradianceSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         
         if user_input is not None:
             self.selected_method = user_input[CONF_CONNECTION_METHOD]
+            discover = user_input.pop(CONF_DISCOVER, False)
             self.data.update(user_input)
+            if discover and self.selected_method == METHOD_MODBUS_TCP:
+                return await self.async_step_network_scan()
             return await self.async_step_setup_params()
 
         schema = vol.Schema({
@@ -101,18 +180,93 @@ class IrradianceSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     mode=selector.SelectSelectorMode.DROPDOWN
                 )
             ),
+            # Only used with Modbus TCP
+            vol.Optional(CONF_DISCOVER, default=False): bool,
         })
 
         return self.async_show_form(
             step_id="user", data_schema=schema, errors=errors
         )
 
+    async def async_step_network_scan(self, user_input=None):
+        """Scan a network range for Modbus TCP units."""
+        errors = {}
+
+        if user_input is not None:
+            try:
+                hosts = parse_network(user_input[CONF_NETWORK])
+            except ValueError:
+                errors[CONF_NETWORK] = "invalid_network"
+            try:
+                unit_ids = parse_unit_ids(user_input[CONF_UNIT_IDS])
+            except ValueError:
+                errors[CONF_UNIT_IDS] = "invalid_unit_ids"
+
+            port = int(user_input.get(CONF_PORT, 502))
+            if not (1 <= port <= 65535):
+                errors[CONF_PORT] = "invalid_port"
+
+            if not errors:
+                templates = await get_template_registry(self.hass).async_get_templates()
+                self._responders = await async_scan_network(
+                    hosts,
+                    port,
+                    unit_ids,
+                    templates,
+                    timeout=DISCOVERY_TIMEOUT,
+                    concurrency=DISCOVERY_CONCURRENCY,
+                )
+                if self._responders:
+                    return await self.async_step_network_select()
+                errors["base"] = "no_devices_found"
+
+        schema = vol.Schema({
+            vol.Required(CONF_NETWORK): str,
+            vol.Required(CONF_PORT, default=502): int,
+            vol.Required(CONF_UNIT_IDS, default="1"): str,
+        })
+
+        return self.async_show_form(
+            step_id="network_scan", data_schema=schema, errors=errors
+        )
+
+    async def async_step_network_select(self, user_input=None):
+        """Pick one of the discovered units."""
+        if user_input is not None:
+            responder = self._responders[int(user_input[CONF_DISCOVERED])]
+            self.data[CONF_IP_ADDRESS] = responder.host
+            self.data[CONF_PORT] = responder.port
+            self.data[CONF_MODBUS_ID] = responder.unit_id
+            if responder.templates:
+                self.data[CONF_SENSOR_MODEL] = responder.templates[0]
+            # Connection details are pre-filled, the user still reviews them
+            return await self.async_step_setup_params()
+
+        options = [
+            {"value": str(idx), "label": responder.label}
+            for idx, responder in enumerate(self._responders)
+        ]
+        schema = vol.Schema({
+            vol.Required(CONF_DISCOVERED, default="0"): selector.SelectSelector(
+                selector.SelectSelectorConfig(
+                    options=options,
+                    mode=selector.SelectSelectorMode.LIST
+                )
+            ),
+        })
+
+        return self.async_show_form(
+            step_id="network_select",
+            data_schema=schema,
+            description_placeholders={"count": str(len(self._responders))},
+        )
+
     async def async_step_setup_params(self, user_input=None):
         """Handle the second step (Connection Details & Model)."""
         errors = {}
         
-        # Load templates dynamically
-        await self.hass.async_add_executor_job(self._load_templates)
+        # Templates are cached by the registry, this is cheap on every render
+        await self._async_load_templates()
         
         if user_input is not None:
             # Validate input based on method
@@ -135,16 +289,34 @@ class IrradianceSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                  errors[CONF_MODBUS_ID] = "invalid_modbus_id"
 
             if not errors:
+                probe = user_input.pop(CONF_PROBE, False)
                 self.data.update(user_input)
+                # Number selectors return floats
+                self.data[CONF_MAX_REGISTER_GAP] = int(user_input.get(CONF_MAX_REGISTER_GAP, DEFAULT_MAX_REGISTER_GAP))
+                self.data[CONF_MAX_BLOCK_SIZE] = int(user_input.get(CONF_MAX_BLOCK_SIZE, DEFAULT_MAX_BLOCK_SIZE))
+                if CONF_PIPELINE_DEPTH in user_input:
+                    self.data[CONF_PIPELINE_DEPTH] = int(user_input[CONF_PIPELINE_DEPTH])
+                if CONF_STOPBITS in user_input:
+                    self.data[CONF_STOPBITS] = int(user_input[CONF_STOPBITS])
+                if probe:
+                    return await self.async_step_probe()
                 return await self.async_step_select_sensors()
 
         # Build schema dynamically
         schema_dict = {}
 
         if self.selected_method == METHOD_MODBUS_TCP:
-            schema_dict[vol.Required(CONF_IP_ADDRESS)] = str
-            schema_dict[vol.Required(CONF_PORT, default=502)] = int
-            schema_dict[vol.Required(CONF_MODBUS_ID, default=1)] = int
+            # Values may be pre-filled by the network scan
+            if self.data.get(CONF_IP_ADDRESS):
+                schema_dict[vol.Required(CONF_IP_ADDRESS, default=self.data[CONF_IP_ADDRESS])] = str
+            else:
+                schema_dict[vol.Required(CONF_IP_ADDRESS)] = str
+            schema_dict[vol.Required(CONF_PORT, default=self.data.get(CONF_PORT, 502))] = int
+            schema_dict[vol.Required(CONF_MODBUS_ID, default=self.data.get(CONF_MODBUS_ID, 1))] = int
+            # Requests in flight at once, for gateways that handle several transactions
+            schema_dict[vol.Optional(CONF_PIPELINE_DEPTH, default=DEFAULT_PIPELINE_DEPTH)] = selector.NumberSelector(
+                selector.NumberSelectorConfig(min=1, max=MAX_PIPELINE_DEPTH, mode=selector.NumberSelectorMode.BOX)
+            )
 
         elif self.selected_method == METHOD_RS485:
             # Get ports
@@ -165,11 +337,36 @@ class IrradianceSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     mode=selector.SelectSelectorMode.DROPDOWN
                 )
             )
+            schema_dict[vol.Optional(CONF_PARITY, default=DEFAULT_PARITY)] = selector.SelectSelector(
+                selector.SelectSelectorConfig(
+                    options=[PARITY_NONE, PARITY_EVEN, PARITY_ODD],
+                    mode=selector.SelectSelectorMode.DROPDOWN,
+                    translation_key=CONF_PARITY,
+                )
+            )
+            schema_dict[vol.Optional(CONF_STOPBITS, default=str(DEFAULT_STOPBITS))] = selector.SelectSelector(
+                selector.SelectSelectorConfig(
+                    options=["1", "2"],
+                    mode=selector.SelectSelectorMode.DROPDOWN
+                )
+            )
+            # Time frames from the actual character length instead of the spec's fixed values
+            schema_dict[vol.Optional(CONF_RTU_THROUGHPUT, default=False)] = bool
             schema_dict[vol.Required(CONF_MODBUS_ID, default=1)] = int
 
+        # Read coalescing limits (shared by both transports)
+        schema_dict[vol.Optional(CONF_MAX_REGISTER_GAP, default=DEFAULT_MAX_REGISTER_GAP)] = selector.NumberSelector(
+            selector.NumberSelectorConfig(min=0, max=124, mode=selector.NumberSelectorMode.BOX)
+        )
+        schema_dict[vol.Optional(CONF_MAX_BLOCK_SIZE, default=DEFAULT_MAX_BLOCK_SIZE)] = selector.NumberSelector(
+            selector.NumberSelectorConfig(min=1, max=125, mode=selector.NumberSelectorMode.BOX)
+        )
+
         # Common Sensor Model Selection
         # Ensure we have at least one template, defaulting to Generic if list empty (though handled in _load mostly)
         default_model = self.templates[0] if self.templates else "Generic Irradiance"
+        if self.data.get(CONF_SENSOR_MODEL) in self.templates:
+            default_model = self.data[CONF_SENSOR_MODEL]
         
         schema_dict[vol.Required(CONF_SENSOR_MODEL, default=default_model)] = selector.SelectSelector(
                 selector.SelectSelectorConfig(
@@ -178,34 +375,107 @@ class IrradianceSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 )
             )
 
+        # Detect the register map instead of using the selected model
+        schema_dict[vol.Optional(CONF_PROBE, default=False)] = bool
+
         return self.async_show_form(
             step_id="setup_params", data_schema=vol.Schema(schema_dict), errors=errors
         )
 
-    def _save_template(self, name, registers):
-        """Save a new template to JSON."""
-        path = self._get_templates_path()
+    async def _async_run_probe(self, reg_types, start, end):
+        """Probe the configured device and return {register type: {address: value}}."""
+        from .bus import async_acquire_bus, async_release_bus
+
+        # The bus registry lives in hass.data, which may not exist before the first entry
+        self.hass.data.setdefault(DOMAIN, {})
+        bus = await async_acquire_bus(self.hass, self.data)
+        slave_id = int(self.data.get(CONF_MODBUS_ID, 1))
+
+        async def read(reg_type, address, count):
+            return await bus.async_execute(bus.async_read, reg_type, address, count, slave_id)
+
+        results = {}
         try:
-            current_data = []
-            if os.path.exists(path):
-                with open(path, 'r') as f:
-                    current_data = json.load(f)
-            
-            # Check if exists and update, or append
-            found = False
-            for item in current_data:
-                if item.get("name") == name:
-                    item["registers"] = registers
-                    found = True
-                    break
-            if not found:
-                current_data.append({"name": name, "registers": registers})
-                
-            with open(path, 'w') as f:
-                json.dump(current_data, f, indent=2)
-                
-        except Exception as e:
-            _LOGGER.error(f"Error saving template: {e}")
+            if not await bus.async_execute(bus.async_connect):
+                return None
+            for reg_type in reg_types:
+                found, requests = await async_probe_registers(read, reg_type, start, end)
+                _LOGGER.debug(f"Probe of {reg_type} {start}-{end}: {len(found)} registers in {requests} requests")
+                results[reg_type] = found
+        finally:
+            await async_release_bus(self.hass, bus)
+        return results
+
+    async def async_step_probe(self, user_input=None):
+        """Sweep an address range to detect the populated registers."""
+        errors = {}
+
+        if user_input is not None:
+            start = int(user_input[CONF_PROBE_START])
+            end = int(user_input[CONF_PROBE_END])
+            reg_types = user_input.get(CONF_PROBE_TYPES) or [REG_TYPE_INPUT]
+            if end < start:
+                errors[CONF_PROBE_END] = "invalid_probe_range"
+            else:
+                results = await self._async_run_probe(reg_types, start, end)
+                if results is None:
+                    errors["base"] = "cannot_connect"
+                elif not any(results.values()):
+                    errors["base"] = "no_registers_found"
+                else:
+                    self._probe_results = results
+                    return await self.async_step_probe_result()
+
+        schema = vol.Schema({
+            vol.Required(CONF_PROBE_START, default=0): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=0, max=65535, mode=selector.NumberSelectorMode.BOX)
+            ),
+            vol.Required(CONF_PROBE_END, default=DEFAULT_PROBE_END): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=0, max=65535, mode=selector.NumberSelectorMode.BOX)
+            ),
+            vol.Required(CONF_PROBE_TYPES, default=[REG_TYPE_INPUT, REG_TYPE_HOLDING]): selector.SelectSelector(
+                selector.SelectSelectorConfig(
+                    options=[
+                        {"label": "Input Register (04)", "value": REG_TYPE_INPUT},
+                        {"label": "Holding Register (03)", "value": REG_TYPE_HOLDING},
+                    ],
+                    mode=selector.SelectSelectorMode.LIST,
+                    multiple=True
+                )
+            ),
+        })
+
+        return self.async_show_form(
+            step_id="probe", data_schema=schema, errors=errors
+        )
+
+    async def async_step_probe_result(self, user_input=None):
+        """Show the probe results and use them as the model template."""
+        registers = suggest_template(self._probe_results)
+
+        if user_input is not None:
+            # The suggestion behaves like any other template from here on
+            self.loaded_templates = {**self.loaded_templates, MODEL_PROBED: registers}
+            self.data[CONF_SENSOR_MODEL] = MODEL_PROBED
+            return await self.async_step_select_sensors()
+
+        lines = []
+        for reg_type, found in self._probe_results.items():
+            populated = sorted(found)
+            lines.append(f"{reg_type}: {len(populated)} registers")
+            for addr in populated[:PROBE_MAX_LISTED]:
+                lines.append(f"- {reg_type} {addr} = {found[addr]}")
+            if len(populated) > PROBE_MAX_LISTED:
+                lines.append(f"- ... {len(populated) - PROBE_MAX_LISTED} more")
+
+        return self.async_show_form(
+            step_id="probe_result",
+            data_schema=vol.Schema({}),
+            description_placeholders={
+                "results": "\n".join(lines),
+                "suggested": str(len(registers)),
+            },
+        )
 
     async def async_step_select_sensors(self, user_input=None):
         """Allow user to select which sensors to configure."""
@@ -216,7 +486,7 @@ class IrradianceSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         
         # Ensure templates are loaded
         if not self.loaded_templates:
-            await self.hass.async_add_executor_job(self._load_templates)
+            await self._async_load_templates()
             
         defaults = DEFAULT_REGISTERS
         if selected_model in self.loaded_templates:
@@ -280,6 +550,10 @@ class IrradianceSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         is_enabled_default = True
         
         current_def = self._current_defaults.get(current_key, def_vals)
+        default_uid = current_def.get("unique_id", f"{current_key}_modbus")
+        if self._devices:
+            # Further slaves often reuse a model, keep their unique IDs apart
+            default_uid = f"{default_uid}_{self.data[CONF_MODBUS_ID]}"
         
         if user_input is not None:
             # Save the collected input for this parameter
@@ -291,6 +565,21 @@ class IrradianceSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             self._collected_params[f"{current_key}_addr"] = int(user_input.get("addr"))
             self._collected_params[f"{current_key}_gain"] = float(user_input.get("gain"))
             self._collected_params[f"{current_key}_offset"] = float(user_input.get("offset"))
+            self._collected_params[f"{current_key}_{CONF_DATA_TYPE}"] = user_input.get(CONF_DATA_TYPE, DATA_TYPE_UINT16)
+            self._collected_params[f"{current_key}_{CONF_WORD_ORDER}"] = user_input.get(CONF_WORD_ORDER, ORDER_BIG)
+            self._collected_params[f"{current_key}_{CONF_BYTE_ORDER}"] = user_input.get(CONF_BYTE_ORDER, ORDER_BIG)
+            self._collected_params[f"{current_key}_{CONF_SCAN_INTERVAL}"] = int(user_input.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL))
+            self._collected_params[f"{current_key}_{CONF_DEADBAND}"] = float(user_input.get(CONF_DEADBAND, DEFAULT_DEADBAND))
+            self._collected_params[f"{current_key}_{CONF_DEADBAND_PCT}"] = float(user_input.get(CONF_DEADBAND_PCT, DEFAULT_DEADBAND_PCT))
+            self._collected_params[f"{current_key}_{CONF_HEARTBEAT}"] = int(user_input.get(CONF_HEARTBEAT, DEFAULT_HEARTBEAT))
+            self._collected_params[f"{current_key}_{CONF_AGGREGATE_WINDOW}"] = int(user_input.get(CONF_AGGREGATE_WINDOW, DEFAULT_AGGREGATE_WINDOW))
+            self._collected_params[f"{current_key}_{CONF_AGGREGATE_INTERVAL}"] = int(user_input.get(CONF_AGGREGATE_INTERVAL, 0))
+            self._collected_params[f"{current_key}_{CONF_FILTER}"] = user_input.get(CONF_FILTER, FILTER_NONE)
+            self._collected_params[f"{current_key}_{CONF_FILTER_WINDOW}"] = int(user_input.get(CONF_FILTER_WINDOW, DEFAULT_FILTER_WINDOW))
+            self._collected_params[f"{current_key}_{CONF_HAMPEL_SIGMA}"] = float(user_input.get(CONF_HAMPEL_SIGMA, DEFAULT_HAMPEL_SIGMA))
+            # Empty limits leave that side unchecked
+            self._collected_params[f"{current_key}_{CONF_MIN_VALUE}"] = user_input.get(CONF_MIN_VALUE)
+            self._collected_params[f"{current_key}_{CONF_MAX_VALUE}"] = user_input.get(CONF_MAX_VALUE)
             
             # Next parameter
             self._current_param_idx += 1
@@ -300,7 +589,7 @@ class IrradianceSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         schema_dict = {
             # Enabled field removed as selection happened in previous step
             vol.Optional("name", default=current_key.replace("_", " ").title()): selector.TextSelector(),
-            vol.Optional(CONF_ROW_UNIQUE_ID, default=current_def.get("unique_id", f"{current_key}_modbus")): selector.TextSelector(),
+            vol.Optional(CONF_ROW_UNIQUE_ID, default=default_uid): selector.TextSelector(),
             vol.Optional(CONF_REGISTER_TYPE, default=current_def.get("type", REG_TYPE_INPUT)): selector.SelectSelector(
                 selector.SelectSelectorConfig(
                     options=[
@@ -313,12 +602,71 @@ class IrradianceSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             vol.Optional("addr", default=current_def.get("addr", 0)): selector.NumberSelector(
                 selector.NumberSelectorConfig(min=0, max=65535, mode=selector.NumberSelectorMode.BOX)
             ),
+            vol.Optional(CONF_DATA_TYPE, default=current_def.get(CONF_DATA_TYPE, DATA_TYPE_UINT16)): selector.SelectSelector(
+                selector.SelectSelectorConfig(
+                    options=list(DATA_TYPES),
+                    mode=selector.SelectSelectorMode.DROPDOWN
+                )
+            ),
+            # Only relevant for values spanning several registers / bytes
+            vol.Optional(CONF_WORD_ORDER, default=current_def.get(CONF_WORD_ORDER, ORDER_BIG)): selector.SelectSelector(
+                selector.SelectSelectorConfig(
+                    options=[ORDER_BIG, ORDER_LITTLE],
+                    mode=selector.SelectSelectorMode.DROPDOWN
+                )
+            ),
+            vol.Optional(CONF_BYTE_ORDER, default=current_def.get(CONF_BYTE_ORDER, ORDER_BIG)): selector.SelectSelector(
+                selector.SelectSelectorConfig(
+                    options=[ORDER_BIG, ORDER_LITTLE],
+                    mode=selector.SelectSelectorMode.DROPDOWN
+                )
+            ),
             vol.Optional("gain", default=current_def.get("gain", 1.0)): selector.NumberSelector(
                 selector.NumberSelectorConfig(step="any", mode=selector.NumberSelectorMode.BOX)
             ),
             vol.Optional("offset", default=current_def.get("offset", 0.0)): selector.NumberSelector(
                 selector.NumberSelectorConfig(step="any", mode=selector.NumberSelectorMode.BOX)
             ),
+            vol.Optional(CONF_SCAN_INTERVAL, default=current_def.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=1, max=3600, unit_of_measurement="s", mode=selector.NumberSelectorMode.BOX)
+            ),
+            # Publishing: absolute and relative deadband plus heartbeat (0 disables)
+            vol.Optional(CONF_DEADBAND, default=current_def.get(CONF_DEADBAND, DEFAULT_DEADBAND)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=0, step="any", mode=selector.NumberSelectorMode.BOX)
+            ),
+            vol.Optional(CONF_DEADBAND_PCT, default=current_def.get(CONF_DEADBAND_PCT, DEFAULT_DEADBAND_PCT)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=0, max=100, step="any", unit_of_measurement="%", mode=selector.NumberSelectorMode.BOX)
+            ),
+            vol.Optional(CONF_HEARTBEAT, default=current_def.get(CONF_HEARTBEAT, DEFAULT_HEARTBEAT)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=0, max=86400, unit_of_measurement="s", mode=selector.NumberSelectorMode.BOX)
+            ),
+            # Aggregation: window length (0 disables) and publish interval (0 = once per window)
+            vol.Optional(CONF_AGGREGATE_WINDOW, default=current_def.get(CONF_AGGREGATE_WINDOW, DEFAULT_AGGREGATE_WINDOW)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=0, max=86400, unit_of_measurement="s", mode=selector.NumberSelectorMode.BOX)
+            ),
+            vol.Optional(CONF_AGGREGATE_INTERVAL, default=current_def.get(CONF_AGGREGATE_INTERVAL, 0)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=0, max=86400, unit_of_measurement="s", mode=selector.NumberSelectorMode.BOX)
+            ),
+            # Filtering: physical limits, then a median or Hampel filter over the last samples
+            vol.Optional(CONF_MIN_VALUE, description={"suggested_value": current_def.get(CONF_MIN_VALUE)}): selector.NumberSelector(
+                selector.NumberSelectorConfig(step="any", mode=selector.NumberSelectorMode.BOX)
+            ),
+            vol.Optional(CONF_MAX_VALUE, description={"suggested_value": current_def.get(CONF_MAX_VALUE)}): selector.NumberSelector(
+                selector.NumberSelectorConfig(step="any", mode=selector.NumberSelectorMode.BOX)
+            ),
+            vol.Optional(CONF_FILTER, default=current_def.get(CONF_FILTER, FILTER_NONE)): selector.SelectSelector(
+                selector.SelectSelectorConfig(
+                    options=FILTER_METHODS,
+                    mode=selector.SelectSelectorMode.DROPDOWN,
+                    translation_key=CONF_FILTER,
+                )
+            ),
+            vol.Optional(CONF_FILTER_WINDOW, default=current_def.get(CONF_FILTER_WINDOW, DEFAULT_FILTER_WINDOW)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=3, max=MAX_FILTER_WINDOW, mode=selector.NumberSelectorMode.BOX)
+            ),
+            vol.Optional(CONF_HAMPEL_SIGMA, default=current_def.get(CONF_HAMPEL_SIGMA, DEFAULT_HAMPEL_SIGMA)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=0.5, max=10, step="any", mode=selector.NumberSelectorMode.BOX)
+            ),
         }
 
         return self.async_show_form(
@@ -328,6 +676,46 @@ class IrradianceSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors=errors
         )
 
+    async def async_step_add_slave(self, user_input=None):
+        """Add another unit on the same RS485 line."""
+        errors = {}
+
+        await self._async_load_templates()
+
+        if user_input is not None:
+            modbus_id = user_input.get(CONF_MODBUS_ID)
+            if not (1 <= modbus_id <= 247):
+                errors[CONF_MODBUS_ID] = "invalid_modbus_id"
+            elif any(device[CONF_MODBUS_ID] == modbus_id for device in self._devices):
+                errors[CONF_MODBUS_ID] = "duplicate_modbus_id"
+
+            if not errors:
+                # The sensor steps read the current slave from self.data
+                self.data.update(user_input)
+                return await self.async_step_select_sensors()
+
+        used = {device[CONF_MODBUS_ID] for device in self._devices}
+        next_id = next((i for i in range(1, 248) if i not in used), 1)
+        default_model = self.data.get(CONF_SENSOR_MODEL)
+        if default_model not in self.templates:
+            default_model = self.templates[0]
+        schema = vol.Schema({
+            vol.Required(CONF_MODBUS_ID, default=next_id): int,
+            vol.Required(CONF_SENSOR_MODEL, default=default_model): selector.SelectSelector(
+                selector.SelectSelectorConfig(
+                    options=self.templates,
+                    mode=selector.SelectSelectorMode.DROPDOWN
+                )
+            ),
+        })
+
+        return self.async_show_form(
+            step_id="add_slave",
+            data_schema=schema,
+            errors=errors,
+            description_placeholders={"count": str(len(self._devices))},
+        )
+
     async def async_step_final_config(self, user_input=None):
         """Final step to set entity name and save template."""
         errors = {}
@@ -344,17 +732,43 @@ class IrradianceSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                             "gain": self._collected_params.get(f"{key}_gain"),
                             "offset": self._collected_params.get(f"{key}_offset"),
                             "type": self._collected_params.get(f"{key}_{CONF_REGISTER_TYPE}"),
+                            CONF_DATA_TYPE: self._collected_params.get(f"{key}_{CONF_DATA_TYPE}"),
+                            CONF_WORD_ORDER: self._collected_params.get(f"{key}_{CONF_WORD_ORDER}"),
+                            CONF_BYTE_ORDER: self._collected_params.get(f"{key}_{CONF_BYTE_ORDER}"),
+                            CONF_SCAN_INTERVAL: self._collected_params.get(f"{key}_{CONF_SCAN_INTERVAL}"),
+                            CONF_DEADBAND: self._collected_params.get(f"{key}_{CONF_DEADBAND}"),
+                            CONF_DEADBAND_PCT: self._collected_params.get(f"{key}_{CONF_DEADBAND_PCT}"),
+                            CONF_HEARTBEAT: self._collected_params.get(f"{key}_{CONF_HEARTBEAT}"),
+                            CONF_AGGREGATE_WINDOW: self._collected_params.get(f"{key}_{CONF_AGGREGATE_WINDOW}"),
+                            CONF_AGGREGATE_INTERVAL: self._collected_params.get(f"{key}_{CONF_AGGREGATE_INTERVAL}"),
+                            CONF_FILTER: self._collected_params.get(f"{key}_{CONF_FILTER}"),
+                            CONF_FILTER_WINDOW: self._collected_params.get(f"{key}_{CONF_FILTER_WINDOW}"),
+                            CONF_HAMPEL_SIGMA: self._collected_params.get(f"{key}_{CONF_HAMPEL_SIGMA}"),
+                            CONF_MIN_VALUE: self._collected_params.get(f"{key}_{CONF_MIN_VALUE}"),
+                            CONF_MAX_VALUE: self._collected_params.get(f"{key}_{CONF_MAX_VALUE}"),
                             "unique_id": self._collected_params.get(f"{key}_{CONF_ROW_UNIQUE_ID}")
                         }
                 
-                await self.hass.async_add_executor_job(
-                    self._save_template, 
-                    user_input.get(CONF_TEMPLATE_NAME), 
+                await get_template_registry(self.hass).async_save_template(
+                    user_input.get(CONF_TEMPLATE_NAME),
                     new_regs
                 )
 
-            # Merge all data
-            final_data = {**self.data, **self._collected_params, **user_input}
+            add_slave = user_input.pop(CONF_ADD_SLAVE, False)
+            self._devices.append({
+                CONF_MODBUS_ID: self.data.get(CONF_MODBUS_ID),
+                CONF_SENSOR_MODEL: self.data.get(CONF_SENSOR_MODEL),
+                **self._collected_params,
+                **user_input,
+            })
+            if add_slave:
+                return await self.async_step_add_slave()
+
+            # Merge all data; the first slave is stored flat, the others under CONF_SLAVES
+            primary, *others = self._devices
+            final_data = {**self.data, **primary}
+            if others:
+                final_data[CONF_SLAVES] = others
             return self.async_create_entry(
                 title=final_data.get(CONF_ENTITY_NAME, "Irradiance Sensor"), 
                 data=final_data
@@ -366,9 +780,73 @@ class IrradianceSensorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             vol.Optional("save_as_template", default=False): bool,
             vol.Optional(CONF_TEMPLATE_NAME): str,
         }
+        if self.selected_method == METHOD_RS485:
+            # Further units daisy-chained on the same line
+            schema_dict[vol.Optional(CONF_ADD_SLAVE, default=False)] = bool
 
         return self.async_show_form(
             step_id="final_config", 
             data_schema=vol.Schema(schema_dict), 
             errors=errors
         )
+
+
+class IrradianceSensorOptionsFlow(config_entries.OptionsFlow):
+    """Handle the per-entry options."""
+
+    def __init__(self, config_entry):
+        """Initialize."""
+        self._entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Configure sun-aware polling, derived metrics and startup."""
+        if user_input is not None:
+            # Number selectors return floats
+            user_input[CONF_NIGHT_INTERVAL] = int(user_input[CONF_NIGHT_INTERVAL])
+            user_input[CONF_FAST_INTERVAL] = int(user_input[CONF_FAST_INTERVAL])
+            user_input[CONF_SAMPLE_CAPACITY] = int(user_input[CONF_SAMPLE_CAPACITY])
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        schema = vol.Schema({
+            vol.Optional(CONF_ADAPTIVE, default=options.get(CONF_ADAPTIVE, False)): bool,
+            # Sun below this elevation (degrees) counts as night
+            vol.Optional(CONF_NIGHT_ELEVATION, default=options.get(CONF_NIGHT_ELEVATION, DEFAULT_NIGHT_ELEVATION)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=-18, max=10, step="any", unit_of_measurement="°", mode=selector.NumberSelectorMode.BOX)
+            ),
+            # Between both elevations it is sunrise or sunset
+            vol.Optional(CONF_TWILIGHT_ELEVATION, default=options.get(CONF_TWILIGHT_ELEVATION, DEFAULT_TWILIGHT_ELEVATION)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=-18, max=45, step="any", unit_of_measurement="°", mode=selector.NumberSelectorMode.BOX)
+            ),
+            vol.Optional(CONF_NIGHT_INTERVAL, default=options.get(CONF_NIGHT_INTERVAL, DEFAULT_NIGHT_INTERVAL)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=1, max=3600, unit_of_measurement="s", mode=selector.NumberSelectorMode.BOX)
+            ),
+            vol.Optional(CONF_FAST_INTERVAL, default=options.get(CONF_FAST_INTERVAL, DEFAULT_FAST_INTERVAL)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=1, max=3600, unit_of_measurement="s", mode=selector.NumberSelectorMode.BOX)
+            ),
+            # Irradiance coefficient of variation that triggers fast polling (0 disables)
+            vol.Optional(CONF_VARIABILITY, default=options.get(CONF_VARIABILITY, DEFAULT_VARIABILITY)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=0, max=100, step="any", unit_of_measurement="%", mode=selector.NumberSelectorMode.BOX)
+            ),
+            # Insolation, cell temperature and ramp rate sensors
+            vol.Optional(CONF_DERIVED, default=options.get(CONF_DERIVED, DEFAULT_DERIVED)): bool,
+            vol.Optional(CONF_NOCT, default=options.get(CONF_NOCT, DEFAULT_NOCT)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=30, max=60, step="any", unit_of_measurement="°C", mode=selector.NumberSelectorMode.BOX)
+            ),
+            vol.Optional(CONF_SANDIA_MOUNT, default=options.get(CONF_SANDIA_MOUNT, DEFAULT_SANDIA_MOUNT)): selector.SelectSelector(
+                selector.SelectSelectorConfig(
+                    options=list(SANDIA_MOUNTS),
+                    mode=selector.SelectSelectorMode.DROPDOWN,
+                    translation_key=CONF_SANDIA_MOUNT,
+                )
+            ),
+            # Restore the last states and poll in the background at startup
+            vol.Optional(CONF_FAST_START, default=options.get(CONF_FAST_START, DEFAULT_FAST_START)): bool,
+            # Keep every raw sample in a fixed-size ring file for export
+            vol.Optional(CONF_SAMPLE_STORE, default=options.get(CONF_SAMPLE_STORE, False)): bool,
+            vol.Optional(CONF_SAMPLE_CAPACITY, default=options.get(CONF_SAMPLE_CAPACITY, DEFAULT_SAMPLE_CAPACITY)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=10000, max=MAX_SAMPLE_CAPACITY, step=1000, mode=selector.NumberSelectorMode.BOX)
+            ),
+        })
+
+        return self.async_show_form(step_id="init", data_schema=schema)
@@ -2,6 +2,20 @@
 
 DOMAIN = "irradiance_sensor"
 
+# Keys used in hass.data[DOMAIN]
+DATA_BUSES = "buses"
+DATA_BUS = "bus"
+DATA_CONFIG = "config"
+DATA_DEVICES = "devices"
+DATA_PLANS = "plans"
+DATA_COORDINATORS = "coordinators"
+DATA_TEMPLATES = "templates"
+DATA_SAMPLES = "samples"
+
+# User templates persisted in .storage
+TEMPLATES_STORAGE_KEY = f"{DOMAIN}.templates"
+TEMPLATES_STORAGE_VERSION = 1
+
 CONF_CONNECTION_METHOD = "connection_method"
 CONF_IP_ADDRESS = "ip_address"
 CONF_PORT = "port"
@@ -14,16 +28,243 @@ CONF_TEMPLATE_NAME = "template_name"
 CONF_ENTITY_NAME = "entity_name"
 CONF_ROW_UNIQUE_ID = "unique_id"
 CONF_REGISTER_TYPE = "register_type"
+CONF_SCAN_INTERVAL = "scan_interval"
+CONF_DEADBAND = "deadband"
+CONF_DEADBAND_PCT = "deadband_pct"
+CONF_HEARTBEAT = "heartbeat"
+CONF_AGGREGATE_WINDOW = "aggregate_window"
+CONF_AGGREGATE_INTERVAL = "aggregate_interval"
+CONF_FILTER = "filter"
+CONF_FILTER_WINDOW = "filter_window"
+CONF_HAMPEL_SIGMA = "hampel_sigma"
+CONF_MIN_VALUE = "min_value"
+CONF_MAX_VALUE = "max_value"
+CONF_DISCOVER = "discover"
+CONF_NETWORK = "network"
+CONF_UNIT_IDS = "unit_ids"
+CONF_DISCOVERED = "discovered"
+CONF_PROBE = "probe"
+CONF_PROBE_START = "probe_start"
+CONF_PROBE_END = "probe_end"
+CONF_PROBE_TYPES = "probe_types"
+CONF_MAX_REGISTER_GAP = "max_register_gap"
+CONF_MAX_BLOCK_SIZE = "max_block_size"
+CONF_PIPELINE_DEPTH = "pipeline_depth"
+CONF_PARITY = "parity"
+CONF_STOPBITS = "stopbits"
+CONF_RTU_THROUGHPUT = "rtu_throughput"
+CONF_SLAVES = "slaves"
+# Per-entry options
+CONF_ADAPTIVE = "adaptive_polling"
+CONF_NIGHT_ELEVATION = "night_elevation"
+CONF_TWILIGHT_ELEVATION = "twilight_elevation"
+CONF_NIGHT_INTERVAL = "night_interval"
+CONF_FAST_INTERVAL = "fast_interval"
+CONF_VARIABILITY = "variability_threshold"
+CONF_DERIVED = "derived_metrics"
+CONF_NOCT = "noct"
+CONF_SANDIA_MOUNT = "sandia_mount"
+CONF_FAST_START = "fast_start"
+CONF_SAMPLE_STORE = "sample_store"
+CONF_SAMPLE_CAPACITY = "sample_capacity"
+CONF_ADD_SLAVE = "add_slave"
 
 REG_TYPE_HOLDING = "holding"
 REG_TYPE_INPUT = "input"
 
+CONF_DATA_TYPE = "data_type"
+CONF_WORD_ORDER = "word_order"
+CONF_BYTE_ORDER = "byte_order"
+
+DATA_TYPE_UINT16 = "uint16"
+DATA_TYPE_INT16 = "int16"
+DATA_TYPE_UINT32 = "uint32"
+DATA_TYPE_INT32 = "int32"
+DATA_TYPE_FLOAT32 = "float32"
+DATA_TYPE_FLOAT64 = "float64"
+
+# Data type -> (struct code, registers)
+DATA_TYPES = {
+    DATA_TYPE_UINT16: ("H", 1),
+    DATA_TYPE_INT16: ("h", 1),
+    DATA_TYPE_UINT32: ("I", 2),
+    DATA_TYPE_INT32: ("i", 2),
+    DATA_TYPE_FLOAT32: ("f", 2),
+    DATA_TYPE_FLOAT64: ("d", 4),
+}
+
+ORDER_BIG = "big"
+ORDER_LITTLE = "little"
+
+
+# Default poll interval for a sensor (seconds)
+DEFAULT_SCAN_INTERVAL = 30
+
+# State publishing defaults: publish any change, no forced republish
+DEFAULT_DEADBAND = 0.0
+DEFAULT_DEADBAND_PCT = 0.0
+DEFAULT_HEARTBEAT = 0
+
+# Windowed aggregation: window length in seconds (0 disables) and the
+# statistics published for it
+DEFAULT_AGGREGATE_WINDOW = 0
+AGGREGATE_STATS = ("mean", "min", "max")
+# Ring slots beyond window / interval, for polls landing early within the tick slack
+AGGREGATE_HEADROOM = 2
+
+# Outlier filtering of raw channels: window in samples and the Hampel
+# threshold in (scaled) median absolute deviations
+FILTER_NONE = "none"
+FILTER_MEDIAN = "median"
+FILTER_HAMPEL = "hampel"
+FILTER_METHODS = [FILTER_NONE, FILTER_MEDIAN, FILTER_HAMPEL]
+DEFAULT_FILTER_WINDOW = 5
+MAX_FILTER_WINDOW = 61
+DEFAULT_HAMPEL_SIGMA = 3.0
+
+# Read coalescing defaults (in registers)
+DEFAULT_MAX_REGISTER_GAP = 10
+DEFAULT_MAX_BLOCK_SIZE = 64
+
+# Seconds to wait for a connection or a single request
+DEFAULT_TIMEOUT = 3
+
+# RS485 character framing (always 8 data bits)
+PARITY_NONE = "N"
+PARITY_EVEN = "E"
+PARITY_ODD = "O"
+DEFAULT_PARITY = PARITY_NONE
+DEFAULT_STOPBITS = 1
+# RTU timing. The spec counts 11-bit characters and fixes t3.5 at 1.75 ms
+# above 19200 baud; throughput mode times 3.5 real characters at any baud
+# and adds a turnaround of 1.5 characters before addressing another unit
+RTU_SPEC_CHAR_BITS = 11
+RTU_FIXED_GAP_BAUDRATE = 19200
+RTU_FIXED_FRAME_GAP = 0.00175
+RTU_TURNAROUND_CHARS = 1.5
+# Frame end times kept for the frames per second figure
+FRAME_HISTORY = 1000
+
+# Adaptive request timeouts: once enough answers have been seen, a request
+# may take the p99 response latency times a safety factor (within the
+# bounds below, in seconds) plus the time its frames spend on the wire
+TIMEOUT_LATENCY_FACTOR = 3.0
+MIN_REQUEST_TIMEOUT = 0.2
+TIMEOUT_MIN_SAMPLES = 20
+LATENCY_HISTORY = 100
+# Re-reads of timed out blocks allowed per poll
+POLL_RETRY_BUDGET = 1
+
+# Add entities with their restored state and run the first poll in the
+# background instead of holding up startup
+DEFAULT_FAST_START = True
+
+# Modbus TCP requests in flight per connection (1 = strictly serial)
+DEFAULT_PIPELINE_DEPTH = 1
+MAX_PIPELINE_DEPTH = 16
+
+# Adaptive polling: sun elevations in degrees, intervals in seconds and the
+# irradiance coefficient of variation (%) that counts as a variable sky
+DEFAULT_NIGHT_ELEVATION = -3.0
+DEFAULT_TWILIGHT_ELEVATION = 10.0
+DEFAULT_NIGHT_INTERVAL = 600
+DEFAULT_FAST_INTERVAL = 5
+DEFAULT_VARIABILITY = 20.0
+VARIABILITY_SAMPLES = 10
+# Below this mean irradiance (W/m²) the variation is not meaningful
+VARIABILITY_MIN_IRRADIANCE = 50.0
+
+POLL_MODE_NIGHT = "night"
+POLL_MODE_TWILIGHT = "twilight"
+POLL_MODE_DAY = "day"
+POLL_MODE_VARIABLE = "variable"
+
+# Derived metrics computed from the raw channels
+DERIVED_INSOLATION = "insolation"
+DERIVED_CELL_TEMP_NOCT = "cell_temp_noct"
+DERIVED_CELL_TEMP_SANDIA = "cell_temp_sandia"
+DERIVED_RAMP_RATE = "ramp_rate"
+# Input channels, by sensor key (the first ambient key present is used)
+AMBIENT_TEMP_KEYS = ("temp_amb", "temp_ext")
+WIND_SPEED_KEY = "wind_v"
+DEFAULT_DERIVED = True
+DEFAULT_NOCT = 45.0
+# Sandia module temperature model coefficients (a, b, deltaT) per mounting
+SANDIA_MOUNTS = {
+    "open_rack_glass_glass": (-3.47, -0.0594, 3.0),
+    "close_mount_glass_glass": (-2.98, -0.0471, 1.0),
+    "open_rack_glass_polymer": (-3.56, -0.0750, 3.0),
+    "insulated_back_glass_polymer": (-2.81, -0.0455, 0.0),
+}
+DEFAULT_SANDIA_MOUNT = "open_rack_glass_polymer"
+# Samples further apart (seconds) are not integrated across
+MAX_INTEGRATION_GAP = 900
+
+# Backfill: hourly statistics per import call, file lines read per
+# executor job, and history records decoded per block read
+BACKFILL_CHUNK_HOURS = 168
+BACKFILL_READ_LINES = 5000
+SERVICE_BACKFILL = "backfill"
+BACKFILL_SOURCE_DEVICE = "device"
+BACKFILL_SOURCE_CSV = "csv"
+BACKFILL_SOURCE_BINARY = "binary"
+
+# Raw sample store: one fixed-size ring file per entry under the config
+# directory. Capacity is in records; records are read this many at a
+# time when exporting
+SAMPLE_STORE_DIR = "irradiance_sensor"
+DEFAULT_SAMPLE_CAPACITY = 1_000_000
+MAX_SAMPLE_CAPACITY = 50_000_000
+SAMPLE_EXPORT_CHUNK = 5000
+SERVICE_EXPORT_SAMPLES = "export_samples"
+EXPORT_FORMAT_CSV = "csv"
+EXPORT_FORMAT_BINARY = "binary"
+
+# Samples kept for latency percentiles
+STATS_HISTORY = 500
+
+# Connection lifecycle (seconds)
+KEEPALIVE_INTERVAL = 60
+BACKOFF_INITIAL = 2
+BACKOFF_MAX = 300
+BACKOFF_JITTER = 0.25
+# Consecutive timeouts/garbled frames before a pipelined socket is dropped
+MAX_TRANSIENT_ERRORS = 3
+# A unit that stops answering is skipped for a growing while, so it does
+# not hold a shared RS485 line for a full timeout on every poll
+SLAVE_BACKOFF_INITIAL = 5
+SLAVE_BACKOFF_MAX = 120
+
+CONN_STATE_DISCONNECTED = "disconnected"
+CONN_STATE_CONNECTING = "connecting"
+CONN_STATE_CONNECTED = "connected"
+CONN_STATE_BACKOFF = "backoff"
+
+# Modbus exception codes for unsupported function codes and for addresses
+# outside the device map
+MODBUS_ILLEGAL_FUNCTION = 0x01
+MODBUS_ILLEGAL_ADDRESS = 0x02
+# Exception codes a TCP gateway returns when the addressed unit is absent
+MODBUS_GATEWAY_PATH_UNAVAILABLE = 0x0A
+MODBUS_GATEWAY_NO_RESPONSE = 0x0B
+
+# Register map probe
+DEFAULT_PROBE_END = 999
+PROBE_MAX_LISTED = 40
+PROBE_MAX_SUGGESTED = 16
+PROBE_MAX_REQUESTS = 2500
+
+# Network discovery
+DISCOVERY_MAX_HOSTS = 1024
+DISCOVERY_TIMEOUT = 0.5
+DISCOVERY_CONCURRENCY = 128
 
 METHOD_MODBUS_TCP = "Modbus TCP"
 METHOD_RS485 = "RS485"
 
 MODEL_CUSTOM = "Añadir personalizado"
 MODEL_GENERIC = "Generic Irradiance"
+MODEL_PROBED = "Detected registers"
 
 # Default registers configuration (Address, Gain, Offset)
 
@@ -37,6 +278,7 @@ SENSOR_TYPES = {
         "default_gain": 0.1,
         "default_offset": 0.0,
         "default_type": REG_TYPE_INPUT,
+        "default_data_type": DATA_TYPE_UINT16,
     },
     "temp_pv": {
         "name": "PV Module Temperature",
@@ -46,6 +288,7 @@ SENSOR_TYPES = {
         "default_gain": 0.1,
         "default_offset": 0.0,
         "default_type": REG_TYPE_INPUT,
+        "default_data_type": DATA_TYPE_INT16,
     },
     "temp_amb": {
         "name": "Ambient Temperature",
@@ -55,6 +298,7 @@ SENSOR_TYPES = {
         "default_gain": 0.1,
         "default_offset": 0.0,
         "default_type": REG_TYPE_INPUT,
+        "default_data_type": DATA_TYPE_INT16,
     },
 }
 
@@ -64,7 +308,8 @@ DEFAULT_REGISTERS = {
         "addr": v["default_addr"], 
         "gain": v["default_gain"], 
         "offset": v["default_offset"],
-        "type": v["default_type"]
+        "type": v["default_type"],
+        "data_type": v["default_data_type"],
     }
     for k, v in SENSOR_TYPES.items()
 }
\ No newline at end of file
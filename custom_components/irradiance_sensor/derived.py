@@ -0,0 +1,109 @@
+"""Metrics derived from the raw channels as samples arrive."""
+from __future__ import annotations
+
+from datetime import date, datetime
+import math
+
+from .const import (
+    CONF_NOCT,
+    CONF_SANDIA_MOUNT,
+    DEFAULT_NOCT,
+    DEFAULT_SANDIA_MOUNT,
+    SANDIA_MOUNTS,
+    MAX_INTEGRATION_GAP,
+    DERIVED_INSOLATION,
+    DERIVED_CELL_TEMP_NOCT,
+    DERIVED_CELL_TEMP_SANDIA,
+    DERIVED_RAMP_RATE,
+)
+
+# Reference irradiance (W/m²) of the Sandia cell temperature model
+SANDIA_E0 = 1000.0
+# NOCT test conditions: 800 W/m² at 20 °C ambient
+NOCT_IRRADIANCE = 800.0
+NOCT_AMBIENT = 20.0
+
+
+class DerivedMetrics:
+    """Insolation, cell temperature and ramp rate from one device.
+
+    Every update costs O(1): insolation is a trapezoidal running integral
+    reset at local midnight, the ramp rate only needs the previous sample
+    and both cell temperature models are closed-form.
+    """
+
+    def __init__(self, irradiance_key, ambient_key, wind_key, options) -> None:
+        """Initialize."""
+        self.irradiance_key = irradiance_key
+        self.ambient_key = ambient_key
+        self.wind_key = wind_key
+        self.noct = float(options.get(CONF_NOCT, DEFAULT_NOCT))
+        self.sandia = SANDIA_MOUNTS.get(
+            options.get(CONF_SANDIA_MOUNT), SANDIA_MOUNTS[DEFAULT_SANDIA_MOUNT]
+        )
+
+        self.insolation = 0.0 # Wh/m² since local midnight
+        self._day = None
+        self._last = None # (monotonic time, irradiance)
+        self.values = {}
+
+    @property
+    def keys(self) -> list[str]:
+        """Return the metrics this device can provide."""
+        keys = [DERIVED_INSOLATION, DERIVED_RAMP_RATE]
+        if self.ambient_key:
+            keys += [DERIVED_CELL_TEMP_NOCT, DERIVED_CELL_TEMP_SANDIA]
+        return keys
+
+    def restore_insolation(self, value: float, day: date) -> None:
+        """Add the insolation stored before a restart if it is from today."""
+        if self._day is None:
+            self._day = day
+        if day == self._day:
+            self.insolation += value
+            self.values[DERIVED_INSOLATION] = round(self.insolation, 2)
+
+    def update(self, values: dict, now: float, local_now: datetime) -> None:
+        """Process a fresh irradiance sample.
+
+        values holds the latest value of every channel; now is a monotonic
+        timestamp used for the integration step.
+        """
+        irradiance = values.get(self.irradiance_key)
+        if irradiance is None:
+            self._last = None
+            return
+
+        today = local_now.date()
+        if today != self._day:
+            self._day = today
+            self.insolation = 0.0
+
+        ramp_rate = None
+        if self._last is not None:
+            last_time, last_irradiance = self._last
+            elapsed = now - last_time
+            if 0 < elapsed <= MAX_INTEGRATION_GAP:
+                # Sensor offsets can read slightly negative at night
+                self.insolation += (max(0.0, last_irradiance) + max(0.0, irradiance)) / 2 * elapsed / 3600
+                ramp_rate = round((irradiance - last_irradiance) / elapsed * 60, 2)
+        self._last = (now, irradiance)
+
+        self.values[DERIVED_INSOLATION] = round(self.insolation, 2)
+        self.values[DERIVED_RAMP_RATE] = ramp_rate
+
+        ambient = values.get(self.ambient_key) if self.ambient_key else None
+        if ambient is None:
+            self.values[DERIVED_CELL_TEMP_NOCT] = None
+            self.values[DERIVED_CELL_TEMP_SANDIA] = None
+            return
+
+        irradiance = max(0.0, irradiance)
+        self.values[DERIVED_CELL_TEMP_NOCT] = round(
+            ambient + (self.noct - NOCT_AMBIENT) / NOCT_IRRADIANCE * irradiance, 2
+        )
+        # Without an anemometer the model runs at still air
+        wind = values.get(self.wind_key) if self.wind_key else None
+        a, b, delta_t = self.sandia
+        module = irradiance * math.exp(a + b * (wind or 0.0)) + ambient
+        self.values[DERIVED_CELL_TEMP_SANDIA] = round(module + irradiance / SANDIA_E0 * delta_t, 2)
@@ -0,0 +1,63 @@
+"""Diagnostics support for Irradiance Sensor."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_UNIQUE_ID
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    DOMAIN,
+    DATA_COORDINATORS,
+    DATA_DEVICES,
+    DATA_PLANS,
+    CONF_IP_ADDRESS,
+    CONF_SERIAL_PORT,
+    CONF_MODBUS_ID,
+    CONF_ROW_UNIQUE_ID,
+)
+from .planner import device_configs
+
+TO_REDACT = {CONF_IP_ADDRESS, CONF_SERIAL_PORT, CONF_UNIQUE_ID}
+
+
+def _keys_to_redact(config) -> set[str]:
+    """Return the keys to redact from an entry, including per-sensor unique IDs."""
+    keys = set(TO_REDACT)
+    for device in device_configs(config):
+        keys.update(key for key in device if key.endswith(f"_{CONF_ROW_UNIQUE_ID}"))
+    return keys
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry, including the poll performance report."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    coordinators = entry_data.get(DATA_COORDINATORS) or []
+
+    devices = []
+    for index, (config, plan) in enumerate(zip(entry_data[DATA_DEVICES], entry_data[DATA_PLANS])):
+        coordinator = coordinators[index] if index < len(coordinators) else None
+        devices.append({
+            "modbus_id": config.get(CONF_MODBUS_ID),
+            "read_plan": {
+                "tick": plan.tick,
+                "blocks": {
+                    str(interval): [
+                        {"type": b.reg_type, "address": b.address, "count": b.count}
+                        for b in blocks
+                    ]
+                    for interval, blocks in plan.blocks.items()
+                },
+            },
+            "performance": coordinator.diagnostics if coordinator else None,
+            "data": coordinator.data if coordinator else None,
+        })
+
+    return {
+        "entry": async_redact_data(dict(entry.data), _keys_to_redact(entry.data)),
+        "devices": devices,
+    }
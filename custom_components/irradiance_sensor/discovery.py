@@ -0,0 +1,197 @@
+"""Modbus TCP network discovery used by the config flow."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import ipaddress
+import logging
+
+from .const import (
+    CONF_REGISTER_TYPE,
+    CONF_DATA_TYPE,
+    CONF_WORD_ORDER,
+    CONF_BYTE_ORDER,
+    DATA_TYPE_UINT16,
+    ORDER_BIG,
+    REG_TYPE_INPUT,
+    DISCOVERY_MAX_HOSTS,
+    MODBUS_GATEWAY_NO_RESPONSE,
+    MODBUS_GATEWAY_PATH_UNAVAILABLE,
+)
+from .planner import RegisterFormat, plan_reads
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class Responder:
+    """A unit that answered on a Modbus TCP host."""
+
+    host: str
+    port: int
+    unit_id: int
+    templates: list[str] = field(default_factory=list)
+
+    @property
+    def label(self) -> str:
+        """Return a short description for selectors."""
+        models = ", ".join(self.templates) if self.templates else "?"
+        return f"{self.host}:{self.port} ID {self.unit_id} ({models})"
+
+
+def parse_network(cidr: str) -> list[str]:
+    """Return the host addresses of a CIDR range.
+
+    Raises ValueError for malformed ranges or ranges above the host limit.
+    """
+    network = ipaddress.ip_network(cidr.strip(), strict=False)
+    if network.num_addresses > DISCOVERY_MAX_HOSTS:
+        raise ValueError(f"{cidr} has more than {DISCOVERY_MAX_HOSTS} addresses")
+    hosts = [str(ip) for ip in network.hosts()]
+    # hosts() is empty for /32 networks
+    return hosts or [str(network.network_address)]
+
+
+def parse_unit_ids(text: str) -> list[int]:
+    """Parse unit IDs such as "1-5,10" into a sorted list.
+
+    Raises ValueError for malformed input or IDs outside 1-247.
+    """
+    ids = set()
+    for part in str(text).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = (int(x) for x in part.split("-", 1))
+            ids.update(range(first, last + 1))
+        else:
+            ids.add(int(part))
+    if not ids or min(ids) < 1 or max(ids) > 247:
+        raise ValueError(f"Invalid unit IDs: {text}")
+    return sorted(ids)
+
+
+async def _async_port_open(host: str, port: int, timeout: float) -> bool:
+    """Return True if a TCP connection to host:port succeeds."""
+    try:
+        async with asyncio.timeout(timeout):
+            _, writer = await asyncio.open_connection(host, port)
+    except (OSError, TimeoutError):
+        return False
+    writer.close()
+    return True
+
+
+def _unit_answered(rr) -> bool:
+    """Return True if a response came from the addressed unit itself.
+
+    Any exception response other than the gateway ones still proves the
+    unit exists.
+    """
+    if not rr.isError():
+        return True
+    code = getattr(rr, "exception_code", None)
+    return code is not None and code not in (
+        MODBUS_GATEWAY_PATH_UNAVAILABLE,
+        MODBUS_GATEWAY_NO_RESPONSE,
+    )
+
+
+def _template_blocks(registers: dict):
+    """Return the block reads that cover a template's registers."""
+    needed = {}
+    for reg in registers.values():
+        if reg.get("addr") is None:
+            continue
+        fmt = RegisterFormat(
+            reg.get(CONF_DATA_TYPE) or DATA_TYPE_UINT16,
+            reg.get(CONF_WORD_ORDER) or ORDER_BIG,
+            reg.get(CONF_BYTE_ORDER) or ORDER_BIG,
+        )
+        reg_type = reg.get("type") or reg.get(CONF_REGISTER_TYPE) or REG_TYPE_INPUT
+        needed.setdefault(reg_type, {}).setdefault(int(reg["addr"]), fmt)
+    return plan_reads(needed)
+
+
+async def _async_read(client, block, unit_id, timeout):
+    """Read a block, returning None on timeout or transport errors."""
+    if block.reg_type == REG_TYPE_INPUT:
+        method = client.read_input_registers
+    else: # Default or Holding
+        method = client.read_holding_registers
+    try:
+        async with asyncio.timeout(timeout):
+            return await method(address=block.address, count=block.count, slave=unit_id)
+    except Exception:
+        return None
+
+
+async def _async_probe_host(host, port, unit_ids, templates, timeout) -> list[Responder]:
+    """Try candidate unit IDs on a host and match them against templates."""
+    from pymodbus.client import AsyncModbusTcpClient
+
+    client = AsyncModbusTcpClient(host=host, port=port, timeout=timeout, retries=0)
+    responders = []
+    try:
+        async with asyncio.timeout(timeout):
+            if not await client.connect():
+                return responders
+
+        template_blocks = {name: _template_blocks(regs) for name, regs in templates.items()}
+        # Cheapest possible request: one input register at address 0
+        probe = plan_reads({REG_TYPE_INPUT: {0: RegisterFormat()}})[0]
+
+        for unit_id in unit_ids:
+            rr = await _async_read(client, probe, unit_id, timeout)
+            if rr is None or not _unit_answered(rr):
+                continue
+
+            responder = Responder(host, port, unit_id)
+            for name, blocks in template_blocks.items():
+                if not blocks:
+                    continue
+                for block in blocks:
+                    rr = await _async_read(client, block, unit_id, timeout)
+                    if rr is None or rr.isError():
+                        break
+                else:
+                    responder.templates.append(name)
+            responders.append(responder)
+    except (OSError, TimeoutError) as e:
+        _LOGGER.debug(f"Probe of {host}:{port} failed: {e}")
+    finally:
+        client.close()
+    return responders
+
+
+async def async_scan_network(
+    hosts: list[str],
+    port: int,
+    unit_ids: list[int],
+    templates: dict[str, dict],
+    timeout: float,
+    concurrency: int,
+) -> list[Responder]:
+    """Scan hosts for Modbus TCP units with bounded concurrency.
+
+    A connect sweep finds open ports first, then only those hosts are
+    probed for unit IDs and template matches.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def check_port(host):
+        async with semaphore:
+            return host if await _async_port_open(host, port, timeout) else None
+
+    open_hosts = [
+        host for host in await asyncio.gather(*(check_port(h) for h in hosts)) if host
+    ]
+    _LOGGER.debug(f"Port {port} open on {len(open_hosts)}/{len(hosts)} hosts")
+
+    async def probe(host):
+        async with semaphore:
+            return await _async_probe_host(host, port, unit_ids, templates, timeout)
+
+    results = await asyncio.gather(*(probe(h) for h in open_hosts))
+    return [responder for host_result in results for responder in host_result]
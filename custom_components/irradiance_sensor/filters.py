@@ -0,0 +1,163 @@
+"""Streaming outlier filters for raw channels."""
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from collections import deque
+
+from .const import (
+    CONF_FILTER,
+    CONF_FILTER_WINDOW,
+    CONF_HAMPEL_SIGMA,
+    CONF_MIN_VALUE,
+    CONF_MAX_VALUE,
+    FILTER_NONE,
+    FILTER_MEDIAN,
+    FILTER_HAMPEL,
+    DEFAULT_FILTER_WINDOW,
+    MAX_FILTER_WINDOW,
+    DEFAULT_HAMPEL_SIGMA,
+)
+
+# Scales the median absolute deviation to a standard deviation for
+# normally distributed noise
+MAD_SCALE = 1.4826
+
+
+class SlidingMedian:
+    """Median of the last N samples.
+
+    The window is kept both in arrival order (to know what to evict) and
+    sorted; each sample costs two binary searches and a shift of at most N
+    references, and memory stays at N samples. With N capped at
+    MAX_FILTER_WINDOW that shift is a short memmove, cheaper in practice
+    than the bookkeeping of two heaps with lazy deletion.
+    """
+
+    def __init__(self, size: int) -> None:
+        """Initialize."""
+        self.size = max(1, int(size))
+        self._arrival = deque()
+        self._sorted = []
+
+    def __len__(self) -> int:
+        """Return the number of samples in the window."""
+        return len(self._sorted)
+
+    def add(self, value: float) -> None:
+        """Add a sample, evicting the oldest one when the window is full."""
+        if len(self._arrival) == self.size:
+            oldest = self._arrival.popleft()
+            del self._sorted[bisect_left(self._sorted, oldest)]
+        self._arrival.append(value)
+        insort(self._sorted, value)
+
+    @property
+    def median(self) -> float | None:
+        """Return the median of the window, or None when empty."""
+        count = len(self._sorted)
+        if not count:
+            return None
+        middle = count // 2
+        if count % 2:
+            return self._sorted[middle]
+        return (self._sorted[middle - 1] + self._sorted[middle]) / 2
+
+    def mad(self, median: float) -> float:
+        """Return the median absolute deviation around median.
+
+        The deviations of the samples below and above median are each
+        already in order in the sorted window, so the middle deviation is
+        reached by walking outwards from median, without sorting them.
+        """
+        values = self._sorted
+        count = len(values)
+        above = bisect_left(values, median)
+        below = above - 1
+        previous = deviation = None
+        for _ in range(count // 2 + 1):
+            if above < count and (below < 0 or values[above] - median <= median - values[below]):
+                deviation, previous = values[above] - median, deviation
+                above += 1
+            else:
+                deviation, previous = median - values[below], deviation
+                below -= 1
+        if count % 2:
+            return deviation
+        return (previous + deviation) / 2
+
+
+class ChannelFilter:
+    """Physical range check followed by a median or Hampel filter.
+
+    Samples outside [minimum, maximum] are rejected and the last output is
+    held. The median filter outputs the window median; the Hampel filter
+    passes samples through unless they lie more than sigma scaled MADs away
+    from the median, in which case the median replaces them.
+    """
+
+    def __init__(self, method, window, sigma, minimum, maximum) -> None:
+        """Initialize."""
+        self.method = method
+        self.sigma = float(sigma)
+        self.minimum = minimum
+        self.maximum = maximum
+        self._window = SlidingMedian(window) if method != FILTER_NONE else None
+        self._last = None
+        self.rejected = 0
+        self.replaced = 0
+
+    def process(self, value):
+        """Return the filtered value of a sample."""
+        if value is None:
+            return None
+        if (self.minimum is not None and value < self.minimum) or (
+            self.maximum is not None and value > self.maximum
+        ):
+            self.rejected += 1
+            return self._last
+
+        if self._window is None:
+            self._last = value
+            return value
+
+        self._window.add(value)
+        median = self._window.median
+        if self.method == FILTER_MEDIAN:
+            output = median
+        else:
+            mad = self._window.mad(median)
+            # A flat window (quantized or idle channel) has no spread to judge by
+            if mad and abs(value - median) > self.sigma * MAD_SCALE * mad:
+                self.replaced += 1
+                output = median
+            else:
+                output = value
+
+        self._last = round(output, 2)
+        return self._last
+
+
+def _optional_float(value):
+    """Return value as a float, or None when unset."""
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def build_filter(config, key) -> ChannelFilter | None:
+    """Return the filter configured for a sensor key, or None if it has none."""
+    method = config.get(f"{key}_{CONF_FILTER}") or FILTER_NONE
+    minimum = _optional_float(config.get(f"{key}_{CONF_MIN_VALUE}"))
+    maximum = _optional_float(config.get(f"{key}_{CONF_MAX_VALUE}"))
+    if method not in (FILTER_MEDIAN, FILTER_HAMPEL):
+        method = FILTER_NONE
+    if method == FILTER_NONE and minimum is None and maximum is None:
+        return None
+    window = int(config.get(f"{key}_{CONF_FILTER_WINDOW}") or DEFAULT_FILTER_WINDOW)
+    return ChannelFilter(
+        method,
+        min(window, MAX_FILTER_WINDOW),
+        config.get(f"{key}_{CONF_HAMPEL_SIGMA}") or DEFAULT_HAMPEL_SIGMA,
+        minimum,
+        maximum,
+    )
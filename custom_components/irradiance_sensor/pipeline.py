@@ -0,0 +1,136 @@
+"""Modbus TCP client with several transactions in flight.
+
+The pymodbus client sends one request and waits for its answer before the
+next one. Modbus TCP tags every frame with a transaction ID, so a gateway
+that supports it can work on several requests at once; this client writes
+up to `depth` requests back to back and matches the answers by ID. It
+implements the subset of the pymodbus client interface used by the bus.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import struct
+import time
+
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+from pymodbus.pdu import DecodePDU
+
+_LOGGER = logging.getLogger(__name__)
+
+# MBAP header: transaction ID, protocol ID (always 0), length, unit ID
+MBAP = struct.Struct(">HHHB")
+READ_REQUEST = struct.Struct(">BHH")
+FUNC_READ_HOLDING = 0x03
+FUNC_READ_INPUT = 0x04
+
+
+class PipelinedModbusTcpClient:
+    """Modbus TCP client that pipelines register reads."""
+
+    def __init__(self, host: str, port: int, timeout: float, depth: int) -> None:
+        """Initialize."""
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.depth = depth
+        self._decoder = DecodePDU(is_server=False)
+        self._slots = asyncio.Semaphore(depth)
+        self._reader = None
+        self._writer = None
+        self._receiver = None
+        self._next_tid = 0
+        self._pending = {} # Key: transaction ID, Value: future of the response
+
+    @property
+    def connected(self) -> bool:
+        """Return True while the socket is open."""
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self) -> bool:
+        """Open the socket and start reading responses."""
+        if self.connected:
+            return True
+        try:
+            async with asyncio.timeout(self.timeout):
+                self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        except (OSError, TimeoutError) as e:
+            _LOGGER.debug(f"Connect to {self.host}:{self.port} failed: {e}")
+            return False
+        self._receiver = asyncio.get_running_loop().create_task(self._async_receive())
+        return True
+
+    def close(self) -> None:
+        """Close the socket and fail every request in flight."""
+        if self._receiver is not None:
+            self._receiver.cancel()
+            self._receiver = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._fail_pending(ConnectionException(f"Connection to {self.host}:{self.port} closed"))
+
+    def _fail_pending(self, exc):
+        """Fail every request waiting for an answer."""
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(exc)
+        self._pending.clear()
+
+    async def _async_receive(self):
+        """Route each response frame to the request with the same transaction ID."""
+        try:
+            while True:
+                tid, _, length, _ = MBAP.unpack(await self._reader.readexactly(MBAP.size))
+                pdu = await self._reader.readexactly(length - 1)
+                future = self._pending.pop(tid, None)
+                if future is None or future.done():
+                    # Answer to a request that already timed out
+                    continue
+                response = self._decoder.decode(pdu)
+                if response is None:
+                    future.set_exception(ModbusIOException(f"Undecodable response {pdu.hex()}"))
+                else:
+                    future.set_result(response)
+        except asyncio.CancelledError:
+            raise
+        except (OSError, asyncio.IncompleteReadError) as e:
+            _LOGGER.debug(f"Connection to {self.host}:{self.port} lost: {e!r}")
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            self._fail_pending(ConnectionException(f"Connection to {self.host}:{self.port} lost"))
+
+    async def read_timed(self, function, address, count, slave, timeout=None):
+        """Send a read request once a slot is free and wait for its answer.
+
+        The timeout and the round-trip clock start when the request holds a
+        slot, so time spent queued behind other requests counts for neither.
+        Returns the response and its round-trip time.
+        """
+        async with self._slots:
+            if not self.connected:
+                raise ConnectionException(f"Not connected to {self.host}:{self.port}")
+            self._next_tid = self._next_tid % 0xFFFF + 1
+            tid = self._next_tid
+            future = asyncio.get_running_loop().create_future()
+            self._pending[tid] = future
+            pdu = READ_REQUEST.pack(function, address, count)
+            started = time.perf_counter()
+            self._writer.write(MBAP.pack(tid, 0, len(pdu) + 1, slave) + pdu)
+            try:
+                async with asyncio.timeout(timeout or self.timeout):
+                    response = await future
+            finally:
+                self._pending.pop(tid, None)
+            return response, time.perf_counter() - started
+
+    async def read_holding_registers(self, address, count=1, slave=1):
+        """Read holding registers (function 03)."""
+        response, _ = await self.read_timed(FUNC_READ_HOLDING, address, count, slave)
+        return response
+
+    async def read_input_registers(self, address, count=1, slave=1):
+        """Read input registers (function 04)."""
+        response, _ = await self.read_timed(FUNC_READ_INPUT, address, count, slave)
+        return response
@@ -0,0 +1,324 @@
+"""Read planner that coalesces register reads into block requests."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from functools import cached_property, reduce
+import logging
+from math import gcd
+from operator import itemgetter
+import struct
+from types import MappingProxyType
+
+from .const import (
+    CONF_REGISTER_TYPE,
+    CONF_DATA_TYPE,
+    CONF_WORD_ORDER,
+    CONF_BYTE_ORDER,
+    CONF_SCAN_INTERVAL,
+    CONF_MAX_REGISTER_GAP,
+    CONF_MAX_BLOCK_SIZE,
+    CONF_SLAVES,
+    CONF_CONNECTION_METHOD,
+    CONF_IP_ADDRESS,
+    CONF_PORT,
+    CONF_SERIAL_PORT,
+    CONF_BAUDRATE,
+    CONF_PARITY,
+    CONF_STOPBITS,
+    CONF_RTU_THROUGHPUT,
+    CONF_PIPELINE_DEPTH,
+    REG_TYPE_INPUT,
+    DEFAULT_MAX_BLOCK_SIZE,
+    DEFAULT_MAX_REGISTER_GAP,
+    DEFAULT_SCAN_INTERVAL,
+    DATA_TYPE_UINT16,
+    DATA_TYPES,
+    ORDER_BIG,
+    ORDER_LITTLE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Modbus limits a single read request to 125 registers
+MODBUS_MAX_READ = 125
+
+# Settings every slave of an entry inherits from the entry itself
+CONNECTION_KEYS = (
+    CONF_CONNECTION_METHOD,
+    CONF_IP_ADDRESS,
+    CONF_PORT,
+    CONF_SERIAL_PORT,
+    CONF_BAUDRATE,
+    CONF_PARITY,
+    CONF_STOPBITS,
+    CONF_RTU_THROUGHPUT,
+    CONF_PIPELINE_DEPTH,
+    CONF_MAX_REGISTER_GAP,
+    CONF_MAX_BLOCK_SIZE,
+)
+
+
+@dataclass(frozen=True)
+class RegisterFormat:
+    """How a value is laid out over one or more registers."""
+
+    data_type: str = DATA_TYPE_UINT16
+    word_order: str = ORDER_BIG
+    byte_order: str = ORDER_BIG
+
+    @property
+    def count(self) -> int:
+        """Return the number of registers the value spans."""
+        return DATA_TYPES[self.data_type][1]
+
+    @property
+    def code(self) -> str:
+        """Return the struct code of the value."""
+        return DATA_TYPES[self.data_type][0]
+
+
+@dataclass(frozen=True)
+class ReadBlock:
+    """A contiguous range of registers fetched with a single request."""
+
+    reg_type: str
+    address: int
+    count: int
+    # Values inside the range that are actually used by a sensor
+    fields: tuple[tuple[int, RegisterFormat], ...]
+
+    @property
+    def end(self) -> int:
+        """Return the last register address covered by the block."""
+        return self.address + self.count - 1
+
+    @property
+    def wanted(self) -> tuple[int, ...]:
+        """Return the start address of every value in the block."""
+        return tuple(addr for addr, _ in self.fields)
+
+    @cached_property
+    def decoder(self) -> BlockDecoder:
+        """Return the decoder for this block, compiled on first use."""
+        return BlockDecoder(self)
+
+
+class BlockDecoder:
+    """Decode every value of a block in one pass.
+
+    The registers are packed to bytes once, the bytes of each value are
+    gathered into big-endian order (applying word and byte swaps) with a
+    single precomputed index list, and one struct format unpacks them all.
+    """
+
+    def __init__(self, block: ReadBlock) -> None:
+        """Compile the formats and byte permutation for a block."""
+        self.addresses = block.wanted
+        self._pack = struct.Struct(f">{block.count}H").pack
+
+        indices = []
+        codes = []
+        for addr, fmt in block.fields:
+            offset = addr - block.address
+            words = range(offset, offset + fmt.count)
+            if fmt.word_order == ORDER_LITTLE:
+                words = reversed(words)
+            for word in words:
+                if fmt.byte_order == ORDER_LITTLE:
+                    indices.extend((word * 2 + 1, word * 2))
+                else:
+                    indices.extend((word * 2, word * 2 + 1))
+            codes.append(fmt.code)
+
+        self._gather = itemgetter(*indices)
+        self._unpack = struct.Struct(">" + "".join(codes)).unpack
+
+    def decode(self, registers) -> dict[int, float | int | None]:
+        """Return the decoded value of every wanted address."""
+        values = self._unpack(bytes(self._gather(self._pack(*registers))))
+        # NaN is what float registers hold when a sensor has no reading
+        return {
+            addr: (None if value != value else value)
+            for addr, value in zip(self.addresses, values)
+        }
+
+
+def plan_reads(
+    needed: dict[str, dict[int, RegisterFormat]],
+    max_gap: int = DEFAULT_MAX_REGISTER_GAP,
+    max_block: int = DEFAULT_MAX_BLOCK_SIZE,
+) -> list[ReadBlock]:
+    """Group values by register type and merge them into block reads.
+
+    Two values end up in the same block when the number of unused
+    registers between them is at most max_gap and the resulting block does
+    not exceed max_block registers.
+    """
+    max_gap = max(0, int(max_gap))
+    max_block = min(max(1, int(max_block)), MODBUS_MAX_READ)
+
+    blocks = []
+    for reg_type in sorted(needed):
+        fields = sorted(needed[reg_type].items())
+        if not fields:
+            continue
+
+        start, fmt = fields[0]
+        end = start + fmt.count - 1
+        wanted = [fields[0]]
+        for addr, fmt in fields[1:]:
+            gap = addr - end - 1
+            field_end = max(end, addr + fmt.count - 1)
+            if gap <= max_gap and field_end - start + 1 <= max_block:
+                wanted.append((addr, fmt))
+                end = field_end
+                continue
+            blocks.append(ReadBlock(reg_type, start, end - start + 1, tuple(wanted)))
+            start, end = addr, addr + fmt.count - 1
+            wanted = [(addr, fmt)]
+        blocks.append(ReadBlock(reg_type, start, end - start + 1, tuple(wanted)))
+
+    return blocks
+
+
+def _block_for(reg_type: str, fields) -> ReadBlock:
+    """Return the smallest block covering the given fields."""
+    start = min(addr for addr, _ in fields)
+    end = max(addr + fmt.count - 1 for addr, fmt in fields)
+    return ReadBlock(reg_type, start, end - start + 1, tuple(fields))
+
+
+def split_block(block: ReadBlock) -> list[ReadBlock]:
+    """Bisect a rejected block into smaller blocks covering the same values.
+
+    Each half is trimmed to the values it actually needs, so unused
+    registers at the edges are dropped from the retry.
+    """
+    if len(block.fields) < 2:
+        return [block]
+
+    middle = len(block.fields) // 2
+    halves = (block.fields[:middle], block.fields[middle:])
+    return [_block_for(block.reg_type, half) for half in halves]
+
+
+def poll_tick(intervals) -> int:
+    """Return the coordinator tick that lands on every poll interval."""
+    intervals = [int(i) for i in intervals if int(i) > 0]
+    if not intervals:
+        return DEFAULT_SCAN_INTERVAL
+    return reduce(gcd, intervals)
+
+
+@dataclass(frozen=True)
+class Channel:
+    """Everything needed to read and scale one sensor key."""
+
+    key: str
+    reg_type: str
+    address: int
+    fmt: RegisterFormat
+    gain: float
+    offset: float
+    interval: int
+
+    @property
+    def register(self) -> tuple[str, int]:
+        """Return the (register type, address) the value is decoded under."""
+        return (self.reg_type, self.address)
+
+
+@dataclass(frozen=True)
+class ReadPlan:
+    """Immutable read plan of a config entry, compiled once at setup."""
+
+    channels: Mapping[str, Channel]
+    # Poll interval -> sensor keys and the block reads that cover them
+    groups: Mapping[int, tuple[str, ...]]
+    blocks: Mapping[int, tuple[ReadBlock, ...]]
+    tick: int
+
+
+def device_configs(config) -> list[dict]:
+    """Return the config of every slave polled by an entry.
+
+    The entry itself describes the first slave. Further units on the same
+    line are listed under CONF_SLAVES with their own ID, model and
+    registers, and share the connection settings of the entry.
+    """
+    primary = {key: value for key, value in config.items() if key != CONF_SLAVES}
+    connection = {
+        key: value for key, value in primary.items() if key in CONNECTION_KEYS
+    }
+    return [primary] + [{**connection, **slave} for slave in config.get(CONF_SLAVES, [])]
+
+
+def enabled_keys(config) -> list[str]:
+    """Return every sensor key flagged as enabled in a config entry.
+
+    This covers both SENSOR_TYPES and keys that only exist in templates.
+    """
+    return [
+        key[: -len("_enabled")]
+        for key, enabled in config.items()
+        if key.endswith("_enabled") and enabled
+    ]
+
+
+def compile_read_plan(config) -> ReadPlan:
+    """Compile the read plan for a config entry.
+
+    Values are decoded once per register, so a channel that reads a
+    register already claimed with a different format is left out.
+    """
+    channels = {}
+    groups = {}
+    claimed = {} # Key: (type, address), Value: first channel reading it
+    for key in enabled_keys(config):
+        addr = config.get(f"{key}_addr")
+        if addr is None:
+            continue
+        # Entries created before data types existed hold plain 16-bit words
+        channel = Channel(
+            key=key,
+            # Default to INPUT based on user request/defaults
+            reg_type=config.get(f"{key}_{CONF_REGISTER_TYPE}", REG_TYPE_INPUT),
+            address=int(addr),
+            fmt=RegisterFormat(
+                config.get(f"{key}_{CONF_DATA_TYPE}", DATA_TYPE_UINT16),
+                config.get(f"{key}_{CONF_WORD_ORDER}", ORDER_BIG),
+                config.get(f"{key}_{CONF_BYTE_ORDER}", ORDER_BIG),
+            ),
+            gain=float(config.get(f"{key}_gain", 1.0)),
+            offset=float(config.get(f"{key}_offset", 0.0)),
+            interval=max(1, int(config.get(f"{key}_{CONF_SCAN_INTERVAL}", DEFAULT_SCAN_INTERVAL))),
+        )
+        first = claimed.setdefault(channel.register, channel)
+        if first.fmt != channel.fmt:
+            _LOGGER.warning(
+                f"Ignoring {key}: register {channel.address} ({channel.reg_type}) is already "
+                f"read by {first.key} in a different format"
+            )
+            continue
+        channels[key] = channel
+        groups.setdefault(channel.interval, []).append(key)
+
+    blocks = {}
+    for interval, keys in groups.items():
+        needed = {} # Key: type, Value: {address: format}
+        for key in keys:
+            channel = channels[key]
+            needed.setdefault(channel.reg_type, {}).setdefault(channel.address, channel.fmt)
+        blocks[interval] = tuple(plan_reads(
+            needed,
+            max_gap=config.get(CONF_MAX_REGISTER_GAP, DEFAULT_MAX_REGISTER_GAP),
+            max_block=config.get(CONF_MAX_BLOCK_SIZE, DEFAULT_MAX_BLOCK_SIZE),
+        ))
+
+    return ReadPlan(
+        channels=MappingProxyType(channels),
+        groups=MappingProxyType({interval: tuple(keys) for interval, keys in groups.items()}),
+        blocks=MappingProxyType(blocks),
+        tick=poll_tick(groups),
+    )
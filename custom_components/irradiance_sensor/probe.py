@@ -0,0 +1,96 @@
+"""Register map auto-probe used by the config flow."""
+from __future__ import annotations
+
+import logging
+
+from .const import (
+    CONF_DATA_TYPE,
+    CONF_SCAN_INTERVAL,
+    DATA_TYPE_UINT16,
+    DEFAULT_SCAN_INTERVAL,
+    PROBE_MAX_SUGGESTED,
+    PROBE_MAX_REQUESTS,
+    MODBUS_ILLEGAL_FUNCTION,
+    MODBUS_ILLEGAL_ADDRESS,
+)
+from .planner import MODBUS_MAX_READ
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_probe_registers(
+    read, reg_type, start, end, max_block=MODBUS_MAX_READ, max_requests=PROBE_MAX_REQUESTS
+):
+    """Sweep start..end with block reads to find the populated registers.
+
+    read is a coroutine function (reg_type, address, count) returning a
+    pymodbus response. Devices that answer whole ranges, or dense maps, are
+    covered in a few full-size requests. Blocks rejected with an
+    illegal-address exception are bisected in address order until the
+    populated registers are isolated, which on a strict and sparse map can
+    take about two requests per address; max_requests bounds that case.
+    An illegal-function exception means the device does not implement the
+    register type at all and ends the sweep.
+    Returns ({address: value}, number of requests sent).
+    """
+    found = {}
+    requests = 0
+    # Stack of (first, last) ranges, lowest addresses on top
+    pending = [
+        (addr, min(end, addr + max_block - 1))
+        for addr in range(start, end + 1, max_block)
+    ]
+    pending.reverse()
+
+    while pending and requests < max_requests:
+        first, last = pending.pop()
+        requests += 1
+        try:
+            rr = await read(reg_type, first, last - first + 1)
+        except Exception as e:
+            _LOGGER.debug(f"Probe of {reg_type} {first}-{last} failed: {e}")
+            continue
+
+        if not rr.isError():
+            for offset, value in enumerate(rr.registers[: last - first + 1]):
+                found[first + offset] = value
+            continue
+
+        code = getattr(rr, "exception_code", None)
+        if code == MODBUS_ILLEGAL_FUNCTION:
+            _LOGGER.debug(f"Device does not implement {reg_type} registers")
+            break
+        if code == MODBUS_ILLEGAL_ADDRESS and last > first:
+            middle = (first + last) // 2
+            pending.append((middle + 1, last))
+            pending.append((first, middle))
+
+    if pending and requests >= max_requests:
+        _LOGGER.info(f"Probe of {reg_type} {start}-{end} stopped after {requests} requests")
+    return dict(sorted(found.items())), requests
+
+
+def suggest_template(results: dict[str, dict[int, int]]) -> dict[str, dict]:
+    """Build template registers from probe results.
+
+    Non-zero registers are the likely measurements; they are suggested
+    first, then zero-valued ones, up to PROBE_MAX_SUGGESTED entries.
+    """
+    candidates = [
+        (value == 0, reg_type, addr)
+        for reg_type, registers in results.items()
+        for addr, value in registers.items()
+    ]
+    candidates.sort()
+
+    registers = {}
+    for _, reg_type, addr in candidates[:PROBE_MAX_SUGGESTED]:
+        registers[f"{reg_type}_{addr}"] = {
+            "addr": addr,
+            "gain": 1.0,
+            "offset": 0.0,
+            "type": reg_type,
+            CONF_DATA_TYPE: DATA_TYPE_UINT16,
+            CONF_SCAN_INTERVAL: DEFAULT_SCAN_INTERVAL,
+        }
+    return registers
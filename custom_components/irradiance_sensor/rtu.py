@@ -0,0 +1,55 @@
+"""Modbus RTU line timing derived from the serial settings."""
+from __future__ import annotations
+
+from .const import (
+    PARITY_NONE,
+    DEFAULT_PARITY,
+    DEFAULT_STOPBITS,
+    RTU_SPEC_CHAR_BITS,
+    RTU_FIXED_GAP_BAUDRATE,
+    RTU_FIXED_FRAME_GAP,
+    RTU_TURNAROUND_CHARS,
+)
+
+# Read request: address, function, start, count, CRC
+READ_REQUEST_BYTES = 8
+# Read response without the data: address, function, byte count, CRC
+READ_RESPONSE_BYTES = 5
+
+
+def char_bits(parity: str = DEFAULT_PARITY, stopbits: int = DEFAULT_STOPBITS) -> int:
+    """Return the bits one character takes: start, 8 data, parity and stop bits."""
+    return 1 + 8 + (parity != PARITY_NONE) + int(stopbits)
+
+
+def char_time(baudrate: int, parity: str = DEFAULT_PARITY, stopbits: int = DEFAULT_STOPBITS) -> float:
+    """Return the seconds one character takes on the wire."""
+    return char_bits(parity, stopbits) / baudrate
+
+
+def frame_gap(baudrate: int, parity=DEFAULT_PARITY, stopbits=DEFAULT_STOPBITS, throughput=False) -> float:
+    """Return the silent interval (t3.5) kept between frames, in seconds.
+
+    By default the spec's rule applies: 3.5 characters of 11 bits, fixed at
+    1.75 ms above 19200 baud. In throughput mode the interval is 3.5
+    characters of the actual framing at any baud rate.
+    """
+    if throughput:
+        return 3.5 * char_time(baudrate, parity, stopbits)
+    if baudrate > RTU_FIXED_GAP_BAUDRATE:
+        return RTU_FIXED_FRAME_GAP
+    return 3.5 * RTU_SPEC_CHAR_BITS / baudrate
+
+
+def turnaround_delay(baudrate: int, parity=DEFAULT_PARITY, stopbits=DEFAULT_STOPBITS) -> float:
+    """Return the extra silence before addressing a unit other than the last one.
+
+    The unit that answered last may keep driving the line for a moment
+    after its final stop bit; 1.5 characters (t1.5) covers it.
+    """
+    return RTU_TURNAROUND_CHARS * char_time(baudrate, parity, stopbits)
+
+
+def read_wire_time(char_seconds: float, count: int) -> float:
+    """Return the seconds a read of count registers and its answer spend on the wire."""
+    return (READ_REQUEST_BYTES + READ_RESPONSE_BYTES + 2 * count) * char_seconds
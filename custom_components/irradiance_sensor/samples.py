@@ -0,0 +1,231 @@
+"""Fixed-size on-disk ring buffer of raw channel samples.
+
+The file is memory mapped and sized once for its capacity: an append packs
+one record into the map and updates the write position in the header, so
+it costs O(1) and the file never grows. Once full, the oldest records are
+overwritten. Records are appended in time order, which lets an export
+binary search its start and stream from there in bounded chunks.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+
+from .backfill import BINARY_RECORD
+from .const import SAMPLE_EXPORT_CHUNK, EXPORT_FORMAT_CSV, EXPORT_FORMAT_BINARY
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"IRRSMP01"
+# Layout: magic, record size, capacity | next write slot, records stored |
+# key table (JSON list of key names, zero padded) | records
+LAYOUT = struct.Struct("<8sIQ")
+STATE = struct.Struct("<QQ")
+STATE_OFFSET = LAYOUT.size
+KEYS_OFFSET = STATE_OFFSET + STATE.size
+DATA_OFFSET = 4096
+KEY_TABLE_SIZE = DATA_OFFSET - KEYS_OFFSET
+# Record: unix time, key index, value
+RECORD = struct.Struct("<dHd")
+
+
+def sample_key(unit, key: str) -> str:
+    """Return the name a channel of a unit is stored under."""
+    return f"{unit}:{key}"
+
+
+class SampleStore:
+    """Ring file of (timestamp, key, value) records for one config entry.
+
+    append and key_id run on the event loop and only touch the map;
+    open, close and export do file I/O and belong in the executor. While
+    an export reads the ring, appends are held in memory and written once
+    it is done, so a full ring does not overwrite records being exported.
+    """
+
+    def __init__(self, path: str, capacity: int) -> None:
+        """Initialize."""
+        self.path = path
+        self.capacity = int(capacity)
+        self.head = 0 # Slot of the next record
+        self.count = 0
+        self._keys = []
+        self._key_ids = {}
+        self._file = None
+        self._map = None
+        # Guards the write position against exports running in the executor
+        self._lock = threading.Lock()
+        self._exports = 0
+        self._held = [] # Records appended while an export runs
+        self._last_time = 0.0 # Timestamp of the newest record
+
+    @property
+    def size(self) -> int:
+        """Return the size of the ring file in bytes."""
+        return DATA_OFFSET + self.capacity * RECORD.size
+
+    def open(self) -> None:
+        """Map the ring file, creating it when missing or sized differently (executor)."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        existing = os.path.exists(self.path) and os.path.getsize(self.path) == self.size
+        self._file = open(self.path, "r+b" if existing else "w+b")
+        if not existing:
+            self._file.truncate(self.size)
+        self._map = mmap.mmap(self._file.fileno(), self.size)
+
+        if existing and self._load():
+            return
+        _LOGGER.info(f"Starting sample store {self.path} with room for {self.capacity} records")
+        LAYOUT.pack_into(self._map, 0, MAGIC, RECORD.size, self.capacity)
+        self._write_state()
+        self._write_keys()
+
+    def _load(self) -> bool:
+        """Read the header of an existing file; False if it is not usable."""
+        magic, record_size, capacity = LAYOUT.unpack_from(self._map, 0)
+        if magic != MAGIC or record_size != RECORD.size or capacity != self.capacity:
+            return False
+        self.head, self.count = STATE.unpack_from(self._map, STATE_OFFSET)
+        table = bytes(self._map[KEYS_OFFSET:DATA_OFFSET]).rstrip(b"\0")
+        try:
+            self._keys = json.loads(table) if table else []
+        except ValueError:
+            return False
+        self._key_ids = {name: idx for idx, name in enumerate(self._keys)}
+        if self.count:
+            (self._last_time, _, _), = self._read(self.head, self.count, self.count - 1, 1)
+        return True
+
+    def close(self) -> None:
+        """Flush and unmap the file (executor)."""
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write_state(self) -> None:
+        """Store the write position and record count in the header."""
+        STATE.pack_into(self._map, STATE_OFFSET, self.head, self.count)
+
+    def _write_keys(self) -> None:
+        """Store the key table in the header."""
+        table = json.dumps(self._keys).encode()
+        if len(table) > KEY_TABLE_SIZE:
+            raise ValueError(f"Too many keys for sample store {self.path}")
+        self._map[KEYS_OFFSET:DATA_OFFSET] = table.ljust(KEY_TABLE_SIZE, b"\0")
+
+    def key_id(self, name: str) -> int:
+        """Return the index records use for a key name, registering new names."""
+        idx = self._key_ids.get(name)
+        if idx is None:
+            idx = len(self._keys)
+            self._keys.append(name)
+            self._write_keys()
+            self._key_ids[name] = idx
+        return idx
+
+    def append(self, timestamp: float, key_id: int, value: float) -> None:
+        """Write a record over the oldest slot once the ring is full.
+
+        Timestamps never go backwards, so a wall clock stepped back (NTP)
+        does not break the time order exports bisect on; records keep the
+        newest timestamp until the clock catches up.
+        """
+        with self._lock:
+            timestamp = max(timestamp, self._last_time)
+            self._last_time = timestamp
+            if self._exports:
+                self._held.append((timestamp, key_id, value))
+                return
+            self._write(timestamp, key_id, value)
+
+    def _write(self, timestamp, key_id, value):
+        """Store a record at the write position."""
+        RECORD.pack_into(self._map, DATA_OFFSET + self.head * RECORD.size, timestamp, key_id, value)
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        self._write_state()
+
+    def _read(self, head, count, first, number):
+        """Return records first..first+number (oldest first) of a ring snapshot."""
+        slot = (head - count + first) % self.capacity
+        contiguous = min(number, self.capacity - slot)
+        offset = DATA_OFFSET + slot * RECORD.size
+        data = self._map[offset:offset + contiguous * RECORD.size]
+        if contiguous < number:
+            # The range wraps around the end of the file
+            data += self._map[DATA_OFFSET:DATA_OFFSET + (number - contiguous) * RECORD.size]
+        return RECORD.iter_unpack(data)
+
+    def _bisect(self, head, count, timestamp) -> int:
+        """Return the position of the first record at or after timestamp."""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            (record_time, _, _), = self._read(head, count, middle, 1)
+            if record_time < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def export(self, path: str, key: str, start=None, end=None, fmt=EXPORT_FORMAT_CSV) -> int:
+        """Write the samples of a key in [start, end) to a file (executor).
+
+        start and end are unix times. CSV files hold timestamp,value rows
+        and binary files (float64 unix time, float64 value) pairs, the
+        formats the backfill service imports. Returns the samples written.
+        """
+        with self._lock:
+            # Appends are held back until the export is done, so no record
+            # of this snapshot is overwritten while it is read
+            self._exports += 1
+            head, count = self.head, self.count
+        try:
+            return self._export(path, key, head, count, start, end, fmt)
+        finally:
+            with self._lock:
+                self._exports -= 1
+                if not self._exports:
+                    for record in self._held:
+                        self._write(*record)
+                    self._held.clear()
+
+    def _export(self, path, key, head, count, start, end, fmt) -> int:
+        """Write the samples of a key from a (head, count) snapshot of the ring."""
+        key_id = self._key_ids.get(key)
+        first = self._bisect(head, count, start) if start is not None else 0
+        binary = fmt == EXPORT_FORMAT_BINARY
+        written = 0
+
+        with open(path, "wb") if binary else open(path, "w", encoding="utf-8") as out:
+            if not binary:
+                out.write("timestamp,value\n")
+            position = first if key_id is not None else count
+            while position < count:
+                number = min(SAMPLE_EXPORT_CHUNK, count - position)
+                rows = []
+                past_end = False
+                for timestamp, record_key, value in self._read(head, count, position, number):
+                    if end is not None and timestamp >= end:
+                        past_end = True
+                        break
+                    if record_key == key_id:
+                        rows.append((timestamp, value))
+                if binary:
+                    out.write(b"".join(BINARY_RECORD.pack(*row) for row in rows))
+                else:
+                    out.writelines(f"{timestamp:.3f},{value!r}\n" for timestamp, value in rows)
+                written += len(rows)
+                if past_end:
+                    break
+                position += number
+        return written
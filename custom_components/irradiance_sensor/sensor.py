@@ -2,25 +2,28 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Callable
+from dataclasses import dataclass
 from datetime import timedelta
 import asyncio
-
-from pymodbus.client import ModbusTcpClient, ModbusSerialClient
-from pymodbus.exceptions import ModbusException
+import math
+import time
+from typing import Any
 
 from homeassistant.components.sensor import (
+    RestoreSensor,
     SensorDeviceClass,
     SensorEntity,
+    SensorEntityDescription,
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
-    UnitOfIrradiance,
     UnitOfTemperature,
-    UnitOfSpeed,
-    DEGREE,
+    UnitOfTime,
+    EntityCategory,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.update_coordinator import (
@@ -28,31 +31,63 @@ from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
     UpdateFailed,
 )
+from homeassistant.util import dt as dt_util
 
 from .const import (
     DOMAIN,
-    DEFAULT_REGISTERS,
+    DATA_BUS,
+    DATA_DEVICES,
+    DATA_PLANS,
+    DATA_COORDINATORS,
+    DATA_SAMPLES,
     SENSOR_TYPES,
     CONF_CONNECTION_METHOD,
     CONF_IP_ADDRESS,
-    CONF_PORT,
-    CONF_SERIAL_PORT,
-    CONF_BAUDRATE,
     CONF_MODBUS_ID,
     CONF_SENSOR_MODEL,
     CONF_ENTITY_NAME,
-    CONF_REGISTER_TYPE,
     CONF_ROW_UNIQUE_ID,
-    REG_TYPE_INPUT,
-    REG_TYPE_HOLDING,
+    CONF_DEADBAND,
+    CONF_DEADBAND_PCT,
+    CONF_HEARTBEAT,
+    DEFAULT_DEADBAND,
+    DEFAULT_DEADBAND_PCT,
+    DEFAULT_HEARTBEAT,
+    CONF_AGGREGATE_WINDOW,
+    CONF_AGGREGATE_INTERVAL,
+    DEFAULT_AGGREGATE_WINDOW,
+    AGGREGATE_STATS,
+    AGGREGATE_HEADROOM,
+    MODBUS_ILLEGAL_ADDRESS,
+    CONF_ADAPTIVE,
+    CONF_DERIVED,
+    DEFAULT_DERIVED,
+    CONF_FAST_START,
+    DEFAULT_FAST_START,
+    AMBIENT_TEMP_KEYS,
+    WIND_SPEED_KEY,
+    DERIVED_INSOLATION,
+    DERIVED_CELL_TEMP_NOCT,
+    DERIVED_CELL_TEMP_SANDIA,
+    DERIVED_RAMP_RATE,
+    POLL_MODE_NIGHT,
+    POLL_MODE_TWILIGHT,
+    POLL_MODE_DAY,
+    POLL_MODE_VARIABLE,
     METHOD_MODBUS_TCP,
-    METHOD_RS485,
+    POLL_RETRY_BUDGET,
 )
+from .aggregation import WindowStats
+from .adaptive import SunSchedule
+from .derived import DerivedMetrics
+from .filters import build_filter
+from .planner import enabled_keys, poll_tick, split_block
+from .samples import sample_key
+from .stats import PollStats
+from .timeouts import AdaptiveTimeout
 
 _LOGGER = logging.getLogger(__name__)
 
-SCAN_INTERVAL = timedelta(seconds=30)
-
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigEntry,
@@ -60,18 +95,54 @@ async def async_setup_entry(
 ) -> None:
     """Set up the Irradiance Sensor platform."""
     
-    coordinator = IrradianceDataCoordinator(hass, entry.data)
-    
-    # Perform first refresh to sure we can connect
-    await coordinator.async_config_entry_first_refresh()
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    # One coordinator per slave; they share the bus of the entry
+    coordinators = [
+        IrradianceDataCoordinator(
+            hass, config, entry_data[DATA_BUS], plan, entry.options, entry_data[DATA_SAMPLES]
+        )
+        for config, plan in zip(entry_data[DATA_DEVICES], entry_data[DATA_PLANS])
+    ]
+    entry_data[DATA_COORDINATORS] = coordinators
+    fast_start = entry.options.get(CONF_FAST_START, DEFAULT_FAST_START)
+
+    if not fast_start:
+        # Perform first refresh to sure we can connect. With several slaves a
+        # silent one must not keep the others from loading.
+        if len(coordinators) == 1:
+            await coordinators[0].async_config_entry_first_refresh()
+        else:
+            await asyncio.gather(*(c.async_refresh() for c in coordinators))
 
     entities = []
+    for index, coordinator in enumerate(coordinators):
+        entities.extend(_device_entities(entry, index, coordinator))
+
+    async_add_entities(entities)
+
+    if fast_start:
+        # Entities start from their restored state; a device behind a
+        # timeout no longer holds up Home Assistant startup
+        for coordinator in coordinators:
+            entry.async_create_background_task(
+                hass,
+                coordinator.async_refresh(),
+                f"{DOMAIN} first poll of unit {coordinator.config.get(CONF_MODBUS_ID)}",
+            )
+
+
+def _device_entities(entry, index, coordinator):
+    """Create the entities of one slave."""
+    config = coordinator.config
+    # The first slave keeps the identifiers used before multi-slave entries
+    device_id = entry.entry_id if index == 0 else f"{entry.entry_id}_{config.get(CONF_MODBUS_ID)}"
+    entities = []
     
     # Helper to create sensor
     def create_sensor(key, name, unit, device_class):
          return IrradianceSensorEntity(
             coordinator, 
-            entry, 
+            device_id, 
             key, 
             name,
             unit,
@@ -79,14 +150,8 @@ async def async_setup_entry(
         )
 
     # Identify enabled sensors from config
-    enabled_sensors = []
-    
-    # Iterate over all keys in data to find enabled sensors
     # This supports both standard SENSOR_TYPES and custom ones from templates
-    for key in entry.data:
-        if key.endswith("_enabled") and entry.data[key]:
-             sensor_key = key.replace("_enabled", "")
-             enabled_sensors.append(sensor_key)
+    enabled_sensors = enabled_keys(config)
 
     for key in enabled_sensors:
         # Get defaults from SENSOR_TYPES if available
@@ -94,164 +159,703 @@ async def async_setup_entry(
         
         # Determine Name: Configured name > Type default > Key name
         default_name = type_def.get("name", key.replace("_", " ").title())
-        name = entry.data.get(f"{key}_name", default_name)
+        name = config.get(f"{key}_name", default_name)
         
         # Determine Unit/Class
         unit = type_def.get("unit")
         device_class = type_def.get("device_class")
         
-        entities.append(create_sensor(
+        entity = create_sensor(
             key, 
             name, 
             unit, 
             device_class
-        ))
+        )
+        coordinator.entity_keys[entity.unique_id] = key
+        entities.append(entity)
 
-    async_add_entities(entities)
+        # Windowed statistics published alongside the raw channel
+        if key in coordinator.aggregators:
+            for stat in AGGREGATE_STATS:
+                entities.append(IrradianceAggregateEntity(
+                    coordinator,
+                    device_id,
+                    key,
+                    stat,
+                    f"{name} {stat.title()}",
+                    unit,
+                    device_class
+                ))
+
+    # Insolation, cell temperature and ramp rate
+    if coordinator.derived is not None:
+        for description in DERIVED_SENSORS:
+            if description.key in coordinator.derived.keys:
+                entities.append(IrradianceDerivedEntity(coordinator, device_id, description))
+
+    # Poll performance, disabled by default
+    for description in DIAGNOSTIC_SENSORS:
+        entities.append(IrradianceDiagnosticEntity(coordinator, device_id, description))
+
+    return entities
+
+
+def _base_unique_id(config, device_id, key):
+    """Return the unique_id of a sensor key."""
+    # Use custom unique_id if provided, otherwise fallback to entry_id based
+    custom_uid = config.get(f"{key}_{CONF_ROW_UNIQUE_ID}")
+    if custom_uid:
+        return custom_uid
+    return f"{device_id}_{key}"
+
+
+def _device_info(config, device_id) -> DeviceInfo:
+    """Return device information shared by every entity of a slave."""
+    return DeviceInfo(
+        identifiers={(DOMAIN, device_id)},
+        name=config.get(CONF_ENTITY_NAME, "Irradiance Sensor"),
+        manufacturer="Custom Integration",
+        model=config.get(CONF_SENSOR_MODEL, "Generic"),
+        configuration_url=(
+            f"http://{config.get(CONF_IP_ADDRESS)}" 
+            if config.get(CONF_CONNECTION_METHOD) == METHOD_MODBUS_TCP 
+            else None
+        ),
+    )
 
 
 class IrradianceDataCoordinator(DataUpdateCoordinator):
     """Class to manage fetching data from Modbus."""
 
-    def __init__(self, hass, config):
+    def __init__(self, hass, config, bus, plan, options=None, samples=None):
         """Initialize."""
+        self.config = config
+        self.bus = bus
+        self.plan = plan
+
+        # Full-rate samples of every channel, before outlier filtering
+        self.samples = samples
+        self._sample_keys = {}
+        if samples is not None:
+            unit = config.get(CONF_MODBUS_ID, 1)
+            self._sample_keys = {key: samples.key_id(sample_key(unit, key)) for key in plan.channels}
+
+        # Sun-aware polling stretches or shortens every interval group
+        options = options or {}
+        self.schedule = SunSchedule(hass, options) if options.get(CONF_ADAPTIVE) else None
+        self.poll_mode = POLL_MODE_DAY
+        self._intervals = {interval: interval for interval in plan.groups}
+        self._irradiance_key = next(
+            (
+                key for key in plan.channels
+                if SENSOR_TYPES.get(key, {}).get("device_class") == SensorDeviceClass.IRRADIANCE
+            ),
+            None,
+        )
+
+        # Derived metrics are computed from each irradiance sample as it arrives
+        self.derived = None
+        if self._irradiance_key and options.get(CONF_DERIVED, DEFAULT_DERIVED):
+            self.derived = DerivedMetrics(
+                self._irradiance_key,
+                next((key for key in AMBIENT_TEMP_KEYS if key in plan.channels), None),
+                WIND_SPEED_KEY if WIND_SPEED_KEY in plan.channels else None,
+                options,
+            )
+
+        # Outlier filters run on every fresh sample, before anything else sees it
+        self.filters = {}
+        for key in plan.channels:
+            channel_filter = build_filter(config, key)
+            if channel_filter is not None:
+                self.filters[key] = channel_filter
+
+        # Blocks rejected by the device are split at runtime, per interval group
+        self._read_plans = {interval: list(blocks) for interval, blocks in plan.blocks.items()}
+        groups = plan.groups
+
+        # Windowed aggregation: one time window per channel, so adaptive
+        # polling changes how many samples it holds, not how long it covers.
+        # Its ring is sized for the fastest rate the channel can be polled at.
+        self.aggregators = {}
+        self.aggregates = {}
+        self._aggregate_publish = {} # Key: sensor key, Value: [interval, next publish]
+        for interval, keys in groups.items():
+            # Fast polling (twilight, variable sky) packs the most samples into a window
+            fastest = self.schedule.interval(interval, POLL_MODE_VARIABLE) if self.schedule else interval
+            for key in keys:
+                window = int(self.config.get(f"{key}_{CONF_AGGREGATE_WINDOW}", DEFAULT_AGGREGATE_WINDOW))
+                if window <= 0:
+                    continue
+                publish = int(self.config.get(f"{key}_{CONF_AGGREGATE_INTERVAL}") or window)
+                self.aggregators[key] = WindowStats(
+                    math.ceil(window / fastest) + AGGREGATE_HEADROOM, span=window
+                )
+                self._aggregate_publish[key] = [max(1, publish), time.monotonic() + publish]
+        self._next_due = {interval: 0.0 for interval in groups}
+        self.stats = PollStats()
+
+        # Request timeouts follow the latency of this unit and the line speed
+        self.timeouts = AdaptiveTimeout(bus.char_time)
+        # Per poll: re-reads left, registers that could not be read,
+        # whether the unit answered anything at all and whether it was given
+        # up on after a first timeout
+        self._retries_left = 0
+        self._failed_registers = set()
+        self._answered = False
+        self._given_up = False
+        # Whether the unit answered since it was last found silent
+        self._responsive = False
+        # Keys whose latest read failed; only their entities go unavailable
+        self.failed_keys = set()
+
+        # Key: unique_id of a raw channel entity, Value: sensor key
+        self.entity_keys = {}
+        self._tick = plan.tick
+
         super().__init__(
             hass,
             _LOGGER,
             name=DOMAIN,
-            update_interval=SCAN_INTERVAL,
+            update_interval=timedelta(seconds=self._tick),
         )
-        self.config = config
-        self.client = None
-        self._connect_client()
 
-    def _connect_client(self):
-        """Initialize Modbus client."""
-        method = self.config.get(CONF_CONNECTION_METHOD)
-        
-        if method == METHOD_MODBUS_TCP:
-            host = self.config.get(CONF_IP_ADDRESS)
-            port = self.config.get(CONF_PORT, 502)
-            _LOGGER.debug(f"Initializing Modbus TCP Client: {host}:{port}")
-            self.client = ModbusTcpClient(host=host, port=port)
-            
-        elif method == METHOD_RS485:
-            port = self.config.get(CONF_SERIAL_PORT)
-            baud = self.config.get(CONF_BAUDRATE, 9600)
-            _LOGGER.debug(f"Initializing Modbus Serial Client: {port} @ {baud}")
-            self.client = ModbusSerialClient(
-                port=port,
-                baudrate=baud,
-                bytesize=8,
-                parity='N',
-                stopbits=1,
-            )
-    
+    @property
+    def diagnostics(self) -> dict:
+        """Return poll statistics and the bus connection state."""
+        return {
+            **self.stats.as_dict(),
+            "connection": self.bus.connection_info,
+            "poll_mode": self.poll_mode,
+            "sun_elevation": self.schedule.elevation if self.schedule else None,
+            "request_timeout_ms": (
+                round(self.timeouts.allowance * 1000, 1) if self.timeouts.allowance is not None else None
+            ),
+            "failed_keys": sorted(self.failed_keys),
+            "filters": {
+                key: {"method": f.method, "rejected": f.rejected, "replaced": f.replaced}
+                for key, f in self.filters.items()
+            },
+        }
+
     async def _async_update_data(self):
-        """Fetch data from Modbus."""
-        if not self.client:
-            self._connect_client()
-            
-        if not self.client.connect():
-             raise UpdateFailed(f"Could not connect to Modbus device ({self.config.get(CONF_CONNECTION_METHOD)})")
-             
+        """Fetch the registers whose poll interval is due."""
         data = {}
-        slave_id = self.config.get(CONF_MODBUS_ID, 1) if self.config.get(CONF_CONNECTION_METHOD) == METHOD_RS485 else 1
-        
+        # TCP gateways route to the RTU side by unit ID, so it matters on both transports
+        slave_id = int(self.config.get(CONF_MODBUS_ID, 1))
+
+        now = time.monotonic()
+        if self.schedule is not None:
+            self._set_poll_mode(self.schedule.mode(), now)
+
+        # Half a tick of slack so scheduling jitter does not skip a slot
+        due = [
+            interval for interval, due_at in self._next_due.items()
+            if now >= due_at - self._tick / 2
+        ]
+        if not due:
+            return self.data
+
+        # A silent unit is skipped without taking the bus from the others
+        retry_in = self.bus.slave_retry_in(slave_id)
+        if retry_in:
+            raise UpdateFailed(f"Unit {slave_id} is not answering, next attempt in {retry_in:.0f}s")
+
+        started = time.perf_counter()
         try:
-             # Run sync modbus call in executor
-            def read_modbus():
+            # Runs on the event loop, queued behind other entries on the same bus
+            async def read_modbus():
+                if not await self.bus.async_connect():
+                    return None
+
+                self._retries_left = POLL_RETRY_BUDGET
+                self._failed_registers = set()
+                self._answered = False
+                self._given_up = False
+                self.timeouts.update()
                 results = {}
-                # Collect addresses we need and their types
-                # Use a specific structure to handle same address potentially being used as different types (rare but possible)
-                needed_reads = {} # Key: addr, Value: type
-                
-                for key in SENSOR_TYPES:
-                    # Skip if disabled
-                    if not self.config.get(f"{key}_enabled", True):
-                        continue
-                        
-                    addr = self.config.get(f"{key}_addr")
-                    # Default to INPUT based on user request/defaults, but fallback to HOLDING if not specified
-                    reg_type = self.config.get(f"{key}_{CONF_REGISTER_TYPE}", REG_TYPE_INPUT)
-                    
-                    if addr is not None:
-                        needed_reads[addr] = reg_type
-
-                for addr, reg_type in needed_reads.items():
-                    # Read 1 register
-                    if reg_type == REG_TYPE_INPUT:
-                        rr = self.client.read_input_registers(address=addr, count=1, slave=slave_id)
-                    else: # Default or Holding
-                        rr = self.client.read_holding_registers(address=addr, count=1, slave=slave_id)
-                        
-                    if rr.isError():
-                        _LOGGER.warning(f"Error reading address {addr} (Type: {reg_type}): {rr}")
-                        results[addr] = None
-                    else:
-                        results[addr] = rr.registers[0]
+                if self.bus.pipeline_depth > 1:
+                    await self._read_pipelined(due, slave_id, results)
+                    return results
+
+                for interval in due:
+                    next_plan = []
+                    for block in self._read_plans[interval]:
+                        next_plan.extend(await self._read_block(block, slave_id, results))
+                    # Keep the split blocks so a rejected range is not retried every poll
+                    self._read_plans[interval] = next_plan
                 return results
 
-            data = await self.hass.async_add_executor_job(read_modbus)
+            data = await self.bus.async_execute(read_modbus)
             
         except Exception as e:
-            self.client.close()
+            self.stats.record_poll(time.perf_counter() - started, False)
+            # The bus decides whether the error warrants a reconnect
             raise UpdateFailed(f"Modbus error: {e}")
 
-        return data
+        if data is None:
+            self.stats.record_poll(time.perf_counter() - started, False)
+            raise UpdateFailed(f"Could not connect to Modbus device ({self.config.get(CONF_CONNECTION_METHOD)})")
+
+        if not self._answered:
+            # Nothing came back: back off so the unit does not hold the bus,
+            # and relearn its latency from the default timeout once it is back
+            self.bus.mark_silent(slave_id)
+            self._responsive = False
+            self.timeouts.reset()
+            self.stats.record_poll(time.perf_counter() - started, False)
+            raise UpdateFailed(f"Unit {slave_id} did not answer")
+        self._responsive = True
+
+        snapshot = {}
+        sampled_at = time.time()
+        for interval in due:
+            self._next_due[interval] = now + self._intervals[interval]
+            for key in self.plan.groups[interval]:
+                if self.plan.channels[key].register in self._failed_registers:
+                    self.failed_keys.add(key)
+                else:
+                    self.failed_keys.discard(key)
+                value = self._scale(key, data)
+                if self.samples is not None and value is not None:
+                    self.samples.append(sampled_at, self._sample_keys[key], value)
+                if key in self.filters:
+                    value = self.filters[key].process(value)
+                snapshot[key] = value
+
+        # Sensors that were not due keep their last value
+        merged = {**(self.data or {}), **snapshot}
+
+        self._update_aggregates(snapshot, now)
+        if self._irradiance_key in snapshot:
+            if self.schedule is not None:
+                self.schedule.add_irradiance(snapshot[self._irradiance_key])
+            if self.derived is not None:
+                # Ambient temperature and wind may come from a slower group
+                self.derived.update(merged, now, dt_util.now())
+        self.stats.record_values(snapshot)
+        self.stats.record_poll(time.perf_counter() - started, True, bool(self._failed_registers))
+
+        return merged
+
+    def _set_poll_mode(self, mode, now):
+        """Apply the intervals of a poll mode when it changes."""
+        if mode == self.poll_mode:
+            return
+        _LOGGER.debug(f"Poll mode {self.poll_mode} -> {mode} (sun elevation {self.schedule.elevation})")
+        self.poll_mode = mode
+        self._intervals = {
+            interval: self.schedule.interval(interval, mode) for interval in self.plan.groups
+        }
+        self._tick = poll_tick(self._intervals.values())
+        self.update_interval = timedelta(seconds=self._tick)
+        # Groups parked for the night are brought forward at sunrise
+        for interval, effective in self._intervals.items():
+            self._next_due[interval] = min(self._next_due[interval], now + effective)
+
+    def _scale(self, key, registers):
+        """Return the finished value of a sensor from the decoded registers."""
+        channel = self.plan.channels[key]
+        raw_val = registers.get(channel.register)
+        if raw_val is None:
+            return None
+        return round((float(raw_val) * channel.gain) + channel.offset, 2)
+
+    def _update_aggregates(self, fresh, now):
+        """Feed fresh sensor values to the windows and publish when due."""
+        for key, stats in self.aggregators.items():
+            value = fresh.get(key)
+            if value is not None:
+                stats.add(value, now)
+            else:
+                stats.expire(now)
+
+            schedule = self._aggregate_publish[key]
+            if now >= schedule[1]:
+                self.aggregates[key] = stats.snapshot()
+                schedule[1] = now + schedule[0]
+
+    async def _read_pipelined(self, due, slave_id, results):
+        """Issue every due block at once; the client bounds how many are in flight.
+
+        Timeouts and round-trip times only start once a block holds a slot.
+        """
+        reads = [
+            (interval, self._read_block(block, slave_id, results))
+            for interval in due
+            for block in self._read_plans[interval]
+        ]
+        outcomes = await asyncio.gather(*(read for _, read in reads), return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+
+        next_plans = {interval: [] for interval in due}
+        for (interval, _), blocks in zip(reads, outcomes):
+            next_plans[interval].extend(blocks)
+        self._read_plans.update(next_plans)
+
+    async def _read_block(self, block, slave_id, results, retry=False):
+        """Read a block and store its decoded values in results.
+
+        Values are keyed by (register type, address) so an input and a
+        holding register at the same address do not collide.
+
+        Returns the blocks to use for this range on the next poll. When the
+        device rejects the range with an illegal-address exception the block
+        is bisected and retried, down to single register reads. A block that
+        times out is read again while the poll's retry budget lasts, then
+        only its registers are given up on. A unit that has not answered
+        since it went silent is given up on at its first timeout, so it
+        does not hold the bus through retries and the remaining blocks.
+        """
+        if self._given_up:
+            self._fail_block(block, results)
+            return [block]
+
+        timeout = self.timeouts.retry_timeout(block.count) if retry else self.timeouts.timeout(block.count)
+        try:
+            rr, rtt = await self.bus.async_read_timed(
+                block.reg_type, block.address, block.count, slave_id, timeout
+            )
+        except Exception as e:
+            self.stats.record_exception(block.reg_type, block.address, type(e).__name__)
+            # A lost connection fails the whole poll
+            if not self.bus.is_transient(e):
+                raise
+            if not self._answered and not self._responsive:
+                self._given_up = True
+            elif self._retries_left > 0:
+                self._retries_left -= 1
+                self.stats.retries += 1
+                return await self._read_block(block, slave_id, results, retry=True)
+            _LOGGER.debug(f"No answer for {block.address}-{block.end} ({block.reg_type}) from unit {slave_id}: {e!r}")
+            self._fail_block(block, results)
+            return [block]
+        self.stats.record_request(rtt)
+        self.timeouts.record(rtt, block.count)
+        self._answered = True
+
+        if not rr.isError():
+            for addr, value in block.decoder.decode(rr.registers).items():
+                results[(block.reg_type, addr)] = value
+            return [block]
+
+        code = getattr(rr, "exception_code", None)
+        self.stats.record_exception(block.reg_type, block.address, code if code is not None else "error")
+
+        if code == MODBUS_ILLEGAL_ADDRESS and len(block.wanted) > 1:
+            _LOGGER.debug(f"Block {block.address}-{block.end} ({block.reg_type}) rejected, splitting")
+            self.stats.retries += 1
+            next_plan = []
+            for half in split_block(block):
+                next_plan.extend(await self._read_block(half, slave_id, results))
+            return next_plan
 
-class IrradianceSensorEntity(CoordinatorEntity, SensorEntity):
+        _LOGGER.warning(f"Error reading address {block.address} (Type: {block.reg_type}, Count: {block.count}): {rr}")
+        self._fail_block(block, results)
+        return [block]
+
+    def _fail_block(self, block, results):
+        """Mark the registers of a block as unread in this poll."""
+        for addr in block.wanted:
+            results[(block.reg_type, addr)] = None
+            self._failed_registers.add((block.reg_type, addr))
+
+class IrradianceSensorEntity(CoordinatorEntity, RestoreSensor):
     """Representation of an Irradiance Sensor."""
 
     _attr_has_entity_name = True
 
-    def __init__(self, coordinator, entry, key, name_suffix, unit, device_class):
+    def __init__(self, coordinator, device_id, key, name_suffix, unit, device_class):
         """Initialize the sensor."""
         super().__init__(coordinator)
-        self._entry = entry
+        self._device_id = device_id
         self._key = key
         
         self._attr_name = name_suffix
         
-        # Use custom unique_id if provided, otherwise fallback to entry_id based
-        custom_uid = entry.data.get(f"{key}_{CONF_ROW_UNIQUE_ID}")
-        if custom_uid:
-             self._attr_unique_id = custom_uid
-        else:
-             self._attr_unique_id = f"{entry.entry_id}_{key}"
+        config = coordinator.config
+        self._attr_unique_id = _base_unique_id(config, device_id, key)
         self._attr_native_unit_of_measurement = unit
         self._attr_device_class = device_class
         self._attr_state_class = SensorStateClass.MEASUREMENT
-        
-        self._addr = entry.data.get(f"{key}_addr", 0)
-        self._gain = entry.data.get(f"{key}_gain", 1.0)
-        self._offset = entry.data.get(f"{key}_offset", 0.0)
+
+
+        # Publishing filter
+        self._deadband = float(config.get(f"{key}_{CONF_DEADBAND}", DEFAULT_DEADBAND))
+        self._deadband_pct = float(config.get(f"{key}_{CONF_DEADBAND_PCT}", DEFAULT_DEADBAND_PCT))
+        self._heartbeat = int(config.get(f"{key}_{CONF_HEARTBEAT}", DEFAULT_HEARTBEAT))
+        self._published_value = self._compute_value()
+        self._published_available = coordinator.last_update_success
+        self._last_publish = time.monotonic()
+
+    async def async_added_to_hass(self) -> None:
+        """Show the last known value until the first poll answers."""
+        await super().async_added_to_hass()
+        # The first poll may already be done when running in the background
+        self._published_value = self._compute_value()
+        if self._published_value is not None:
+            return
+        last_data = await self.async_get_last_sensor_data()
+        if last_data is not None:
+            self._published_value = last_data.native_value
 
     @property
     def device_info(self) -> DeviceInfo:
         """Return device information about this entity."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._entry.entry_id)},
-            name=self._entry.data.get(CONF_ENTITY_NAME, "Irradiance Sensor"),
-            manufacturer="Custom Integration",
-            model=self._entry.data.get(CONF_SENSOR_MODEL, "Generic"),
-            configuration_url=(
-                f"http://{self._entry.data.get(CONF_IP_ADDRESS)}" 
-                if self._entry.data.get(CONF_CONNECTION_METHOD) == METHOD_MODBUS_TCP 
-                else None
-            ),
-        )
+        return _device_info(self.coordinator.config, self._device_id)
+
+    @property
+    def available(self) -> bool:
+        """Return False while the latest read of this channel failed."""
+        return super().available and self._key not in self.coordinator.failed_keys
 
     @property
     def native_value(self):
-        """Return the state of the sensor."""
+        """Return the last published state of the sensor."""
+        return self._published_value
+
+    def _compute_value(self):
+        """Return the value from the latest coordinator snapshot."""
         if self.coordinator.data is None:
             return None
-            
-        raw_val = self.coordinator.data.get(self._addr)
-        if raw_val is None:
+        # Gain, offset and rounding are applied once per refresh by the coordinator
+        return self.coordinator.data.get(self._key)
+
+    def _should_publish(self, value) -> bool:
+        """Return True if a new value is worth a state write."""
+        if self.available != self._published_available:
+            return True
+        if (value is None) != (self._published_value is None):
+            return True
+        if self._heartbeat and time.monotonic() - self._last_publish >= self._heartbeat:
+            return True
+        if value is None or value == self._published_value:
+            return False
+
+        delta = abs(value - self._published_value)
+        threshold = max(self._deadband, abs(self._published_value) * self._deadband_pct / 100)
+        return delta > threshold
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when the value leaves the deadband or the heartbeat expires."""
+        value = self._compute_value()
+        if not self._should_publish(value):
+            return
+
+        self._published_value = value
+        self._published_available = self.available
+        self._last_publish = time.monotonic()
+        self.async_write_ha_state()
+
+
+
+class IrradianceAggregateEntity(CoordinatorEntity, SensorEntity):
+    """Mean, min or max of a channel over its aggregation window."""
+
+    _attr_has_entity_name = True
+
+    def __init__(self, coordinator, device_id, key, stat, name, unit, device_class):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._device_id = device_id
+        self._key = key
+        self._stat = stat
+
+        self._attr_name = name
+        self._attr_unique_id = f"{_base_unique_id(coordinator.config, device_id, key)}_{stat}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_class = device_class
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._published = coordinator.aggregates.get(key)
+        self._published_available = coordinator.last_update_success
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return device information about this entity."""
+        return _device_info(self.coordinator.config, self._device_id)
+
+    @property
+    def native_value(self):
+        """Return the statistic of the last published window."""
+        if not self._published:
             return None
-            
-        # Apply logic
-        value = (float(raw_val) * self._gain) + self._offset
-        return round(value, 2)
\ No newline at end of file
+        return round(self._published[self._stat], 2)
+
+    @property
+    def extra_state_attributes(self):
+        """Return the number of samples behind the statistic."""
+        if not self._published:
+            return None
+        return {"samples": self._published["samples"]}
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when the coordinator published a new window."""
+        snapshot = self.coordinator.aggregates.get(self._key)
+        if snapshot is self._published and self.available == self._published_available:
+            return
+        self._published = snapshot
+        self._published_available = self.available
+        self.async_write_ha_state()
+
+
+
+DERIVED_SENSORS = (
+    SensorEntityDescription(
+        key=DERIVED_INSOLATION,
+        name="Insolation today",
+        native_unit_of_measurement="Wh/m²",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        icon="mdi:sun-clock",
+    ),
+    SensorEntityDescription(
+        key=DERIVED_CELL_TEMP_NOCT,
+        name="Cell temperature (NOCT)",
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        device_class=SensorDeviceClass.TEMPERATURE,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    SensorEntityDescription(
+        key=DERIVED_CELL_TEMP_SANDIA,
+        name="Cell temperature (Sandia)",
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        device_class=SensorDeviceClass.TEMPERATURE,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    SensorEntityDescription(
+        key=DERIVED_RAMP_RATE,
+        name="Irradiance ramp rate",
+        native_unit_of_measurement="W/m²/min",
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:chart-line-variant",
+    ),
+)
+
+
+class IrradianceDerivedEntity(CoordinatorEntity, RestoreSensor):
+    """Metric computed by the coordinator from the raw channels."""
+
+    _attr_has_entity_name = True
+
+    def __init__(self, coordinator, device_id, description):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._device_id = device_id
+        self.entity_description = description
+        self._attr_unique_id = f"{device_id}_{description.key}"
+
+    async def async_added_to_hass(self) -> None:
+        """Carry today's insolation over a restart."""
+        await super().async_added_to_hass()
+        if self.entity_description.key != DERIVED_INSOLATION:
+            return
+        last_state = await self.async_get_last_state()
+        last_data = await self.async_get_last_sensor_data()
+        if last_state is None or last_data is None or last_data.native_value is None:
+            return
+        try:
+            value = float(last_data.native_value)
+        except (TypeError, ValueError):
+            return
+        self.coordinator.derived.restore_insolation(
+            value, dt_util.as_local(last_state.last_updated).date()
+        )
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return device information about this entity."""
+        return _device_info(self.coordinator.config, self._device_id)
+
+    @property
+    def native_value(self):
+        """Return the latest derived value."""
+        return self.coordinator.derived.values.get(self.entity_description.key)
+
+
+@dataclass(frozen=True)
+class IrradianceDiagnosticDescription(SensorEntityDescription):
+    """Describes a poll performance sensor."""
+
+    value_fn: Callable[[IrradianceDataCoordinator], Any] = lambda coordinator: None
+
+
+DIAGNOSTIC_SENSORS = (
+    IrradianceDiagnosticDescription(
+        key="poll_duration",
+        name="Poll duration",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda c: (
+            round(c.stats.last_poll_duration * 1000, 1)
+            if c.stats.last_poll_duration is not None else None
+        ),
+    ),
+    IrradianceDiagnosticDescription(
+        key="request_rtt",
+        name="Request round-trip time",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda c: c.stats.mean_rtt,
+    ),
+    IrradianceDiagnosticDescription(
+        key="poll_mode",
+        name="Poll mode",
+        device_class=SensorDeviceClass.ENUM,
+        options=[POLL_MODE_NIGHT, POLL_MODE_TWILIGHT, POLL_MODE_DAY, POLL_MODE_VARIABLE],
+        value_fn=lambda c: c.poll_mode,
+    ),
+    IrradianceDiagnosticDescription(
+        key="failed_polls",
+        name="Failed polls",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda c: c.stats.failed_polls,
+    ),
+    IrradianceDiagnosticDescription(
+        key="frames_per_second",
+        name="Bus frames per second",
+        native_unit_of_measurement="frames/s",
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:swap-horizontal",
+        value_fn=lambda c: c.bus.frames_per_second,
+    ),
+    IrradianceDiagnosticDescription(
+        key="reconnects",
+        name="Reconnects",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda c: c.bus.connection_info["reconnects"],
+    ),
+)
+
+
+class IrradianceDiagnosticEntity(CoordinatorEntity, SensorEntity):
+    """Poll performance figure of a device."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    entity_description: IrradianceDiagnosticDescription
+
+    def __init__(self, coordinator, device_id, description):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._device_id = device_id
+        self.entity_description = description
+        self._attr_unique_id = f"{device_id}_{description.key}"
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return device information about this entity."""
+        return _device_info(self.coordinator.config, self._device_id)
+
+    @property
+    def available(self) -> bool:
+        """Stay available while polls fail, that is when these matter most."""
+        return True
+
+    @property
+    def native_value(self):
+        """Return the current figure."""
+        return self.entity_description.value_fn(self.coordinator)
@@ -0,0 +1,184 @@
+"""Services of the Irradiance Sensor integration."""
+from __future__ import annotations
+
+import logging
+
+import voluptuous as vol
+
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.util import dt as dt_util
+
+from .backfill import (
+    async_backfill,
+    async_iter_binary,
+    async_iter_csv,
+    async_iter_device_history,
+)
+from .const import (
+    DOMAIN,
+    DATA_COORDINATORS,
+    DATA_SAMPLES,
+    SENSOR_TYPES,
+    CONF_MODBUS_ID,
+    SERVICE_BACKFILL,
+    BACKFILL_SOURCE_DEVICE,
+    BACKFILL_SOURCE_CSV,
+    BACKFILL_SOURCE_BINARY,
+    SERVICE_EXPORT_SAMPLES,
+    EXPORT_FORMAT_CSV,
+    EXPORT_FORMAT_BINARY,
+)
+from .samples import sample_key
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_SOURCE = "source"
+ATTR_PATH = "path"
+ATTR_ADDRESS = "address"
+ATTR_RECORDS = "records"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_FORMAT = "format"
+
+BACKFILL_SCHEMA = vol.Schema({
+    vol.Required(ATTR_ENTITY_ID): cv.entity_id,
+    vol.Required(ATTR_SOURCE): vol.In(
+        [BACKFILL_SOURCE_DEVICE, BACKFILL_SOURCE_CSV, BACKFILL_SOURCE_BINARY]
+    ),
+    vol.Optional(ATTR_PATH): cv.string,
+    vol.Optional(ATTR_ADDRESS): vol.All(vol.Coerce(int), vol.Range(min=0, max=65535)),
+    vol.Optional(ATTR_RECORDS): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    vol.Optional(ATTR_START): cv.datetime,
+    vol.Optional(ATTR_END): cv.datetime,
+})
+
+EXPORT_SCHEMA = vol.Schema({
+    vol.Required(ATTR_ENTITY_ID): cv.entity_id,
+    vol.Required(ATTR_PATH): cv.string,
+    vol.Optional(ATTR_FORMAT, default=EXPORT_FORMAT_CSV): vol.In(
+        [EXPORT_FORMAT_CSV, EXPORT_FORMAT_BINARY]
+    ),
+    vol.Optional(ATTR_START): cv.datetime,
+    vol.Optional(ATTR_END): cv.datetime,
+})
+
+
+def _as_utc(when):
+    """Return a service datetime in UTC, reading naive ones as local time."""
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    return dt_util.as_utc(when)
+
+
+def _find_channel(hass: HomeAssistant, entity_id: str):
+    """Return (coordinator, key, registry entry) behind a sensor entity."""
+    entity = er.async_get(hass).async_get(entity_id)
+    if entity is None or entity.platform != DOMAIN:
+        raise ServiceValidationError(f"{entity_id} is not an Irradiance Sensor entity")
+
+    entry_data = hass.data.get(DOMAIN, {}).get(entity.config_entry_id, {})
+    for coordinator in entry_data.get(DATA_COORDINATORS, []):
+        key = coordinator.entity_keys.get(entity.unique_id)
+        if key is not None:
+            return coordinator, key, entity
+    raise ServiceValidationError(f"{entity_id} is not a raw channel of a loaded entry")
+
+
+async def _async_handle_backfill(call: ServiceCall) -> dict:
+    """Import a history window as long-term statistics of a sensor."""
+    hass = call.hass
+    entity_id = call.data[ATTR_ENTITY_ID]
+    source = call.data[ATTR_SOURCE]
+    coordinator, key, entity = _find_channel(hass, entity_id)
+
+    if source == BACKFILL_SOURCE_DEVICE:
+        if ATTR_ADDRESS not in call.data or ATTR_RECORDS not in call.data:
+            raise ServiceValidationError("A device backfill needs the history address and record count")
+        samples = async_iter_device_history(
+            coordinator.bus,
+            coordinator.plan.channels[key],
+            int(coordinator.config.get(CONF_MODBUS_ID, 1)),
+            call.data[ATTR_ADDRESS],
+            call.data[ATTR_RECORDS],
+        )
+    else:
+        path = call.data.get(ATTR_PATH)
+        if not path or not hass.config.is_allowed_path(path):
+            raise ServiceValidationError(f"{path} is not in allowlist_external_dirs")
+        if source == BACKFILL_SOURCE_CSV:
+            samples = async_iter_csv(hass, path)
+        else:
+            samples = async_iter_binary(hass, path)
+
+    metadata = {
+        "has_mean": True,
+        "has_sum": False,
+        "name": None,
+        "source": "recorder",
+        "statistic_id": entity_id,
+        "unit_of_measurement": entity.unit_of_measurement or SENSOR_TYPES.get(key, {}).get("unit"),
+    }
+    try:
+        return await async_backfill(
+            hass,
+            metadata,
+            samples,
+            start=_as_utc(call.data.get(ATTR_START)),
+            end=_as_utc(call.data.get(ATTR_END)),
+        )
+    except (OSError, ValueError, ConnectionError, TimeoutError) as e:
+        raise HomeAssistantError(f"Backfill of {entity_id} failed: {e}") from e
+
+
+async def _async_handle_export(call: ServiceCall) -> dict:
+    """Write the stored raw samples of a sensor to a file."""
+    hass = call.hass
+    entity_id = call.data[ATTR_ENTITY_ID]
+    path = call.data[ATTR_PATH]
+    coordinator, key, entity = _find_channel(hass, entity_id)
+
+    store = hass.data[DOMAIN][entity.config_entry_id].get(DATA_SAMPLES)
+    if store is None:
+        raise ServiceValidationError(f"The sample store of {entity_id} is not enabled")
+    if not hass.config.is_allowed_path(path):
+        raise ServiceValidationError(f"{path} is not in allowlist_external_dirs")
+
+    start = _as_utc(call.data.get(ATTR_START))
+    end = _as_utc(call.data.get(ATTR_END))
+    try:
+        written = await hass.async_add_executor_job(
+            store.export,
+            path,
+            sample_key(coordinator.config.get(CONF_MODBUS_ID, 1), key),
+            start.timestamp() if start else None,
+            end.timestamp() if end else None,
+            call.data[ATTR_FORMAT],
+        )
+    except (OSError, ValueError) as e:
+        raise HomeAssistantError(f"Export of {entity_id} failed: {e}") from e
+
+    _LOGGER.info(f"Exported {written} samples of {entity_id} to {path}")
+    return {"samples": written, "path": path}
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services."""
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BACKFILL,
+        _async_handle_backfill,
+        schema=BACKFILL_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_SAMPLES,
+        _async_handle_export,
+        schema=EXPORT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
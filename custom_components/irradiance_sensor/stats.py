@@ -0,0 +1,94 @@
+"""Bounded in-memory poll statistics."""
+from __future__ import annotations
+
+from collections import Counter, deque
+from datetime import datetime
+
+from homeassistant.util import dt as dt_util
+
+from .const import STATS_HISTORY
+
+
+def _percentiles(samples) -> dict | None:
+    """Return p50/p90/p99/max in milliseconds, or None without samples."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+
+    def pick(pct):
+        return round(ordered[min(last, int(pct / 100 * len(ordered)))] * 1000, 2)
+
+    return {"p50": pick(50), "p90": pick(90), "p99": pick(99), "max": round(ordered[-1] * 1000, 2)}
+
+
+class PollStats:
+    """Counters and latency histories for one coordinator.
+
+    Latencies keep the last STATS_HISTORY samples; per-address and per-key
+    tables are bounded by the size of the read plan.
+    """
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.polls = 0
+        self.failed_polls = 0
+        self.partial_polls = 0
+        self.requests = 0
+        self.retries = 0
+        self.poll_durations = deque(maxlen=STATS_HISTORY)
+        self.request_rtts = deque(maxlen=STATS_HISTORY)
+        self.exception_codes: dict[str, Counter] = {}
+        self.last_success: dict[str, datetime] = {}
+        self.last_poll_duration = None
+
+    def record_poll(self, duration: float, ok: bool, partial: bool = False) -> None:
+        """Record the outcome of a refresh; partial ones lost some registers."""
+        self.polls += 1
+        self.failed_polls += not ok
+        self.partial_polls += partial
+        self.poll_durations.append(duration)
+        self.last_poll_duration = duration
+
+    def record_request(self, rtt: float) -> None:
+        """Record the round-trip time of a single Modbus request."""
+        self.requests += 1
+        self.request_rtts.append(rtt)
+
+    def record_exception(self, reg_type: str, address: int, code) -> None:
+        """Count an exception (or error) answered for a block address."""
+        counter = self.exception_codes.setdefault(f"{reg_type}:{address}", Counter())
+        counter[str(code)] += 1
+
+    def record_values(self, snapshot: dict) -> None:
+        """Remember when each key last produced a value."""
+        now = dt_util.utcnow()
+        for key, value in snapshot.items():
+            if value is not None:
+                self.last_success[key] = now
+
+    @property
+    def mean_rtt(self) -> float | None:
+        """Return the mean request round-trip time in milliseconds."""
+        if not self.request_rtts:
+            return None
+        return round(sum(self.request_rtts) / len(self.request_rtts) * 1000, 2)
+
+    def as_dict(self) -> dict:
+        """Return every statistic in a JSON friendly form."""
+        return {
+            "polls": self.polls,
+            "failed_polls": self.failed_polls,
+            "partial_polls": self.partial_polls,
+            "requests": self.requests,
+            "requests_per_poll": round(self.requests / self.polls, 2) if self.polls else None,
+            "retries": self.retries,
+            "poll_duration_ms": _percentiles(self.poll_durations),
+            "request_rtt_ms": _percentiles(self.request_rtts),
+            "exception_codes": {
+                address: dict(counter) for address, counter in self.exception_codes.items()
+            },
+            "last_success": {
+                key: when.isoformat() for key, when in self.last_success.items()
+            },
+        }
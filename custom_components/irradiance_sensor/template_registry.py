@@ -0,0 +1,125 @@
+"""Registry of sensor templates shared by every config flow.
+
+Bundled templates ship in templates.json inside the integration and are
+re-read only when that file changes. User templates live in HA's storage
+directory, so they survive HACS updates, and are written atomically.
+Earlier versions saved user templates into templates.json itself; those
+are copied to storage the first time it is loaded.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN,
+    DATA_TEMPLATES,
+    MODEL_GENERIC,
+    TEMPLATES_STORAGE_KEY,
+    TEMPLATES_STORAGE_VERSION,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+BUNDLED_TEMPLATES_PATH = os.path.join(os.path.dirname(__file__), "templates.json")
+
+# Templates shipped in templates.json; anything else in it was saved by a user
+SHIPPED_TEMPLATES = (MODEL_GENERIC, "Ingenieurbüro Si-RS485TC-2T-v-MB")
+
+
+def _read_bundled(path, known_mtime):
+    """Return (mtime, templates) of the bundled file, or None if unchanged."""
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return 0.0, {}
+    if mtime == known_mtime:
+        return None
+
+    with open(path, 'r') as f:
+        data = json.load(f)
+    templates = {
+        item["name"]: item.get("registers", {})
+        for item in data
+        if item.get("name")
+    }
+    return mtime, templates
+
+
+class TemplateRegistry:
+    """In-memory view over bundled and user templates."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self.hass = hass
+        self._store = Store(
+            hass, TEMPLATES_STORAGE_VERSION, TEMPLATES_STORAGE_KEY, atomic_writes=True
+        )
+        self._lock = asyncio.Lock()
+        self._bundled = {}
+        self._bundled_mtime = None
+        self._user = None
+        self._merged = None
+
+    async def _async_refresh(self):
+        """Load bundled templates when the file changed and user ones once."""
+        try:
+            result = await self.hass.async_add_executor_job(
+                _read_bundled, BUNDLED_TEMPLATES_PATH, self._bundled_mtime
+            )
+        except Exception as e:
+            _LOGGER.error(f"Error loading templates: {e}")
+            result = None
+        if result is not None:
+            self._bundled_mtime, self._bundled = result
+            self._merged = None
+
+        if self._user is None:
+            stored = await self._store.async_load()
+            if stored is None:
+                await self._async_migrate()
+            else:
+                self._user = stored.get("templates", {})
+            self._merged = None
+
+    async def _async_migrate(self):
+        """Move user templates saved in templates.json into storage."""
+        self._user = {
+            name: registers
+            for name, registers in self._bundled.items()
+            if name not in SHIPPED_TEMPLATES
+        }
+        await self._store.async_save({"templates": self._user})
+        if self._user:
+            _LOGGER.info(f"Moved user templates {', '.join(self._user)} from templates.json to storage")
+
+    async def async_get_templates(self) -> dict[str, dict]:
+        """Return every template by name, user templates overriding bundled ones."""
+        async with self._lock:
+            await self._async_refresh()
+            if self._merged is None:
+                self._merged = {**self._bundled, **self._user}
+                if not self._merged:
+                    self._merged = {MODEL_GENERIC: {}}
+            return self._merged
+
+    async def async_save_template(self, name: str, registers: dict) -> None:
+        """Store a user template, replacing one with the same name."""
+        async with self._lock:
+            await self._async_refresh()
+            self._user = {**self._user, name: registers}
+            self._merged = None
+            await self._store.async_save({"templates": self._user})
+
+
+def get_template_registry(hass: HomeAssistant) -> TemplateRegistry:
+    """Return the template registry, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_TEMPLATES not in domain_data:
+        domain_data[DATA_TEMPLATES] = TemplateRegistry(hass)
+    return domain_data[DATA_TEMPLATES]
@@ -0,0 +1,57 @@
+"""Request timeouts learnt from the response latency of a device."""
+from __future__ import annotations
+
+from collections import deque
+
+from .const import (
+    DEFAULT_TIMEOUT,
+    TIMEOUT_LATENCY_FACTOR,
+    MIN_REQUEST_TIMEOUT,
+    TIMEOUT_MIN_SAMPLES,
+    LATENCY_HISTORY,
+)
+from .rtu import read_wire_time
+
+
+class AdaptiveTimeout:
+    """Per-device request timeouts.
+
+    The latency of an answer is its round-trip time minus the time the
+    frames need on the wire at the line's speed, so blocks of any size
+    feed the same history. Until enough answers have been seen every
+    request gets the default timeout. A retry gets twice the timeout, so
+    a unit that slows down is learnt from the retries that succeed.
+    """
+
+    def __init__(self, char_time: float = 0.0) -> None:
+        """Initialize with the character time of the line (0 for TCP)."""
+        self.char_time = char_time
+        self._latencies = deque(maxlen=LATENCY_HISTORY)
+        self.allowance = None
+
+    def record(self, rtt: float, count: int) -> None:
+        """Record the round-trip time of an answered read."""
+        self._latencies.append(max(0.0, rtt - read_wire_time(self.char_time, count)))
+
+    def reset(self) -> None:
+        """Forget the history, e.g. after the unit stopped answering altogether."""
+        self._latencies.clear()
+        self.allowance = None
+
+    def update(self) -> None:
+        """Recompute the latency allowance; called once per poll."""
+        if len(self._latencies) < TIMEOUT_MIN_SAMPLES:
+            self.allowance = None
+            return
+        ordered = sorted(self._latencies)
+        p99 = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+        self.allowance = min(DEFAULT_TIMEOUT, max(MIN_REQUEST_TIMEOUT, p99 * TIMEOUT_LATENCY_FACTOR))
+
+    def timeout(self, count: int) -> float:
+        """Return the timeout for a read of count registers."""
+        allowance = DEFAULT_TIMEOUT if self.allowance is None else self.allowance
+        return allowance + read_wire_time(self.char_time, count)
+
+    def retry_timeout(self, count: int) -> float:
+        """Return the timeout for a second attempt at a read of count registers."""
+        return min(2 * self.timeout(count), DEFAULT_TIMEOUT + read_wire_time(self.char_time, count))
@@ -0,0 +1,40 @@
+"""Tests for windowed statistics."""
+from __future__ import annotations
+
+from custom_components.irradiance_sensor.aggregation import WindowStats
+
+
+def test_span_follows_time_not_sample_count():
+    """A 60 s window covers 60 s whatever the poll interval."""
+    stats = WindowStats(span=60)
+    # Fast polling: 5 s apart, the window keeps the last 12 samples
+    for i in range(30):
+        stats.add(float(i), i * 5.0)
+    assert stats.snapshot() == {"mean": 23.5, "min": 18.0, "max": 29.0, "samples": 12}
+
+    # Night polling: 600 s apart, only the latest sample is recent enough
+    stats.add(100.0, 145.0 + 600)
+    assert stats.snapshot() == {"mean": 100.0, "min": 100.0, "max": 100.0, "samples": 1}
+
+
+def test_expire_without_new_sample():
+    """Samples age out even when a poll brings no fresh value."""
+    stats = WindowStats(span=60)
+    stats.add(5.0, 0.0)
+    stats.add(7.0, 30.0)
+    stats.expire(70.0)
+    assert stats.snapshot() == {"mean": 7.0, "min": 7.0, "max": 7.0, "samples": 1}
+    stats.expire(90.0)
+    assert stats.snapshot() is None
+
+
+def test_size_bounds_the_window():
+    """A sized window keeps the last N samples."""
+    stats = WindowStats(3)
+    for value in (1.0, 9.0, 2.0, 3.0):
+        stats.add(value)
+    assert len(stats) == 3
+    assert stats.snapshot() == {"mean": 14 / 3, "min": 2.0, "max": 9.0, "samples": 3}
+    stats.reset()
+    stats.add(4.0)
+    assert stats.snapshot() == {"mean": 4.0, "min": 4.0, "max": 4.0, "samples": 1}
@@ -0,0 +1,117 @@
+"""Tests for the statistics backfill."""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.components import recorder
+from homeassistant.components.recorder import statistics
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.irradiance_sensor import backfill
+from custom_components.irradiance_sensor.backfill import (
+    BINARY_RECORD,
+    HourlyStatistics,
+    async_backfill,
+    async_iter_binary,
+    async_iter_csv,
+)
+
+HOUR = datetime(2024, 6, 1, 10, tzinfo=timezone.utc)
+
+
+def test_hourly_rows():
+    """Samples fold into one mean/min/max row per UTC hour."""
+    hourly = HourlyStatistics()
+    assert hourly.add(HOUR, 100.0) is None
+    assert hourly.add(HOUR + timedelta(minutes=30), 300.0) is None
+    row = hourly.add(HOUR + timedelta(hours=1, minutes=5), 50.0)
+    assert row == {"start": HOUR, "mean": 200.0, "min": 100.0, "max": 300.0}
+    assert hourly.flush() == {"start": HOUR + timedelta(hours=1), "mean": 50.0, "min": 50.0, "max": 50.0}
+    assert hourly.flush() is None
+    assert hourly.samples == 3
+
+
+def test_out_of_order_samples_are_skipped():
+    """A sample of an hour already handed out is counted and dropped."""
+    hourly = HourlyStatistics()
+    hourly.add(HOUR + timedelta(minutes=70), 10.0)
+    assert hourly.add(HOUR, 20.0) is None
+    # Earlier within the hour being built is fine
+    hourly.add(HOUR + timedelta(minutes=65), 30.0)
+    assert hourly.skipped == 1
+    assert hourly.flush()["mean"] == 20.0
+
+
+async def collect(samples):
+    """Return every sample of an async iterator."""
+    return [sample async for sample in samples]
+
+
+def test_csv_parsing(tmp_path):
+    """Header, unparsable lines and both timestamp styles are handled."""
+    path = tmp_path / "samples.csv"
+    path.write_text(
+        "timestamp,value\n"
+        f"{HOUR.timestamp():.3f},12.5\n"
+        "2024-06-01T10:30:00+00:00,other,13\n"
+        "2024-06-01T10:45:00+00:00,n/a\n"
+        "garbage\n"
+    )
+
+    async def run():
+        return await collect(async_iter_csv(HomeAssistant(str(tmp_path)), str(path)))
+
+    assert asyncio.run(run()) == [
+        (HOUR, 12.5),
+        (HOUR + timedelta(minutes=30), 13.0),
+    ]
+
+
+def test_binary_parsing(tmp_path):
+    """NaN values and a truncated last record are skipped."""
+    path = tmp_path / "samples.bin"
+    path.write_bytes(
+        BINARY_RECORD.pack(HOUR.timestamp(), 1.5)
+        + BINARY_RECORD.pack(HOUR.timestamp() + 60, float("nan"))
+        + BINARY_RECORD.pack(HOUR.timestamp() + 120, 2.5)
+        + b"\0" * 5
+    )
+
+    async def run():
+        return await collect(async_iter_binary(HomeAssistant(str(tmp_path)), str(path)))
+
+    assert asyncio.run(run()) == [(HOUR, 1.5), (HOUR + timedelta(minutes=2), 2.5)]
+
+
+def test_backfill_chunks_and_leaves_current_hour(tmp_path, monkeypatch):
+    """Rows are imported in chunks and the hour in progress is not imported."""
+    imported = []
+
+    class FakeRecorder:
+        async def async_block_till_done(self):
+            pass
+
+    monkeypatch.setattr(backfill, "BACKFILL_CHUNK_HOURS", 2)
+    monkeypatch.setattr(recorder, "get_instance", lambda hass: FakeRecorder())
+    monkeypatch.setattr(
+        statistics, "async_import_statistics", lambda hass, metadata, rows: imported.append(rows)
+    )
+
+    current_hour = dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
+
+    async def samples():
+        for hours_ago in range(5, -1, -1):
+            yield current_hour - timedelta(hours=hours_ago), float(hours_ago)
+
+    async def run():
+        return await async_backfill(
+            HomeAssistant(str(tmp_path)), {"statistic_id": "sensor.irradiance"}, samples()
+        )
+
+    result = asyncio.run(run())
+    assert [len(rows) for rows in imported] == [2, 2, 1]
+    starts = [row["start"] for rows in imported for row in rows]
+    assert starts == [current_hour - timedelta(hours=h) for h in range(5, 0, -1)]
+    assert result == {"hours": 5, "samples": 5, "skipped": 0}
@@ -0,0 +1,171 @@
+"""Tests for the shared Modbus bus."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+
+from custom_components.irradiance_sensor.bus import ModbusBus
+from custom_components.irradiance_sensor.const import (
+    CONF_CONNECTION_METHOD,
+    CONF_IP_ADDRESS,
+    CONF_PIPELINE_DEPTH,
+    CONF_PORT,
+    CONN_STATE_CONNECTED,
+    CONN_STATE_DISCONNECTED,
+    METHOD_MODBUS_TCP,
+    REG_TYPE_INPUT,
+)
+
+TCP_CONFIG = {
+    CONF_CONNECTION_METHOD: METHOD_MODBUS_TCP,
+    CONF_IP_ADDRESS: "192.0.2.1",
+    CONF_PORT: 502,
+}
+
+
+class FakeResponse:
+    """Read input registers answer."""
+
+    function_code = 4
+
+    def __init__(self, tid, address, count, slave):
+        self.transaction_id = tid
+        self.dev_id = slave
+        self.registers = list(range(address, address + count))
+
+    def isError(self):
+        return False
+
+
+class FakeContext:
+    """Transaction counter of a pymodbus client."""
+
+    next_tid = 0
+
+
+class FakeClient:
+    """Client that, like pymodbus, hands a late answer to the next request."""
+
+    def __init__(self, error=None, silent=(), short=False):
+        self.ctx = FakeContext()
+        self.connected = True
+        self.closes = 0
+        self.error = error
+        self.silent = set(silent)
+        self.short = short
+        self._late = None
+
+    async def connect(self):
+        self.connected = True
+        return True
+
+    def close(self):
+        self.closes += 1
+        self.connected = False
+        self._late = None
+
+    async def read_input_registers(self, address, count=1, slave=1):
+        if self.error is not None:
+            raise self.error
+        self.ctx.next_tid += 1
+        request = (self.ctx.next_tid, address, count, slave)
+        if self._late is not None:
+            # Whatever arrives first answers the waiting request
+            request, self._late = self._late, None
+        elif address in self.silent:
+            # The answer only comes after the request timed out
+            self._late = request
+            await asyncio.Event().wait()
+        if self.short:
+            request = (request[0], address, count - 1, slave)
+        return FakeResponse(*request)
+
+
+class FakePipelinedClient:
+    """Pipelined client whose requests never get an answer."""
+
+    # The bus only reads through read_timed on a pipelined client
+    read_input_registers = read_holding_registers = None
+
+    def __init__(self):
+        self.connected = True
+        self.closes = 0
+
+    async def read_timed(self, function, address, count, slave, timeout=None):
+        async with asyncio.timeout(timeout):
+            await asyncio.Event().wait()
+
+    def close(self):
+        self.closes += 1
+
+
+def connected_bus(client, config=TCP_CONFIG) -> ModbusBus:
+    """Return a TCP bus that believes it is connected through client."""
+    bus = ModbusBus(None, "tcp:192.0.2.1:502", config)
+    bus.client = client
+    bus.state = CONN_STATE_CONNECTED
+    return bus
+
+
+def test_late_answer_is_not_taken_for_the_next_reply():
+    """A timeout reconnects, so its late answer cannot answer the next read."""
+    async def run():
+        client = FakeClient(silent={0})
+        bus = connected_bus(client)
+        with pytest.raises(TimeoutError):
+            await bus.async_read(REG_TYPE_INPUT, 0, 2, 1, timeout=0.01)
+        rr = await bus.async_read(REG_TYPE_INPUT, 100, 2, 1, timeout=0.01)
+        return bus, client, rr
+
+    bus, client, rr = asyncio.run(run())
+    assert rr.registers == [100, 101]
+    assert client.closes == 1
+    assert bus.state == CONN_STATE_CONNECTED
+    assert bus.transient_errors == 1
+    assert bus.transport_errors == 0
+
+
+def test_mismatched_answer_is_rejected():
+    """An answer with the wrong register count is a transient error, not a decode crash."""
+    async def run():
+        client = FakeClient(short=True)
+        bus = connected_bus(client)
+        with pytest.raises(ModbusIOException):
+            await bus.async_read(REG_TYPE_INPUT, 0, 2, 1, timeout=0.01)
+        return bus
+
+    bus = asyncio.run(run())
+    assert bus.transient_errors == 1
+    assert bus.state == CONN_STATE_DISCONNECTED
+
+
+def test_pipelined_timeout_keeps_connection():
+    """The pipelined client matches answers by transaction ID and keeps the socket."""
+    async def run():
+        client = FakePipelinedClient()
+        bus = connected_bus(client, {**TCP_CONFIG, CONF_PIPELINE_DEPTH: 4})
+        with pytest.raises(TimeoutError):
+            await bus.async_read(REG_TYPE_INPUT, 0, 1, 1, timeout=0.01)
+        return bus, client
+
+    bus, client = asyncio.run(run())
+    assert client.closes == 0
+    assert bus.state == CONN_STATE_CONNECTED
+    assert bus.transient_errors == 1
+
+
+def test_transport_error_drops_connection():
+    """A broken transport closes the socket so the next poll reconnects."""
+    async def run():
+        client = FakeClient(ConnectionException("reset"))
+        bus = connected_bus(client)
+        with pytest.raises(ConnectionException):
+            await bus.async_read(REG_TYPE_INPUT, 0, 1, 1, timeout=0.01)
+        return bus, client
+
+    bus, client = asyncio.run(run())
+    assert client.closes == 1
+    assert bus.state == CONN_STATE_DISCONNECTED
+    assert bus.transport_errors == 1
@@ -0,0 +1,236 @@
+"""Tests for the data coordinator."""
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components.irradiance_sensor import sensor
+from custom_components.irradiance_sensor.const import (
+    CONF_ADAPTIVE,
+    CONF_AGGREGATE_WINDOW,
+    CONF_DEADBAND,
+    CONF_DERIVED,
+    CONF_FAST_INTERVAL,
+    CONF_HEARTBEAT,
+    CONF_MAX_REGISTER_GAP,
+    CONF_MODBUS_ID,
+    CONF_SCAN_INTERVAL,
+    DERIVED_CELL_TEMP_NOCT,
+    DERIVED_INSOLATION,
+    DERIVED_RAMP_RATE,
+)
+from custom_components.irradiance_sensor.planner import compile_read_plan
+
+CONFIG = {
+    CONF_MODBUS_ID: 1,
+    "irradiance_enabled": True,
+    "irradiance_addr": 0,
+    "temp_amb_enabled": True,
+    "temp_amb_addr": 1,
+}
+
+
+class FakeResponse:
+    """Register read answer."""
+
+    def __init__(self, registers):
+        self.registers = registers
+
+    def isError(self):
+        return False
+
+
+class FakeBus:
+    """Bus answering reads from a register list the test can change."""
+
+    char_time = 0.0
+    pipeline_depth = 1
+
+    def __init__(self, registers, silent=()):
+        self.registers = registers
+        # Addresses whose block reads time out
+        self.silent = set(silent)
+        self.reads = 0
+        self.silenced = []
+
+    def slave_retry_in(self, slave):
+        return 0.0
+
+    def mark_silent(self, slave):
+        self.silenced.append(slave)
+
+    async def async_execute(self, func, *args):
+        return await func(*args)
+
+    async def async_connect(self):
+        return True
+
+    async def async_read_timed(self, reg_type, address, count, slave, timeout=None):
+        self.reads += 1
+        if address in self.silent:
+            raise TimeoutError
+        return FakeResponse(self.registers[address:address + count]), 0.01
+
+    @staticmethod
+    def is_transient(exc):
+        return isinstance(exc, TimeoutError)
+
+
+class FakeClock:
+    """Stands in for the time module of the coordinator."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+def test_derived_metrics_follow_polls(tmp_path, monkeypatch):
+    """Insolation, ramp rate and cell temperature move with each poll."""
+    clock = FakeClock()
+    monkeypatch.setattr(sensor, "time", SimpleNamespace(
+        monotonic=clock.monotonic, perf_counter=clock.perf_counter, time=clock.time
+    ))
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        bus = FakeBus([400, 20])
+        coordinator = sensor.IrradianceDataCoordinator(
+            hass, CONFIG, bus, compile_read_plan(CONFIG), {CONF_DERIVED: True}
+        )
+
+        coordinator.data = await coordinator._async_update_data()
+        first = dict(coordinator.derived.values)
+
+        clock.now += 60
+        bus.registers = [600, 25]
+        coordinator.data = await coordinator._async_update_data()
+        return first, dict(coordinator.derived.values)
+
+    first, second = asyncio.run(run())
+    assert first[DERIVED_INSOLATION] == 0.0
+    assert first[DERIVED_RAMP_RATE] is None
+    # 60 s at a mean of 500 W/m²
+    assert second[DERIVED_INSOLATION] == round(500 * 60 / 3600, 2)
+    assert second[DERIVED_RAMP_RATE] == 200.0
+    assert second[DERIVED_CELL_TEMP_NOCT] > first[DERIVED_CELL_TEMP_NOCT]
+
+
+def test_failed_block_only_fails_its_keys(tmp_path):
+    """A block that keeps timing out takes only its own entities down."""
+    config = {
+        **CONFIG,
+        CONF_MAX_REGISTER_GAP: 0,
+        "wind_v_enabled": True,
+        "wind_v_addr": 40,
+    }
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        bus = FakeBus([400, 20] + [0] * 38 + [3], silent={40})
+        coordinator = sensor.IrradianceDataCoordinator(hass, config, bus, compile_read_plan(config))
+        data = await coordinator._async_update_data()
+        coordinator.data = data
+        entities = {
+            key: sensor.IrradianceSensorEntity(coordinator, "device", key, key, None, None)
+            for key in ("irradiance", "temp_amb", "wind_v")
+        }
+        return coordinator, data, {key: entity.available for key, entity in entities.items()}
+
+    coordinator, data, available = asyncio.run(run())
+    assert data == {"irradiance": 400.0, "temp_amb": 20.0, "wind_v": None}
+    assert coordinator.failed_keys == {"wind_v"}
+    assert available == {"irradiance": True, "temp_amb": True, "wind_v": False}
+    # The block was retried once before it was given up on
+    assert coordinator.stats.retries == 1
+
+
+def test_silent_unit_is_given_up_on_first_timeout(tmp_path):
+    """A unit that never answered is not retried, nor are its other blocks read."""
+    config = {
+        **CONFIG,
+        CONF_MAX_REGISTER_GAP: 0,
+        "wind_v_enabled": True,
+        "wind_v_addr": 40,
+    }
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        bus = FakeBus([400, 20] + [0] * 38 + [3], silent={0, 40})
+        coordinator = sensor.IrradianceDataCoordinator(hass, config, bus, compile_read_plan(config))
+        with pytest.raises(UpdateFailed):
+            await coordinator._async_update_data()
+        return coordinator, bus
+
+    coordinator, bus = asyncio.run(run())
+    assert bus.reads == 1
+    assert bus.silenced == [1]
+    assert coordinator.stats.retries == 0
+
+
+def test_aggregation_window_is_bounded(tmp_path):
+    """Windows cover a span of time with a ring sized for the fastest poll rate."""
+    config = {
+        **CONFIG,
+        f"irradiance_{CONF_SCAN_INTERVAL}": 10,
+        f"irradiance_{CONF_AGGREGATE_WINDOW}": 60,
+    }
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        plan = compile_read_plan(config)
+        fixed = sensor.IrradianceDataCoordinator(hass, config, FakeBus([400, 20]), plan)
+        adaptive = sensor.IrradianceDataCoordinator(
+            hass, config, FakeBus([400, 20]), plan, {CONF_ADAPTIVE: True, CONF_FAST_INTERVAL: 5}
+        )
+        return fixed.aggregators["irradiance"], adaptive.aggregators["irradiance"]
+
+    fixed, adaptive = asyncio.run(run())
+    assert (fixed.size, fixed.span) == (8, 60)
+    assert (adaptive.size, adaptive.span) == (14, 60)
+
+
+def test_deadband_and_heartbeat(tmp_path, monkeypatch):
+    """Changes inside the deadband are held back until the heartbeat is due."""
+    clock = FakeClock()
+    monkeypatch.setattr(sensor, "time", SimpleNamespace(
+        monotonic=clock.monotonic, perf_counter=clock.perf_counter, time=clock.time
+    ))
+    config = {**CONFIG, f"irradiance_{CONF_DEADBAND}": 5, f"irradiance_{CONF_HEARTBEAT}": 300}
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        coordinator = sensor.IrradianceDataCoordinator(
+            hass, config, FakeBus([400, 20]), compile_read_plan(config)
+        )
+        coordinator.data = {"irradiance": 400.0}
+        entity = sensor.IrradianceSensorEntity(coordinator, "device", "irradiance", "Irradiance", None, None)
+        published = []
+        entity.async_write_ha_state = lambda: published.append(entity.native_value)
+
+        def poll(value):
+            clock.now += 60
+            coordinator.data = {"irradiance": value}
+            entity._handle_coordinator_update()
+
+        # Inside the deadband
+        poll(404.0)
+        # Beyond it
+        poll(406.0)
+        # Unchanged, up to and past the heartbeat
+        for _ in range(5):
+            poll(406.0)
+        return published
+
+    assert asyncio.run(run()) == [406.0, 406.0]
@@ -0,0 +1,58 @@
+"""Tests for the diagnostics report."""
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.irradiance_sensor.const import (
+    CONF_CONNECTION_METHOD,
+    CONF_MODBUS_ID,
+    CONF_SERIAL_PORT,
+    CONF_SLAVES,
+    DATA_COORDINATORS,
+    DATA_DEVICES,
+    DATA_PLANS,
+    DOMAIN,
+    METHOD_RS485,
+)
+from custom_components.irradiance_sensor.diagnostics import async_get_config_entry_diagnostics
+from custom_components.irradiance_sensor.planner import compile_read_plan, device_configs
+
+
+def test_identifying_data_is_redacted(tmp_path):
+    """Serial port and per-sensor unique IDs, also of extra slaves, are redacted."""
+    data = {
+        CONF_CONNECTION_METHOD: METHOD_RS485,
+        CONF_SERIAL_PORT: "/dev/serial/by-id/usb-FTDI_A10K1234-if00",
+        CONF_MODBUS_ID: 1,
+        "irradiance_enabled": True,
+        "irradiance_addr": 0,
+        "irradiance_unique_id": "roof_east_pyranometer",
+        CONF_SLAVES: [{
+            CONF_MODBUS_ID: 2,
+            "temp_amb_enabled": True,
+            "temp_amb_addr": 1,
+            "temp_amb_unique_id": "roof_ambient",
+        }],
+    }
+    entry = SimpleNamespace(entry_id="entry", data=data)
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        devices = device_configs(data)
+        hass.data[DOMAIN] = {entry.entry_id: {
+            DATA_DEVICES: devices,
+            DATA_PLANS: [compile_read_plan(device) for device in devices],
+            DATA_COORDINATORS: [],
+        }}
+        return await async_get_config_entry_diagnostics(hass, entry)
+
+    report = asyncio.run(run())
+    redacted = report["entry"]
+    assert redacted[CONF_SERIAL_PORT] == "**REDACTED**"
+    assert redacted["irradiance_unique_id"] == "**REDACTED**"
+    assert redacted[CONF_SLAVES][0]["temp_amb_unique_id"] == "**REDACTED**"
+    assert redacted["irradiance_addr"] == 0
+    assert [device["modbus_id"] for device in report["devices"]] == [1, 2]
@@ -0,0 +1,82 @@
+"""Tests for the outlier filters."""
+from __future__ import annotations
+
+import random
+import statistics
+
+from custom_components.irradiance_sensor.const import (
+    CONF_FILTER,
+    CONF_FILTER_WINDOW,
+    CONF_MAX_VALUE,
+    CONF_MIN_VALUE,
+    FILTER_HAMPEL,
+    FILTER_MEDIAN,
+    FILTER_NONE,
+    MAX_FILTER_WINDOW,
+)
+from custom_components.irradiance_sensor.filters import (
+    ChannelFilter,
+    SlidingMedian,
+    build_filter,
+)
+
+
+def test_sliding_median_and_mad_match_full_sort():
+    """The running median and MAD agree with a full recomputation."""
+    rng = random.Random(7)
+    for size in (1, 2, 5, 6):
+        window = SlidingMedian(size)
+        recent = []
+        for _ in range(200):
+            value = rng.choice([rng.uniform(-50, 50), 0.0, 10.0])
+            window.add(value)
+            recent = (recent + [value])[-size:]
+            median = statistics.median(recent)
+            assert window.median == median
+            assert window.mad(median) == statistics.median(abs(v - median) for v in recent)
+        assert len(window) == size
+
+
+def test_range_check_holds_last_value():
+    """Samples outside the physical range are rejected and the last output held."""
+    channel_filter = ChannelFilter(FILTER_NONE, 5, 3.0, -40.0, 1500.0)
+    assert channel_filter.process(None) is None
+    assert channel_filter.process(800.0) == 800.0
+    assert channel_filter.process(6553.5) == 800.0
+    assert channel_filter.process(-50.0) == 800.0
+    assert channel_filter.process(810.0) == 810.0
+    assert channel_filter.rejected == 2
+
+
+def test_median_filter_outputs_window_median():
+    """The median filter removes a single-sample spike."""
+    channel_filter = ChannelFilter(FILTER_MEDIAN, 3, 3.0, None, None)
+    outputs = [channel_filter.process(v) for v in (10.0, 12.0, 500.0, 11.0, 13.0)]
+    assert outputs == [10.0, 11.0, 12.0, 12.0, 13.0]
+
+
+def test_hampel_replaces_only_outliers():
+    """Hampel passes normal samples and replaces spikes by the median."""
+    channel_filter = ChannelFilter(FILTER_HAMPEL, 5, 3.0, None, None)
+    outputs = [channel_filter.process(v) for v in (100.0, 102.0, 98.0, 101.0, 99.0, 900.0, 103.0)]
+    assert outputs == [100.0, 102.0, 98.0, 101.0, 99.0, 101.0, 103.0]
+    assert channel_filter.replaced == 1
+
+    # A flat window has no spread, so nothing is judged an outlier
+    flat = ChannelFilter(FILTER_HAMPEL, 3, 3.0, None, None)
+    assert [flat.process(v) for v in (5.0, 5.0, 5.0, 9.0)] == [5.0, 5.0, 5.0, 9.0]
+
+
+def test_build_filter():
+    """Filters are only built for configured keys and windows stay bounded."""
+    assert build_filter({}, "irradiance") is None
+    channel_filter = build_filter({
+        f"irradiance_{CONF_FILTER}": FILTER_MEDIAN,
+        f"irradiance_{CONF_FILTER_WINDOW}": 10_000,
+        f"irradiance_{CONF_MIN_VALUE}": "",
+        f"irradiance_{CONF_MAX_VALUE}": "1500",
+    }, "irradiance")
+    assert channel_filter.method == FILTER_MEDIAN
+    assert channel_filter.minimum is None
+    assert channel_filter.maximum == 1500.0
+    assert channel_filter._window.size == MAX_FILTER_WINDOW
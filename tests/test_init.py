@@ -0,0 +1,50 @@
+"""Tests for setting up and unloading config entries."""
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.irradiance_sensor import async_setup_entry
+from custom_components.irradiance_sensor.const import (
+    CONF_CONNECTION_METHOD,
+    CONF_IP_ADDRESS,
+    CONF_MODBUS_ID,
+    CONF_PORT,
+    CONF_SAMPLE_STORE,
+    DATA_BUSES,
+    DOMAIN,
+    METHOD_MODBUS_TCP,
+)
+
+
+def test_failed_setup_releases_bus(tmp_path):
+    """A setup failing after the bus was acquired gives the bus back."""
+    entry = SimpleNamespace(
+        entry_id="entry",
+        data={
+            CONF_CONNECTION_METHOD: METHOD_MODBUS_TCP,
+            CONF_IP_ADDRESS: "192.0.2.1",
+            CONF_PORT: 502,
+            CONF_MODBUS_ID: 1,
+            "irradiance_enabled": True,
+            "irradiance_addr": 0,
+        },
+        options={CONF_SAMPLE_STORE: True},
+    )
+
+    async def forward_fails(entry, platforms):
+        raise RuntimeError("platform failed")
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        hass.config_entries = SimpleNamespace(async_forward_entry_setups=forward_fails)
+        with pytest.raises(RuntimeError):
+            await async_setup_entry(hass, entry)
+        return hass
+
+    hass = asyncio.run(run())
+    assert hass.data[DOMAIN][DATA_BUSES] == {}
+    assert entry.entry_id not in hass.data[DOMAIN]
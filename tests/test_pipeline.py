@@ -0,0 +1,94 @@
+"""Tests for the pipelined Modbus TCP client."""
+from __future__ import annotations
+
+import asyncio
+import struct
+
+from custom_components.irradiance_sensor.pipeline import (
+    FUNC_READ_INPUT,
+    MBAP,
+    READ_REQUEST,
+    PipelinedModbusTcpClient,
+)
+
+# Time the simulated gateway takes to answer each request
+DELAY = 0.05
+
+
+async def slow_gateway(reader, writer):
+    """Answer input register reads one at a time, each after DELAY."""
+    try:
+        while True:
+            tid, _, length, unit = MBAP.unpack(await reader.readexactly(MBAP.size))
+            function, address, count = READ_REQUEST.unpack(await reader.readexactly(length - 1))
+            await asyncio.sleep(DELAY)
+            registers = [address + i for i in range(count)]
+            pdu = struct.pack(f">BB{count}H", function, 2 * count, *registers)
+            writer.write(MBAP.pack(tid, 0, len(pdu) + 1, unit) + pdu)
+    except asyncio.IncompleteReadError:
+        writer.close()
+
+
+def test_queue_time_is_not_charged_to_requests():
+    """Requests waiting for a slot neither time out nor report the wait as RTT."""
+    async def run():
+        server = await asyncio.start_server(slow_gateway, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = PipelinedModbusTcpClient("127.0.0.1", port, 1.0, depth=1)
+        assert await client.connect()
+        try:
+            # Together they take 4 * DELAY, more than the timeout of each
+            return await asyncio.gather(*(
+                client.read_timed(FUNC_READ_INPUT, address, 2, 1, timeout=DELAY * 3)
+                for address in range(4)
+            ))
+        finally:
+            client.close()
+            server.close()
+            await server.wait_closed()
+
+    results = asyncio.run(run())
+    assert [response.registers for response, _ in results] == [[0, 1], [1, 2], [2, 3], [3, 4]]
+    assert all(rtt < DELAY * 3 for _, rtt in results)
+
+
+def test_out_of_order_answers_reach_their_requests():
+    """Several requests are in flight and answers are matched by transaction ID."""
+    depth = 4
+    in_flight = []
+
+    async def reordering_gateway(reader, writer):
+        """Collect a batch of requests, then answer them last first."""
+        try:
+            while True:
+                batch = []
+                while len(batch) < depth:
+                    tid, _, length, unit = MBAP.unpack(await reader.readexactly(MBAP.size))
+                    batch.append((tid, unit, *READ_REQUEST.unpack(await reader.readexactly(length - 1))))
+                in_flight.append(len(batch))
+                for tid, unit, function, address, count in reversed(batch):
+                    registers = [address * 10 + i for i in range(count)]
+                    pdu = struct.pack(f">BB{count}H", function, 2 * count, *registers)
+                    writer.write(MBAP.pack(tid, 0, len(pdu) + 1, unit) + pdu)
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    async def run():
+        server = await asyncio.start_server(reordering_gateway, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = PipelinedModbusTcpClient("127.0.0.1", port, 1.0, depth=depth)
+        assert await client.connect()
+        try:
+            return await asyncio.gather(*(
+                client.read_input_registers(address, count=2, slave=1) for address in range(2 * depth)
+            ))
+        finally:
+            client.close()
+            server.close()
+            await server.wait_closed()
+
+    responses = asyncio.run(run())
+    assert [response.registers for response in responses] == [
+        [address * 10, address * 10 + 1] for address in range(2 * depth)
+    ]
+    assert in_flight == [depth, depth]
@@ -0,0 +1,147 @@
+"""Tests for the read planner and block decoder."""
+from __future__ import annotations
+
+import logging
+import struct
+
+from custom_components.irradiance_sensor.const import (
+    CONF_DATA_TYPE,
+    CONF_MAX_BLOCK_SIZE,
+    CONF_MAX_REGISTER_GAP,
+    DATA_TYPE_FLOAT32,
+    DATA_TYPE_FLOAT64,
+    DATA_TYPE_INT32,
+    ORDER_LITTLE,
+    REG_TYPE_HOLDING,
+    REG_TYPE_INPUT,
+)
+from custom_components.irradiance_sensor.planner import (
+    MODBUS_MAX_READ,
+    RegisterFormat,
+    compile_read_plan,
+    plan_reads,
+    split_block,
+)
+
+WORD = RegisterFormat()
+FLOAT = RegisterFormat(DATA_TYPE_FLOAT32)
+
+
+def words(fmt: str, value) -> list[int]:
+    """Return the big-endian registers holding a packed value."""
+    raw = struct.pack(">" + fmt, value)
+    return [int.from_bytes(raw[i:i + 2], "big") for i in range(0, len(raw), 2)]
+
+
+def spans(blocks) -> list[tuple[str, int, int]]:
+    """Return the (type, address, count) of every block."""
+    return [(block.reg_type, block.address, block.count) for block in blocks]
+
+
+def test_gap_merging():
+    """Values at most max_gap registers apart share a block."""
+    needed = {REG_TYPE_INPUT: {0: WORD, 3: WORD, 10: WORD}}
+    assert spans(plan_reads(needed, max_gap=2)) == [(REG_TYPE_INPUT, 0, 4), (REG_TYPE_INPUT, 10, 1)]
+    assert spans(plan_reads(needed, max_gap=6)) == [(REG_TYPE_INPUT, 0, 11)]
+    assert spans(plan_reads(needed, max_gap=0)) == [
+        (REG_TYPE_INPUT, 0, 1), (REG_TYPE_INPUT, 3, 1), (REG_TYPE_INPUT, 10, 1)
+    ]
+
+
+def test_register_types_never_merge():
+    """Input and holding registers at the same address are separate reads."""
+    needed = {REG_TYPE_INPUT: {0: WORD}, REG_TYPE_HOLDING: {0: WORD, 1: WORD}}
+    assert spans(plan_reads(needed, max_gap=10)) == [
+        (REG_TYPE_HOLDING, 0, 2), (REG_TYPE_INPUT, 0, 1)
+    ]
+
+
+def test_max_block_and_modbus_cap():
+    """Blocks stop at max_block, which itself is capped at 125 registers."""
+    needed = {REG_TYPE_INPUT: {0: WORD, 4: WORD, 8: WORD}}
+    assert spans(plan_reads(needed, max_gap=10, max_block=5)) == [
+        (REG_TYPE_INPUT, 0, 5), (REG_TYPE_INPUT, 8, 1)
+    ]
+
+    needed = {REG_TYPE_INPUT: {addr: WORD for addr in range(0, 300, 10)}}
+    blocks = plan_reads(needed, max_gap=10, max_block=1000)
+    assert max(block.count for block in blocks) <= MODBUS_MAX_READ
+    assert sorted(addr for block in blocks for addr in block.wanted) == list(range(0, 300, 10))
+
+
+def test_wide_value_is_not_split_across_blocks():
+    """A 32 or 64-bit value that would straddle the block limit starts a new block."""
+    needed = {REG_TYPE_INPUT: {0: WORD, 3: FLOAT}}
+    assert spans(plan_reads(needed, max_gap=10, max_block=5)) == [
+        (REG_TYPE_INPUT, 0, 5)
+    ]
+    assert spans(plan_reads(needed, max_gap=10, max_block=4)) == [
+        (REG_TYPE_INPUT, 0, 1), (REG_TYPE_INPUT, 3, 2)
+    ]
+
+    needed = {REG_TYPE_INPUT: {0: WORD, 122: RegisterFormat(DATA_TYPE_FLOAT64)}}
+    assert spans(plan_reads(needed, max_gap=200, max_block=200)) == [
+        (REG_TYPE_INPUT, 0, 1), (REG_TYPE_INPUT, 122, 4)
+    ]
+
+
+def test_decoder_word_and_byte_order():
+    """Word and byte swaps are undone before unpacking."""
+    value = -123456
+    big = words("i", value)
+    formats = {
+        0: RegisterFormat(DATA_TYPE_INT32),
+        2: RegisterFormat(DATA_TYPE_INT32, word_order=ORDER_LITTLE),
+        4: RegisterFormat(DATA_TYPE_INT32, byte_order=ORDER_LITTLE),
+        6: RegisterFormat(DATA_TYPE_INT32, ORDER_LITTLE, ORDER_LITTLE),
+    }
+
+    def swap(word):
+        return ((word & 0xFF) << 8) | (word >> 8)
+
+    registers = (
+        big
+        + big[::-1]
+        + [swap(word) for word in big]
+        + [swap(word) for word in big[::-1]]
+    )
+    (block,) = plan_reads({REG_TYPE_INPUT: formats})
+    assert block.decoder.decode(registers) == {0: value, 2: value, 4: value, 6: value}
+
+
+def test_decoder_nan_is_none():
+    """A float register holding NaN reads as no value."""
+    (block,) = plan_reads({REG_TYPE_INPUT: {0: FLOAT, 2: FLOAT}})
+    registers = words("f", float("nan")) + words("f", 2.5)
+    assert block.decoder.decode(registers) == {0: None, 2: 2.5}
+
+
+def test_split_block_trims_to_wanted():
+    """A rejected block is bisected into halves covering only their values."""
+    (block,) = plan_reads({REG_TYPE_INPUT: {0: WORD, 5: FLOAT, 20: WORD, 30: WORD}}, max_gap=20)
+    first, second = split_block(block)
+    assert spans([first, second]) == [(REG_TYPE_INPUT, 0, 7), (REG_TYPE_INPUT, 20, 11)]
+    assert first.wanted == (0, 5)
+    assert split_block(split_block(first)[0]) == [split_block(first)[0]]
+
+
+def test_conflicting_formats_are_rejected(caplog):
+    """A second channel on the same register in another format is left out."""
+    config = {
+        CONF_MAX_REGISTER_GAP: 10,
+        CONF_MAX_BLOCK_SIZE: 125,
+        "irradiance_enabled": True,
+        "irradiance_addr": 0,
+        f"irradiance_{CONF_DATA_TYPE}": DATA_TYPE_FLOAT32,
+        "temp_amb_enabled": True,
+        "temp_amb_addr": 0,
+        "temp_mod_enabled": True,
+        "temp_mod_addr": 0,
+        f"temp_mod_{CONF_DATA_TYPE}": DATA_TYPE_FLOAT32,
+    }
+    with caplog.at_level(logging.WARNING):
+        plan = compile_read_plan(config)
+    assert set(plan.channels) == {"irradiance", "temp_mod"}
+    assert "temp_amb" in caplog.text
+    (block,) = next(iter(plan.blocks.values()))
+    assert block.fields == ((0, FLOAT),)
@@ -0,0 +1,69 @@
+"""Tests for the on-disk sample ring."""
+from __future__ import annotations
+
+from custom_components.irradiance_sensor import samples
+from custom_components.irradiance_sensor.samples import SampleStore
+
+
+def read_csv(path):
+    """Return the (timestamp, value) rows of an exported CSV file."""
+    with open(path, encoding="utf-8") as handle:
+        next(handle)
+        return [tuple(float(field) for field in line.split(",")) for line in handle]
+
+
+def test_appends_during_export_of_full_ring(tmp_path, monkeypatch):
+    """Appends made while a full ring is exported neither corrupt nor get lost."""
+    monkeypatch.setattr(samples, "SAMPLE_EXPORT_CHUNK", 3)
+    store = SampleStore(str(tmp_path / "entry.samples"), 10)
+    store.open()
+    key = store.key_id("1:irradiance")
+    for i in range(10):
+        store.append(float(i), key, i * 10.0)
+
+    read = store._read
+    reads = 0
+
+    def read_and_append(*args):
+        # The event loop keeps polling while the executor is mid-export
+        nonlocal reads
+        reads += 1
+        if reads == 2:
+            for i in range(100, 105):
+                store.append(float(i), key, i * 10.0)
+        return read(*args)
+
+    monkeypatch.setattr(store, "_read", read_and_append)
+    exported = tmp_path / "during.csv"
+    assert store.export(str(exported), "1:irradiance") == 10
+    assert read_csv(exported) == [(float(i), i * 10.0) for i in range(10)]
+
+    # The held records were written once the export finished
+    after = tmp_path / "after.csv"
+    assert store.export(str(after), "1:irradiance") == 10
+    assert [row[0] for row in read_csv(after)] == [*range(5, 10), *range(100, 105)]
+    store.close()
+
+
+def test_clock_stepping_back_keeps_time_order(tmp_path):
+    """Timestamps never go backwards, also across a reopen, so exports stay ordered."""
+    path = str(tmp_path / "entry.samples")
+    store = SampleStore(path, 10)
+    store.open()
+    key = store.key_id("1:irradiance")
+    for timestamp in (100.0, 110.0, 120.0):
+        store.append(timestamp, key, timestamp)
+    store.close()
+
+    store = SampleStore(path, 10)
+    store.open()
+    # The wall clock was stepped back by NTP
+    for timestamp in (50.0, 60.0, 125.0):
+        store.append(timestamp, key, timestamp)
+
+    exported = tmp_path / "from_110.csv"
+    assert store.export(str(exported), "1:irradiance", start=110.0) == 5
+    assert read_csv(exported) == [
+        (110.0, 110.0), (120.0, 120.0), (120.0, 50.0), (120.0, 60.0), (125.0, 125.0)
+    ]
+    store.close()
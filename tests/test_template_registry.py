@@ -0,0 +1,36 @@
+"""Tests for the template registry."""
+from __future__ import annotations
+
+import asyncio
+import json
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.irradiance_sensor import template_registry
+from custom_components.irradiance_sensor.template_registry import TemplateRegistry
+
+SHIPPED = [
+    {"name": name, "registers": {}} for name in template_registry.SHIPPED_TEMPLATES
+]
+
+
+def test_user_templates_move_out_of_templates_json(tmp_path, monkeypatch):
+    """Templates saved into templates.json by older versions survive an update."""
+    path = tmp_path / "templates.json"
+    mine = {"irradiance_addr": 3}
+    path.write_text(json.dumps([*SHIPPED, {"name": "Roof", "registers": mine}]))
+    monkeypatch.setattr(template_registry, "BUNDLED_TEMPLATES_PATH", str(path))
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        before = await TemplateRegistry(hass).async_get_templates()
+
+        # An update replaces templates.json with the shipped one
+        path.write_text(json.dumps(SHIPPED))
+        after = await TemplateRegistry(hass).async_get_templates()
+        return before, after
+
+    before, after = asyncio.run(run())
+    assert before["Roof"] == mine
+    assert after["Roof"] == mine
+    assert set(after) == {*template_registry.SHIPPED_TEMPLATES, "Roof"}